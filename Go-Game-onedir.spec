@@ -0,0 +1,50 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Fast-starting build: a folder instead of a single file, so nothing is unpacked to a temp
+# directory on each launch, and without UPX, so libraries are not decompressed on load.
+# Build with `pyinstaller Go-Game-onedir.spec`; run dist/Go-Game/Go-Game.
+
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('game/images/*', 'game/images/'), ('game/audio/*', 'game/audio/'), ('img/*', 'img/')],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    # The game does not use the agents; without NumPy and pkg_resources pygame skips
+    # surfarray and its package resource lookup at import time
+    excludes=['agent', 'numpy', 'pkg_resources', 'setuptools', 'tkinter'],
+    noarchive=False,
+    optimize=1,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='Go-Game',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['game\\images\\logo.ico'],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='Go-Game',
+)
@@ -0,0 +1,71 @@
+import random
+import numpy as np
+from agent.rl.model_file import save_model, load_model
+"""
+Checkpoints for resumable training of rl agents.
+A checkpoint is a model file whose header additionally holds the training state.
+"""
+
+# Hyperparameters that must be the same to resume training; the number of epochs may grow
+RESUME_HYPERPARAMS = ('lr', 'discount', 'exploration_rate', 'decay_rate', 'decay_epoch', 'snapshot_epoch')
+
+
+def get_rng_state():
+    """Return the state of python's and numpy's global RNGs as JSON-serializable lists."""
+    version, internal, gauss_next = random.getstate()
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    return {'random': [version, list(internal), gauss_next],
+            'numpy': [name, keys.tolist(), pos, has_gauss, cached_gaussian]}
+
+
+def set_rng_state(state):
+    version, internal, gauss_next = state['random']
+    random.setstate((version, tuple(internal), gauss_next))
+    name, keys, pos, has_gauss, cached_gaussian = state['numpy']
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+
+
+def save_checkpoint(path_file, w, rl_env, board_size, epoch, lr, exploration_rate, hyperparams, stats=None,
+                    opponent_pool=None):
+    """
+    Atomically write a checkpoint.
+    :param epoch: the number of finished epochs, i.e. the epoch to resume from
+    :param lr: the current (decayed) learning rate
+    :param exploration_rate: the current (decayed) exploration rate
+    :param hyperparams: dict of the arguments training was started with
+    :param opponent_pool: if not None, the snapshots in this OpponentPool are saved as well
+    """
+    state = {'epoch': epoch,
+             'lr': lr,
+             'exploration_rate': exploration_rate,
+             'hyperparams': hyperparams,
+             'rng': get_rng_state()}
+    if opponent_pool is not None:
+        state['opponent_pool'] = opponent_pool.get_snapshot_state()
+    save_model(path_file, w, rl_env, board_size, stats, extra={'checkpoint': state})
+
+
+def load_checkpoint(path_file, rl_env, board_size=None, hyperparams=None):
+    """
+    Read a checkpoint and restore the global RNG states.
+    :param hyperparams: if not None, check them with check_hyperparams() first;
+                        a rejected checkpoint leaves the RNG states untouched
+    :return: a writable copy of the weights, and the training state dict
+    """
+    model = load_model(path_file, rl_env, board_size)
+    if 'checkpoint' not in model.header:
+        raise ValueError('%s is a model file but not a checkpoint!' % path_file)
+    state = model.header['checkpoint']
+    if hyperparams is not None:
+        check_hyperparams(path_file, state, hyperparams)
+    set_rng_state(state['rng'])
+    return np.array(model.weights), state
+
+
+def check_hyperparams(path_file, state, hyperparams):
+    """Raise ValueError if training would resume with other hyperparameters than the checkpoint was trained with."""
+    saved = state['hyperparams']
+    mismatches = ['%s=%r (checkpoint has %r)' % (key, hyperparams[key], saved[key])
+                  for key in RESUME_HYPERPARAMS if key in saved and saved[key] != hyperparams[key]]
+    if mismatches:
+        raise ValueError('Cannot resume from %s with other hyperparameters: %s!' % (path_file, ', '.join(mismatches)))
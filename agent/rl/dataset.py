@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+from multiprocessing import Pool
+import numpy as np
+from game.record import RecordReader
+from game.symmetry import NUM_TRANSFORMS, augment
+"""
+Position datasets built from game records, for training rl agents and tuning evaluations.
+
+Every position before a move of a recorded game becomes one sample; a shard holds the positions of
+GAMES_PER_SHARD consecutive games as an uncompressed .npz file with the arrays
+    planes    uint8 (n, 2, size, size)  black and white stones
+    to_move   uint8 (n,)                0 if black is to move, 1 if white
+    legal     bool  (n, size * size + 1) legal moves of the player to move; the last entry is the pass
+    moves     int16 (n,)                the move played, x * size + y, or size * size for a pass
+    outcomes  int8  (n,)                1 if the player to move won the game, -1 if lost, 0 if unknown
+    game_ids  int32 (n,)                the index of the game in the record file
+    game_range int64 (2,)               the games [start, stop) of the record file the shard covers
+    features  float32 (n, num_weights)  features of the move played, only if an rl env was given
+    isself    bool  (n,)                whether the features are the mover's own, for envs that tell
+                                        (RlEnv2, RlEnv3)
+    transform uint8 (n,)                the board symmetry applied to the sample, only if augmented
+With augmentation every position is stored under all 8 symmetries of the board (game.symmetry.augment()):
+sample t * m + i of a shard of m positions is position i under transform t.
+Shards are written atomically and complete shards are skipped, so an interrupted build can be resumed;
+a last shard written before the record file grew is rebuilt.
+"""
+
+GAMES_PER_SHARD = 1000
+MANIFEST = 'manifest.json'
+
+_reader = None  # The record file of a worker process, opened once per process
+
+
+def get_shard_path(dir_out, shard):
+    return os.path.join(dir_out, 'shard_%05d.npz' % shard)
+
+
+def get_rl_env(name):
+    """Return the rl environment class with the given name, e.g. 'RlEnv2'."""
+    from agent.rl import rl_env
+    env_cls = getattr(rl_env, name, None)
+    if not isinstance(env_cls, type) or not issubclass(env_cls, rl_env.RlEnvBase):
+        raise ValueError('Unknown rl environment: %s' % name)
+    return env_cls
+
+
+def check_feature_support(env_cls, board):
+    """Raise ValueError if env_cls cannot extract features from positions of this Board class."""
+    try:
+        env_cls.extract_features(board, None, board.next.upper())
+    except AttributeError as e:
+        raise ValueError('%s cannot extract features from %s positions: %s'
+                         % (env_cls.__name__, board.__class__.__name__, e))
+
+
+def encode_position(board):
+    """:return: (planes, legal mask) of the position on board for the player to move"""
+    size = board.size
+    planes = np.zeros((2, size, size), dtype=np.uint8)
+    for x in range(size):
+        column = board.board[x]
+        for y in range(size):
+            if column[y] == 'black':
+                planes[0, x, y] = 1
+            elif column[y] == 'white':
+                planes[1, x, y] = 1
+    legal = np.zeros(size * size + 1, dtype=bool)
+    for x, y in board.get_legal_moves():
+        legal[x * size + y] = True
+    legal[-1] = True
+    return planes, legal
+
+
+def get_shard_range(path_shard):
+    """:return: the games (start, stop) an existing shard covers, or None if it does not record them"""
+    with np.load(path_shard) as data:
+        if 'game_range' not in data.files:
+            return None
+        start, stop = data['game_range']
+        return int(start), int(stop)
+
+
+def build_shard(path_record, dir_out, shard, games_per_shard=GAMES_PER_SHARD, board_size=19, env_name=None,
+                augmented=False):
+    """
+    Replay the games of one shard and write its arrays; does nothing if the shard already exists
+    and covers all of its games that are in the record file now.
+    :param augmented: store every position under all 8 board symmetries
+    :return: (shard, number of positions, game range), or (shard, None, game range) if the shard was skipped
+    """
+    global _reader
+    if _reader is None or _reader.path_file != path_record:
+        _reader = RecordReader(path_record)
+    game_range = (shard * games_per_shard, min(len(_reader), (shard + 1) * games_per_shard))
+    path_shard = get_shard_path(dir_out, shard)
+    if os.path.exists(path_shard) and get_shard_range(path_shard) == game_range:
+        return shard, None, game_range
+    env_cls = get_rl_env(env_name) if env_name else None
+
+    samples = {'planes': [], 'to_move': [], 'legal': [], 'moves': [], 'outcomes': [], 'game_ids': [],
+               'features': [], 'isself': []}
+    for k in range(*game_range):
+        header = _reader.read_header(k)
+        if header['board_size'] != board_size:
+            continue
+        game = _reader[k]
+        winner = game.winner
+        board = game.replay(num_moves=0)
+        num_positions = len(samples['moves'])
+        try:
+            for color, point in game.moves:
+                num_positions = len(samples['moves'])
+                board.next = color
+                planes, legal = encode_position(board)
+                samples['planes'].append(planes)
+                samples['to_move'].append(0 if color == 'black' else 1)
+                samples['legal'].append(legal)
+                samples['moves'].append(board_size * board_size if point is None else point[0] * board_size + point[1])
+                samples['outcomes'].append(0 if winner is None else (1 if winner == color else -1))
+                samples['game_ids'].append(k)
+                if env_cls is not None:
+                    feats = env_cls.extract_features(board, point, color.upper())
+                    if isinstance(feats, tuple):  # RlEnv2/RlEnv3 also tell whose features these are
+                        feats, isself = feats
+                        samples['isself'].append(isself)
+                    samples['features'].append(feats)
+                if point is None:
+                    board.pass_move()
+                elif not board.put_stone(point)[0]:
+                    raise ValueError('illegal move %s' % (point,))
+        except ValueError as e:
+            print('Skipping the rest of game %d: %s' % (k, e))
+            # Keep the positions before the failed one
+            for values in samples.values():
+                del values[num_positions:]
+
+    size = board_size
+    arrays = {'planes': np.array(samples['planes'], dtype=np.uint8).reshape(-1, 2, size, size),
+              'to_move': np.array(samples['to_move'], dtype=np.uint8),
+              'legal': np.array(samples['legal'], dtype=bool).reshape(-1, size * size + 1),
+              'moves': np.array(samples['moves'], dtype=np.int16),
+              'outcomes': np.array(samples['outcomes'], dtype=np.int8),
+              'game_ids': np.array(samples['game_ids'], dtype=np.int32),
+              'game_range': np.array(game_range, dtype=np.int64)}
+    if env_cls is not None:
+        arrays['features'] = np.array(samples['features'], dtype=np.float32).reshape(-1, env_cls.get_num_weights())
+        if samples['isself']:
+            arrays['isself'] = np.array(samples['isself'], dtype=bool)
+    if augmented:
+        num_positions = len(arrays['moves'])
+        arrays['planes'], moves, arrays['legal'] = augment(arrays['planes'], arrays['moves'], arrays['legal'])
+        arrays['moves'] = moves.astype(np.int16)
+        # The features, outcomes and ids do not depend on the orientation of the board
+        for key in ('to_move', 'outcomes', 'game_ids', 'features', 'isself'):
+            if key in arrays:
+                arrays[key] = np.concatenate([arrays[key]] * NUM_TRANSFORMS)
+        arrays['transform'] = np.repeat(np.arange(NUM_TRANSFORMS, dtype=np.uint8), num_positions)
+
+    # Write to a temporary file first, so that an interrupted build never leaves a partial shard
+    path_tmp = '%s.tmp%d.npz' % (path_shard[:-len('.npz')], os.getpid())
+    np.savez(path_tmp, **arrays)
+    os.replace(path_tmp, path_shard)
+    return shard, len(arrays['moves']), game_range
+
+
+def build_dataset(path_record, dir_out, board_size=19, games_per_shard=GAMES_PER_SHARD, env_name=None,
+                  num_workers=None, augmented=False):
+    """
+    Build all missing shards of a dataset in parallel and write its manifest.
+    :param env_name: name of the rl env to extract features with, e.g. 'RlEnv'; None for no features
+    :param augmented: store every position under all 8 board symmetries
+    :param num_workers: worker processes; None for one per CPU
+    :return: the manifest dict
+    """
+    os.makedirs(dir_out, exist_ok=True)
+    with RecordReader(path_record) as reader:
+        num_games = len(reader)
+        if env_name:
+            # Fail before starting the workers if the features cannot be computed
+            env_cls = get_rl_env(env_name)
+            for k in range(num_games):
+                if reader.read_header(k)['board_size'] == board_size:
+                    check_feature_support(env_cls, reader.replay(k, num_moves=0))
+                    break
+    num_shards = (num_games + games_per_shard - 1) // games_per_shard
+
+    path_manifest = os.path.join(dir_out, MANIFEST)
+    manifest = {'record': os.path.abspath(path_record), 'board_size': board_size, 'games_per_shard': games_per_shard,
+                'env': env_name, 'augmented': augmented, 'num_games': num_games, 'shards': {}, 'game_ranges': {}}
+    if os.path.exists(path_manifest):
+        with open(path_manifest) as f:
+            previous = json.load(f)
+        previous.setdefault('augmented', False)  # Manifests written before augmentation existed
+        if any(previous.get(key) != manifest[key] for key in ('board_size', 'games_per_shard', 'env', 'augmented')):
+            raise ValueError('%s holds a dataset built with other settings' % dir_out)
+        manifest['shards'] = previous.get('shards', {})
+        manifest['game_ranges'] = previous.get('game_ranges', {})
+
+    tasks = [(path_record, dir_out, shard, games_per_shard, board_size, env_name, augmented)
+             for shard in range(num_shards)]
+    with Pool(num_workers) as pool:
+        for shard, num_positions, game_range in pool.imap_unordered(_build_shard_task, tasks):
+            if num_positions is None:
+                print('Shard %d exists; skipped' % shard)
+                continue
+            manifest['shards'][str(shard)] = num_positions
+            manifest['game_ranges'][str(shard)] = list(game_range)
+            print('Shard %d: %d positions' % (shard, num_positions))
+            _write_manifest(path_manifest, manifest)
+    _write_manifest(path_manifest, manifest)
+    return manifest
+
+
+def iter_shards(dir_out):
+    """Yield the arrays of every shard of a dataset in order, one shard in memory at a time."""
+    shards = sorted(name for name in os.listdir(dir_out) if name.startswith('shard_') and name.endswith('.npz')
+                    and '.tmp' not in name)
+    for name in shards:
+        with np.load(os.path.join(dir_out, name)) as data:
+            yield {key: data[key] for key in data.files}
+
+
+def iter_batches(dir_out, batch_size, keys=('features', 'outcomes')):
+    """Yield dicts of batch_size samples (the last may be smaller) of the given arrays, streaming the shards."""
+    pending = None
+    for arrays in iter_shards(dir_out):
+        arrays = {key: arrays[key] for key in keys}
+        if pending is not None:
+            arrays = {key: np.concatenate([pending[key], arrays[key]]) for key in keys}
+        num_samples = len(arrays[keys[0]])
+        start = 0
+        while num_samples - start >= batch_size:
+            yield {key: arrays[key][start:start + batch_size] for key in keys}
+            start += batch_size
+        pending = {key: arrays[key][start:] for key in keys}
+    if pending is not None and len(pending[keys[0]]) > 0:
+        yield pending
+
+
+def _build_shard_task(args):
+    return build_shard(*args)
+
+
+def _write_manifest(path_manifest, manifest):
+    path_tmp = path_manifest + '.tmp'
+    with open(path_tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path_tmp, path_manifest)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Build a position dataset from a game record file')
+    parser.add_argument('record', help='game record file written by game.record')
+    parser.add_argument('dir_out', help='directory of the shards; an interrupted build is resumed')
+    parser.add_argument('-s', '--size', type=int, default=19, help='board size; games of other sizes are skipped')
+    parser.add_argument('-g', '--games_per_shard', type=int, default=GAMES_PER_SHARD)
+    parser.add_argument('-e', '--env', default=None, help='rl env to extract features with: RlEnv, RlEnv2 or RlEnv3')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes; DEFAULT is one per CPU')
+    parser.add_argument('-a', '--augment', action='store_true',
+                        help='store every position under all 8 board symmetries')
+    args = parser.parse_args()
+
+    manifest = build_dataset(args.record, args.dir_out, board_size=args.size, games_per_shard=args.games_per_shard,
+                             env_name=args.env, num_workers=args.workers, augmented=args.augment)
+    print('%d positions in %d shards' % (sum(manifest['shards'].values()), len(manifest['shards'])))
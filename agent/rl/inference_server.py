@@ -0,0 +1,205 @@
+from agent.basic_agent import Agent
+from agent.rl.model_file import load_model
+from concurrent.futures import Future
+import argparse
+import json
+import queue
+import socketserver
+import threading
+import time
+import numpy as np
+"""
+Batched Q-value inference for serving many concurrent games with one weight vector.
+Feature matrices from many move requests are stacked and evaluated with a single matmul per tick.
+"""
+
+
+class QInferenceServer:
+    def __init__(self, w, max_batch_rows=8192, max_delay=0.002):
+        """
+        :param w: the weight vector (e.g. memory-mapped from a model file)
+        :param max_batch_rows: a tick is evaluated as soon as this many feature rows are queued
+        :param max_delay: the latency deadline in seconds; a tick never waits longer than this
+                          after its first request arrived
+        """
+        self.w = np.asarray(w, dtype=np.float64)
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.requests = queue.Queue()
+        self.thread = None
+        self.running = False
+        self.num_ticks = 0
+        self.num_requests = 0
+        self.num_rows = 0
+
+    def start(self):
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name='QInferenceServer', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.running = False
+            self.requests.put(None)  # Wake up the serving thread
+            self.thread.join()
+            self.thread = None
+
+    def set_weights(self, w):
+        """Hot-swap the weights; ticks already in flight finish with the old weights."""
+        self.w = np.asarray(w, dtype=np.float64)
+
+    def submit(self, feats, signs=None):
+        """
+        Queue a feature matrix (one row per candidate action).
+        :param signs: optional per-row factor applied to the Q-values, e.g. -1 for opponent's features
+        :return: a Future resolving to the 1-d array of Q-values
+        """
+        feats = np.asarray(feats, dtype=np.float64)
+        if feats.ndim != 2 or feats.shape[1] != self.w.shape[0]:
+            raise ValueError('Expected a feature matrix with %d columns, got shape %s!'
+                             % (self.w.shape[0], feats.shape))
+        if signs is not None:
+            signs = np.asarray(signs, dtype=np.float64)
+            if signs.shape != (feats.shape[0],):
+                raise ValueError('Expected %d signs, one per feature row, got shape %s!'
+                                 % (feats.shape[0], signs.shape))
+        future = Future()
+        self.requests.put((feats, signs, future))
+        return future
+
+    def evaluate(self, feats, signs=None, timeout=None):
+        """Blocking version of submit()."""
+        return self.submit(feats, signs).result(timeout)
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the batch is full or the deadline passes."""
+        first = self.requests.get()
+        if first is None:
+            return []
+        batch = [first]
+        num_rows = first[0].shape[0]
+        deadline = time.perf_counter() + self.max_delay
+        while num_rows < self.max_batch_rows:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self.requests.get(timeout=timeout) if timeout > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                break
+            batch.append(request)
+            num_rows += request[0].shape[0]
+        return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            # Futures cancelled while queued are dropped; the others are marked running
+            batch = [request for request in batch if request[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            # One matmul for all pending requests, then split the result per request
+            try:
+                qs = np.concatenate([feats for feats, _, _ in batch]).dot(self.w)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for feats, signs, future in batch:
+                end = start + feats.shape[0]
+                # A failing request only fails its own future, never the serving thread
+                try:
+                    result = qs[start:end] if signs is None else qs[start:end] * signs
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                start = end
+            self.num_ticks += 1
+            self.num_requests += len(batch)
+            self.num_rows += start
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class BatchedQAgent(Agent):
+    """ApproxQAgent that evaluates its candidate actions through a shared QInferenceServer."""
+    def __init__(self, color, rl_env, server, timeout=None):
+        super().__init__(color)
+        self.rl_env = rl_env
+        self.server = server
+        self.timeout = timeout
+
+    def get_feature_matrix(self, board, legal_actions):
+        """Return the feature rows of all actions and the sign of their Q-values."""
+        rows = []
+        signs = []
+        for action in legal_actions:
+            feats = self.rl_env.extract_features(board, action, self.color)
+            sign = 1.
+            if isinstance(feats, tuple):  # RlEnv2/RlEnv3 also tell whose features these are
+                feats, isself = feats
+                if not isself:
+                    feats = self.rl_env.reverse_features(feats)
+                    sign = -1.
+            rows.append(feats)
+            signs.append(sign)
+        return np.array(rows, dtype=np.float64), np.array(signs)
+
+    def get_action(self, board):
+        legal_actions = board.get_legal_actions()
+        if not legal_actions:
+            return None
+        feats, signs = self.get_feature_matrix(board, legal_actions)
+        qs = self.server.evaluate(feats, signs, self.timeout)
+        return legal_actions[int(np.argmax(qs))]
+
+
+class _QRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON object per line: {"feats": [[...], ...], "signs": [...]} -> {"qs": [...]}"""
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                signs = request.get('signs')
+                qs = self.server.inference.evaluate(request['feats'],
+                                                    None if signs is None else np.asarray(signs))
+                response = {'qs': qs.tolist()}
+            except Exception as e:
+                response = {'error': str(e)}
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+
+class QSocketServer(socketserver.ThreadingTCPServer):
+    """Local socket front end; every connection is served by a thread feeding the shared batcher."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, inference, host='127.0.0.1', port=5055):
+        super().__init__((host, port), _QRequestHandler)
+        self.inference = inference
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Batched Q-value inference server')
+    parser.add_argument('model', help='model file written by ApproxQAgent.save')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--max_delay_ms', type=float, default=2., help='latency deadline per tick')
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    print('Serving ' + str(model))
+    with QInferenceServer(model.weights, max_delay=args.max_delay_ms / 1000.) as inference:
+        with QSocketServer(inference, args.host, args.port) as server:
+            server.serve_forever()
@@ -0,0 +1,142 @@
+import json
+import os
+import struct
+import time
+import numpy as np
+"""
+Versioned binary model format for the weight vectors of rl agents.
+
+Layout of a model file:
+    magic (4 bytes) | version (uint16) | header length (uint32) | JSON header | padding | weights
+The weights are raw little-endian float64 values, aligned to DATA_ALIGNMENT bytes,
+so that they can be memory-mapped directly without parsing or copying.
+"""
+
+MAGIC = b'GOQM'
+VERSION = 1
+DATA_ALIGNMENT = 64
+EXTENSION = '.gqm'
+
+_PREFIX = struct.Struct('<4sHI')
+_NUMPY_MAGIC = b'\x93NUMPY'
+
+
+def get_feature_schema(rl_env):
+    """Describe the features an environment produces, as recorded in the model header."""
+    env_cls = rl_env if isinstance(rl_env, type) else rl_env.__class__
+    return {'env': env_cls.__name__,
+            'num_feats': env_cls.get_num_feats(),
+            'num_weights': env_cls.get_num_weights()}
+
+
+def save_model(path_file, w, rl_env, board_size=19, stats=None, extra=None):
+    """
+    Write the weight vector and its header atomically to path_file.
+    :param w: 1-d weight vector
+    :param rl_env: the environment (class or instance) the weights belong to
+    :param board_size: the board size the weights were trained on
+    :param stats: dict of training statistics to record
+    :param extra: dict of additional header entries (e.g. checkpoint state)
+    """
+    w = np.ascontiguousarray(w, dtype='<f8')
+    if w.ndim != 1:
+        raise ValueError('Weight vector must be 1-d!')
+    schema = get_feature_schema(rl_env)
+    if w.shape[0] != schema['num_weights']:
+        raise ValueError('Weight vector has %d entries but %s expects %d!'
+                         % (w.shape[0], schema['env'], schema['num_weights']))
+
+    header = {'schema': schema,
+              'board_size': board_size,
+              'dtype': '<f8',
+              'created': time.time(),
+              'stats': stats or {}}
+    if extra:
+        header.update(extra)
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_offset = _PREFIX.size + len(header_bytes)
+    padding = -data_offset % DATA_ALIGNMENT
+
+    # Write to a temporary file first so that readers never see a partial model
+    path_tmp = '%s.tmp%d' % (path_file, os.getpid())
+    with open(path_tmp, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * padding)
+        f.write(w.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path_tmp, path_file)
+
+
+def is_model_file(path_file):
+    with open(path_file, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def is_legacy_file(path_file):
+    """Raw .npy weight files written before the model format existed."""
+    with open(path_file, 'rb') as f:
+        return f.read(len(_NUMPY_MAGIC)) == _NUMPY_MAGIC
+
+
+class ModelFile:
+    """
+    A model file on disk. Only the header is read on construction;
+    the weights are memory-mapped read-only on first access.
+    """
+    def __init__(self, path_file):
+        self.path = path_file
+        with open(path_file, 'rb') as f:
+            magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError('%s is not a model file!' % path_file)
+            if version > VERSION:
+                raise ValueError('%s has unsupported model version %d!' % (path_file, version))
+            self.version = version
+            self.header = json.loads(f.read(header_len).decode('utf-8'))
+        offset = _PREFIX.size + header_len
+        self.data_offset = offset + (-offset % DATA_ALIGNMENT)
+        self._weights = None
+
+    @property
+    def schema(self):
+        return self.header['schema']
+
+    @property
+    def board_size(self):
+        return self.header['board_size']
+
+    @property
+    def stats(self):
+        return self.header['stats']
+
+    @property
+    def weights(self):
+        if self._weights is None:
+            self._weights = np.memmap(self.path, dtype=self.header['dtype'], mode='r',
+                                      offset=self.data_offset, shape=(self.schema['num_weights'],))
+        return self._weights
+
+    def validate(self, rl_env, board_size=None):
+        """Raise ValueError if the model does not match the environment (and board size, if given)."""
+        expected = get_feature_schema(rl_env)
+        for key, value in expected.items():
+            if self.schema.get(key) != value:
+                raise ValueError('%s: model has %s=%r but environment expects %r!'
+                                 % (self.path, key, self.schema.get(key), value))
+        if board_size is not None and self.board_size != board_size:
+            raise ValueError('%s: model was trained on board size %d, not %d!'
+                             % (self.path, self.board_size, board_size))
+
+    def __str__(self):
+        return '%s (%s, %d weights, board size %d)' % \
+               (self.path, self.schema['env'], self.schema['num_weights'], self.board_size)
+
+
+def load_model(path_file, rl_env=None, board_size=None):
+    """Open and optionally validate a model file; the weights stay on disk until accessed."""
+    model = ModelFile(path_file)
+    if rl_env is not None:
+        model.validate(rl_env, board_size)
+    return model
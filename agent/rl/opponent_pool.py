@@ -0,0 +1,119 @@
+from agent.basic_agent import RandomAgent, GreedyAgent
+from agent.search.search_agent import AlphaBetaAgent, ExpectimaxAgent
+import random
+import numpy as np
+"""
+Pool of long-lived opponents for training rl agents.
+Agents are created once and reused across games, so any state they keep survives between epochs.
+"""
+
+
+class OpponentPool:
+    def __init__(self, color, max_snapshots=5):
+        """
+        :param color: the color all opponents in the pool play
+        :param max_snapshots: the number of past snapshots of the trained agent to keep
+        """
+        self.color = color
+        self.max_snapshots = max_snapshots
+        self.names = []
+        self.agents = []
+        self.weights = []
+        self.snapshot_names = []
+        self.num_snapshots = 0
+        self.random_agent = RandomAgent(color)  # Also used for the opening move
+
+    def add(self, name, agent, weight=1.):
+        if agent.color != self.color:
+            raise ValueError('Opponent %s plays %s, but the pool plays %s!' % (name, agent.color, self.color))
+        if name in self.names:
+            raise ValueError('Opponent %s is already in the pool!' % name)
+        self.names.append(name)
+        self.agents.append(agent)
+        self.weights.append(weight)
+
+    def remove(self, name):
+        idx = self.names.index(name)
+        del self.names[idx], self.agents[idx], self.weights[idx]
+
+    def add_snapshot(self, q_agent, weight=1.):
+        """Freeze a copy of the trained agent's current weights as an opponent; the oldest is evicted."""
+        snapshot = q_agent.__class__(self.color, q_agent.rl_env, q_agent.board_size)
+        snapshot.w = np.array(q_agent.w)
+        self.num_snapshots += 1
+        name = 'snapshot_%d' % self.num_snapshots
+        self.add(name, snapshot, weight)
+        self.snapshot_names.append(name)
+        if len(self.snapshot_names) > self.max_snapshots:
+            self.remove(self.snapshot_names.pop(0))
+        return name
+
+    def get_snapshot_state(self):
+        """Return the snapshots in the pool as a JSON-serializable dict, for checkpoints."""
+        snapshots = []
+        for name in self.snapshot_names:
+            idx = self.names.index(name)
+            snapshots.append({'name': name, 'weight': self.weights[idx], 'w': self.agents[idx].w.tolist()})
+        return {'num_snapshots': self.num_snapshots, 'snapshots': snapshots}
+
+    def set_snapshot_state(self, state, q_agent):
+        """
+        Replace the snapshots in the pool by those of get_snapshot_state().
+        :param q_agent: the trained agent; the snapshots are created as agents of its class, env and board size
+        """
+        for name in self.snapshot_names:
+            self.remove(name)
+        self.snapshot_names = []
+        for entry in state['snapshots']:
+            snapshot = q_agent.__class__(self.color, q_agent.rl_env, q_agent.board_size)
+            snapshot.w = np.array(entry['w'])
+            self.add(entry['name'], snapshot, entry['weight'])
+            self.snapshot_names.append(entry['name'])
+        self.num_snapshots = state['num_snapshots']
+
+    def sample(self):
+        """Return the name and agent of a randomly chosen opponent, according to the weights."""
+        if not self.agents:
+            raise RuntimeError('Opponent pool is empty!')
+        idx = random.choices(range(len(self.agents)), weights=self.weights)[0]
+        return self.names[idx], self.agents[idx]
+
+    def get_action(self, board):
+        """Let a sampled opponent choose the action; return the opponent's name and the action."""
+        name, agent = self.sample()
+        return name, agent.get_action(board)
+
+    @classmethod
+    def create_default(cls, color, prob_random=0.4):
+        """The mix ApproxQAgent has always trained against: depth-1 minimax with random moves."""
+        pool = cls(color)
+        pool.add('minimax_1', AlphaBetaAgent(color, depth=1), 1 - prob_random)
+        pool.add('random', pool.random_agent, prob_random)
+        return pool
+
+    @classmethod
+    def from_config(cls, color, config, max_snapshots=5):
+        """
+        Build a pool from a list of dicts such as
+        [{'type': 'minimax', 'depth': 2, 'weight': 2}, {'type': 'greedy'}, {'type': 'random', 'weight': 0.5}].
+        Possible types: random; greedy; minimax; expectimax.
+        """
+        pool = cls(color, max_snapshots)
+        for entry in config:
+            agent_type = entry['type']
+            weight = entry.get('weight', 1.)
+            if agent_type == 'random':
+                pool.add('random', pool.random_agent, weight)
+            elif agent_type == 'greedy':
+                pool.add('greedy', GreedyAgent(color), weight)
+            elif agent_type in ('minimax', 'expectimax'):
+                depth = entry.get('depth', 1)
+                agent_cls = AlphaBetaAgent if agent_type == 'minimax' else ExpectimaxAgent
+                pool.add('%s_%d' % (agent_type, depth), agent_cls(color, depth=depth), weight)
+            else:
+                raise ValueError('Unknown opponent type: %s' % agent_type)
+        return pool
+
+    def __str__(self):
+        total = sum(self.weights)
+        return ', '.join('%s: %.2f' % (name, weight / total) for name, weight in zip(self.names, self.weights))
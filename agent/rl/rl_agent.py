@@ -1,6 +1,9 @@
-from agent.basic_agent import Agent, RandomAgent
-from agent.search.search_agent import AlphaBetaAgent
+from agent.basic_agent import Agent
 from agent.rl.rl_env import RlEnv
+from agent.rl.model_file import EXTENSION, save_model, load_model, is_legacy_file
+from agent.rl.checkpoint import save_checkpoint, load_checkpoint
+from agent.rl.telemetry import Stopwatch, MetricsWriter
+from agent.rl.opponent_pool import OpponentPool
 import numpy as np
 from game.go import Board
 from game.go import opponent_color
@@ -9,18 +12,21 @@ from statistics import mean
 
 
 class RlAgent(Agent):
-    def __init__(self, color, rl_env):
+    def __init__(self, color, rl_env, board_size=19):
         super().__init__(color)
         self.rl_env = rl_env
+        self.board_size = board_size
         self.w = None
+        self.train_stats = {}
 
     def get_action(self, board):
         raise NotImplementedError
 
 
 class ApproxQAgent(RlAgent):
-    def __init__(self, color, rl_env):
-        super().__init__(color, rl_env)
+    def __init__(self, color, rl_env, board_size=19):
+        super().__init__(color, rl_env, board_size)
+        self.opponent_pool = None
 
     def get_action(self, board):
         if self.w is None:
@@ -33,106 +39,205 @@ class ApproxQAgent(RlAgent):
         return max(legal_actions, key=lambda action: self._calc_q(board, action))
 
     def get_default_path(self):
-        return '%s.npy' % self.__class__.__name__
+        return '%s%s' % (self.__class__.__name__, EXTENSION)
 
     def save(self, path_file=None):
-        """Save the weight vector."""
+        """Save the weight vector, with a header describing env, board size and training stats."""
         if self.w is not None:
             if not path_file:
                 path_file = self.get_default_path()
-            np.save(path_file, self.w)
+            save_model(path_file, self.w, self.rl_env, self.board_size, self.train_stats)
             print('Saved weights to ' + path_file)
 
-    def load(self, path_file=None):
-        """Load the weight vector."""
+    def load(self, path_file=None, verbose=False):
+        """
+        Load the weight vector; the weights of a model file are memory-mapped read-only.
+        Raw .npy files from older versions are still accepted.
+        """
         if path_file is None:
             path_file = self.get_default_path()
-        self.w = np.load(path_file)
-        print('Loaded weights from ' + path_file)
-
-    def train(self, epochs, lr, discount, exploration_rate, decay_rate=0.9, decay_epoch=200):
+        if is_legacy_file(path_file):
+            w = np.load(path_file)
+            if w.shape != (self.rl_env.get_num_weights(),):
+                raise ValueError('%s has %d weights but %s expects %d!' % (
+                    path_file, w.size, self.rl_env.__class__.__name__, self.rl_env.get_num_weights()))
+            self.w = w
+            self.train_stats = {}
+        else:
+            model = load_model(path_file, self.rl_env, self.board_size)
+            self.w = model.weights
+            self.train_stats = dict(model.stats)
+        if verbose:
+            print('Loaded weights from ' + path_file)
+
+    def get_default_checkpoint_path(self):
+        return '%s.ckpt%s' % (self.__class__.__name__, EXTENSION)
+
+    def train(self, epochs, lr, discount, exploration_rate, decay_rate=0.9, decay_epoch=200,
+              path_checkpoint=None, checkpoint_epoch=50, resume=False, path_metrics=None,
+              opponent_pool=None, snapshot_epoch=0):
         """
-        Use RandomAgent for opponent.
+        Use an OpponentPool for opponent; DEFAULT is minimax with random moves.
         :param epochs: one epoch = one game
         :param lr: learning rate
         :param discount:
         :param exploration_rate: the probability to cause random move during training
         :param decay_rate: the rate to decay learning rate and exploration rate
         :param decay_epoch: the number of epochs to apply decay
+        :param path_checkpoint: where to write checkpoints; DEFAULT is get_default_checkpoint_path()
+        :param checkpoint_epoch: the number of epochs between checkpoints; 0 to disable checkpoints
+        :param resume: if True, continue from path_checkpoint; if a path, continue from that checkpoint;
+                       the hyperparameters must match the checkpoint's, except for a larger number of epochs
+        :param path_metrics: if not None, append per-epoch metrics to this .jsonl (or .csv) file
+        :param opponent_pool: the OpponentPool to sample opponent moves from; it is kept across calls
+        :param snapshot_epoch: the number of epochs between adding snapshots of self to the pool; 0 to disable
         :return:
         """
         if exploration_rate > 1 or exploration_rate < 0:
             raise ValueError('exploration_rate should be in [0, 1]!')
-
-        num_feats = self.rl_env.get_num_feats()
-        self.w = np.random.random(num_feats)
+        if not path_checkpoint:
+            path_checkpoint = self.get_default_checkpoint_path()
+        if opponent_pool is not None:
+            self.opponent_pool = opponent_pool
+        elif self.opponent_pool is None:
+            self.opponent_pool = OpponentPool.create_default(opponent_color(self.color))
+        hyperparams = {'epochs': epochs, 'lr': lr, 'discount': discount, 'exploration_rate': exploration_rate,
+                       'decay_rate': decay_rate, 'decay_epoch': decay_epoch, 'snapshot_epoch': snapshot_epoch}
+
+        start_epoch = 0
+        if resume:
+            path_resume = path_checkpoint if resume is True else resume
+            self.w, state = load_checkpoint(path_resume, self.rl_env, self.board_size, hyperparams)
+            if 'opponent_pool' in state:
+                self.opponent_pool.set_snapshot_state(state['opponent_pool'], self)
+            start_epoch = state['epoch']
+            lr = state['lr']
+            exploration_rate = state['exploration_rate']
+            print('Resume training from epoch %d of %s' % (start_epoch, path_resume))
+        else:
+            num_feats = self.rl_env.get_num_feats()
+            self.w = np.random.random(num_feats)
 
         print('Start training ' + str(self))
-        for epoch in range(epochs):
-            diff_mean = self._train_one_epoch(lr, discount, exploration_rate)
-            # Decay learning rate and exploration rate
-            if epoch % decay_epoch == decay_epoch - 1:
-                lr *= decay_rate
-                exploration_rate *= decay_rate
-                print('Decay learning rate to %f' % lr)
-                print('Decay exploration rate to %f' % exploration_rate)
-            # Echo performance
-            if epoch % 5 == 4:
-                print('Epoch %d: mean difference %f' % (epoch, diff_mean))
+        metrics_writer = MetricsWriter(path_metrics) if path_metrics else None
+        diff_mean = None
+        try:
+            for epoch in range(start_epoch, epochs):
+                stopwatch = Stopwatch()
+                diff_mean, metrics = self._train_one_epoch(lr, discount, exploration_rate, stopwatch)
+                if metrics_writer:
+                    metrics_writer.write(self._get_epoch_record(epoch, stopwatch, diff_mean, metrics,
+                                                                metrics_writer.add_game(metrics['won']),
+                                                                lr, exploration_rate))
+                # Decay learning rate and exploration rate
+                if epoch % decay_epoch == decay_epoch - 1:
+                    lr *= decay_rate
+                    exploration_rate *= decay_rate
+                    print('Decay learning rate to %f' % lr)
+                    print('Decay exploration rate to %f' % exploration_rate)
+                # Echo performance
+                if epoch % 5 == 4:
+                    print('Epoch %d: mean difference %f' % (epoch, diff_mean))
+                if snapshot_epoch and epoch % snapshot_epoch == snapshot_epoch - 1:
+                    print('Add %s to opponent pool' % self.opponent_pool.add_snapshot(self))
+                # Checkpoint the state needed to continue from the next epoch
+                if checkpoint_epoch and (epoch % checkpoint_epoch == checkpoint_epoch - 1 or epoch == epochs - 1):
+                    save_checkpoint(path_checkpoint, self.w, self.rl_env, self.board_size, epoch + 1,
+                                    lr, exploration_rate, hyperparams, {'diff_mean': diff_mean}, self.opponent_pool)
+        finally:
+            # Also on errors and Ctrl-C, so that the metrics of the finished epochs are flushed
+            if metrics_writer:
+                metrics_writer.close()
+        self.train_stats = dict(hyperparams, diff_mean=diff_mean)
         print('Finished training')
 
-    def _train_one_epoch(self, lr, discount, exploration_rate):
-        """Return the mean of difference during this epoch"""
-        # Opponent: minimax with random move
-        prob_oppo_random = 0.4
-        agent_oppo = AlphaBetaAgent(opponent_color(self.color), depth=1)
-        agent_oppo_random = RandomAgent(opponent_color(self.color))
+    def _get_epoch_record(self, epoch, stopwatch, diff_mean, metrics, win_rate, lr, exploration_rate):
+        """Flatten the metrics of one epoch into a record for MetricsWriter."""
+        seconds = stopwatch.elapsed()
+        time_features = stopwatch.totals.get('features', 0.)
+        time_opponent = stopwatch.totals.get('opponent', 0.)
+        time_update = stopwatch.totals.get('update', 0.)
+        return {'epoch': epoch,
+                'env': self.rl_env.__class__.__name__,
+                'seconds': seconds,
+                'games_per_sec': 1. / seconds,
+                'moves': metrics['moves'],
+                'moves_per_sec': metrics['moves'] / seconds,
+                'time_features': time_features,
+                'time_opponent': time_opponent,
+                'time_update': time_update,
+                'time_other': seconds - time_features - time_opponent - time_update,
+                'td_error_mean': float(diff_mean),
+                'td_error_abs_mean': float(metrics['td_error_abs_mean']),
+                'weight_norm': float(np.linalg.norm(self.w)),
+                'weight_max_abs': float(np.max(np.abs(self.w))),
+                'won': int(metrics['won']),
+                'win_rate': win_rate,
+                'lr': lr,
+                'exploration_rate': exploration_rate}
+
+    def _train_one_epoch(self, lr, discount, exploration_rate, stopwatch=None):
+        """
+        Return the mean of difference during this epoch, and a dict of epoch metrics.
+        :param stopwatch: accumulates time spent on 'features', 'opponent' and 'update'
+        """
+        if stopwatch is None:
+            stopwatch = Stopwatch()
+        opponent_pool = self.opponent_pool
 
-        board = Board()
+        board = Board(board_size=self.board_size)
         first_move = (10, 10)
         board.put_stone(first_move, check_legal=False)
 
         if board.next != self.color:
-            board.put_stone(agent_oppo_random.get_action(board), check_legal=False)
+            board.put_stone(opponent_pool.random_agent.get_action(board), check_legal=False)
 
         diffs = []
+        num_moves = 0
         while board.winner is None:
             legal_actions = board.get_legal_actions()
 
-            # Get next action with exploration
-            if random.uniform(0, 1) < exploration_rate:
-                action_next = random.choice(legal_actions)
-            else:
-                action_next = max(legal_actions, key=lambda action: self._calc_q(board, action))
+            with stopwatch.section('features'):
+                # Get next action with exploration
+                if random.uniform(0, 1) < exploration_rate:
+                    action_next = random.choice(legal_actions)
+                else:
+                    action_next = max(legal_actions, key=lambda action: self._calc_q(board, action))
 
-            # Keep current features
-            feats = self.rl_env.extract_features(board, action_next, self.color)
-            q = self.w.dot(feats)
+                # Keep current features
+                feats = self.rl_env.extract_features(board, action_next, self.color)
+                q = self.w.dot(feats)
 
             # Apply next action
             board.put_stone(action_next, check_legal=False)
+            num_moves += 1
 
             # Let opponent play
             if board.winner is None:
-                if random.uniform(0, 1) < prob_oppo_random:
-                    board.put_stone(agent_oppo_random.get_action(board), check_legal=False)
-                else:
-                    board.put_stone(agent_oppo.get_action(board), check_legal=False)
+                with stopwatch.section('opponent'):
+                    _, action_oppo = opponent_pool.get_action(board)
+                board.put_stone(action_oppo, check_legal=False)
+                num_moves += 1
 
             # Calc difference
             reward_now = self.rl_env.get_reward(board, self.color)
             reward_future = 0
             if board.winner is None:
-                next_legal_actions = board.get_legal_actions()
-                next_qs = [self._calc_q(board, action) for action in next_legal_actions]
+                with stopwatch.section('features'):
+                    next_legal_actions = board.get_legal_actions()
+                    next_qs = [self._calc_q(board, action) for action in next_legal_actions]
                 reward_future = max(next_qs)
             difference = reward_now + discount * reward_future - q
             diffs.append(difference)
 
             # Apply weight update
-            self.w += (lr * difference * feats)
+            with stopwatch.section('update'):
+                self.w += (lr * difference * feats)
 
-        return mean(diffs)
+        metrics = {'moves': num_moves,
+                   'won': board.winner == self.color,
+                   'td_error_abs_mean': mean(abs(diff) for diff in diffs)}
+        return mean(diffs), metrics
 
     def _calc_q(self, board, action):
         return self.w.dot(self.rl_env.extract_features(board, action, self.color))
@@ -1,6 +1,7 @@
 from agent.basic_agent import Agent, RandomAgent
 from agent.search.search_agent import AlphaBetaAgent
 from agent.rl.rl_env import RlEnv2
+from agent.rl.model_file import EXTENSION, save_model, load_model, is_legacy_file
 import numpy as np
 from game.go import Board
 from game.go import opponent_color
@@ -9,18 +10,20 @@ from statistics import mean
 
 
 class RlAgent(Agent):
-    def __init__(self, color, rl_env):
+    def __init__(self, color, rl_env, board_size=19):
         super().__init__(color)
         self.rl_env = rl_env
+        self.board_size = board_size
         self.w = None
+        self.train_stats = {}
 
     def get_action(self, board):
         raise NotImplementedError
 
 
 class ApproxQAgent(RlAgent):
-    def __init__(self, color, rl_env):
-        super().__init__(color, rl_env)
+    def __init__(self, color, rl_env, board_size=19):
+        super().__init__(color, rl_env, board_size)
 
     def get_action(self, board):
         if self.w is None:
@@ -33,22 +36,36 @@ class ApproxQAgent(RlAgent):
         return max(legal_actions, key=lambda action: self._calc_q(board, action))
 
     def get_default_path(self):
-        return '%s_%s.npy' % (self.__class__.__name__, self.color)
+        return '%s_%s%s' % (self.__class__.__name__, self.color, EXTENSION)
 
     def save(self, path_file=None):
-        """Save the weight vector."""
+        """Save the weight vector, with a header describing env, board size and training stats."""
         if self.w is not None:
             if not path_file:
                 path_file = self.get_default_path()
-            np.save(path_file, self.w)
+            save_model(path_file, self.w, self.rl_env, self.board_size, self.train_stats)
             print('Saved weights to ' + path_file)
 
-    def load(self, path_file=None):
-        """Load the weight vector."""
+    def load(self, path_file=None, verbose=False):
+        """
+        Load the weight vector; the weights of a model file are memory-mapped read-only.
+        Raw .npy files from older versions are still accepted.
+        """
         if path_file is None:
             path_file = self.get_default_path()
-        self.w = np.load(path_file)
-        print('Loaded weights from ' + path_file)
+        if is_legacy_file(path_file):
+            w = np.load(path_file)
+            if w.shape != (self.rl_env.get_num_weights(),):
+                raise ValueError('%s has %d weights but %s expects %d!' % (
+                    path_file, w.size, self.rl_env.__class__.__name__, self.rl_env.get_num_weights()))
+            self.w = w
+            self.train_stats = {}
+        else:
+            model = load_model(path_file, self.rl_env, self.board_size)
+            self.w = model.weights
+            self.train_stats = dict(model.stats)
+        if verbose:
+            print('Loaded weights from ' + path_file)
 
     def train(self, epochs, lr, discount, exploration_rate, decay_rate=0.9, decay_epoch=500):
         """
@@ -79,6 +96,9 @@ class ApproxQAgent(RlAgent):
             # Echo performance
             if epoch % 5 == 4:
                 print('Epoch %d: mean difference %f' % (epoch, diff_mean))
+        self.train_stats = {'epochs': epochs, 'lr': lr, 'discount': discount,
+                            'exploration_rate': exploration_rate, 'decay_rate': decay_rate,
+                            'decay_epoch': decay_epoch, 'diff_mean': diff_mean}
         print('Finished training')
 
     def _train_one_epoch(self, lr, discount, exploration_rate):
@@ -88,7 +108,7 @@ class ApproxQAgent(RlAgent):
         agent_oppo = AlphaBetaAgent(opponent_color(self.color), depth=1)
         agent_oppo_random = RandomAgent(opponent_color(self.color))
 
-        board = Board()
+        board = Board(board_size=self.board_size)
         first_move = (10, 10)
         board.put_stone(first_move, check_legal=False)
 
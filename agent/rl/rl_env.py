@@ -26,6 +26,11 @@ class RlEnvBase:
     def get_num_feats(cls):
         raise NotImplementedError
 
+    @classmethod
+    def get_num_weights(cls):
+        """Length of the weight vector an agent needs for these features"""
+        return cls.get_num_feats()
+
 
 class RlEnv(RlEnvBase):
     def __init__(self):
@@ -156,6 +161,10 @@ class RlEnv2(RlEnvBase):
     def get_num_feats(cls):
         return 6
     
+    @classmethod
+    def get_num_weights(cls):
+        return cls.get_num_feats() * 2  # Features for self and opponent
+
     @classmethod
     def reverse_features(cls, feat):
         length=cls.get_num_feats()
@@ -210,6 +219,10 @@ class RlEnv3(RlEnvBase):
     def get_num_feats(cls):
         return 9
     
+    @classmethod
+    def get_num_weights(cls):
+        return cls.get_num_feats() * 2  # Features for self and opponent
+
     @classmethod
     def reverse_features(cls, feat):
         length=cls.get_num_feats()
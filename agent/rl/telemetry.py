@@ -0,0 +1,77 @@
+import csv
+import json
+import time
+from collections import deque
+"""
+Structured per-epoch metrics for training rl agents.
+"""
+
+
+class Stopwatch:
+    """Accumulate wall time per named section, e.g. `with stopwatch.section('features'): ...`"""
+    def __init__(self):
+        self.totals = {}
+        self._start = time.perf_counter()
+
+    def section(self, name):
+        return _Section(self, name)
+
+    def add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0.) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+
+class _Section:
+    def __init__(self, stopwatch, name):
+        self.stopwatch = stopwatch
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopwatch.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsWriter:
+    """
+    Append one record per epoch to a JSONL file, or to a CSV file if the path ends with '.csv'.
+    Records should share the same keys when writing CSV; the first record defines the columns.
+    """
+    def __init__(self, path_file, win_rate_window=100):
+        self.path = path_file
+        self.is_csv = path_file.lower().endswith('.csv')
+        self.file = open(path_file, 'a', newline='' if self.is_csv else None)
+        self.csv_writer = None
+        self.wins = deque(maxlen=win_rate_window)
+
+    def add_game(self, won):
+        """Record a game result and return the win rate over the recent window."""
+        self.wins.append(1 if won else 0)
+        return sum(self.wins) / len(self.wins)
+
+    def write(self, record):
+        if self.is_csv:
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.file, fieldnames=list(record.keys()))
+                if self.file.tell() == 0:
+                    self.csv_writer.writeheader()
+            self.csv_writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import timeit
+from statistics import median
+"""
+Startup benchmark: import time per module, headless Board construction and the GUI's time to
+first frame with the dummy SDL drivers. Every import and launch runs in a fresh interpreter.
+Results are written as JSON; with --baseline, exits with status 1 if anything got slower.
+"""
+
+MODULES = ['game.go', 'game.ai', 'game.assets', 'game.ui', 'main',
+           'agent.basic_agent', 'agent.util', 'agent.search.search_agent',
+           'agent.rl.rl_env', 'agent.rl.rl_agent']
+
+# Runs in the child; prints the import time of one module and its slowest dependencies
+_IMPORT_CODE = '''
+import json, sys, time
+start = time.perf_counter()
+import %s
+print(json.dumps({'seconds': time.perf_counter() - start}))
+'''
+
+# Runs in the child; launches the game and exits as soon as the first frame is on the screen,
+# reporting which screen that frame shows
+_FIRST_FRAME_CODE = '''
+import json, os, sys, time
+start = time.perf_counter()
+sys.argv = ['main.py'] + %r
+import main
+from game import startup
+first_frame = startup.first_frame
+def exit_on_first_frame(screen=None):
+    first_frame(screen)
+    print(json.dumps({'seconds': time.perf_counter() - start, 'marks': startup.get_marks(), 'screen': screen}),
+          flush=True)
+    os._exit(0)
+startup.first_frame = exit_on_first_frame
+main.main()
+'''
+
+# name -> (command line arguments, the screen the first frame must show)
+FIRST_FRAME_SCENARIOS = {
+    'menu': ([], 'menu'),  # The welcome screen
+    'game_9': (['--mode', 'PVP', '--size', '9'], 'game'),
+    'game_19': (['--mode', 'PVP', '--size', '19'], 'game'),
+}
+
+
+def get_headless_env():
+    env = dict(os.environ)
+    env['SDL_VIDEODRIVER'] = 'dummy'
+    env['SDL_AUDIODRIVER'] = 'dummy'
+    env['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    env['GO_GAME_AUDIO'] = '0'
+    env.pop('GO_GAME_STARTUP_REPORT', None)
+    return env
+
+
+def run_child(code, args=(), timeout=60):
+    """Run code in a fresh interpreter; return (its last line of output as JSON, wall time in seconds, stderr)."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + list(args) + ['-c', code], capture_output=True, text=True,
+                            env=get_headless_env(), cwd=os.path.dirname(os.path.abspath(__file__)), timeout=timeout)
+    wall = time.perf_counter() - start
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError('Child failed with status %d:\n%s' % (result.returncode, result.stderr))
+    return json.loads(lines[-1]), wall, result.stderr
+
+
+def parse_importtime(stderr, top=5):
+    """Return the top dependencies by self time from the output of python -X importtime."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append({'module': name.strip(), 'self_ms': int(self_us) / 1000.,
+                        'cumulative_ms': int(cumulative_us) / 1000.})
+    entries.sort(key=lambda entry: entry['self_ms'], reverse=True)
+    return entries[:top]
+
+
+def bench_imports(modules, repeats):
+    results = {}
+    for module in modules:
+        seconds = []
+        process_seconds = []
+        slowest = None
+        for i in range(repeats):
+            report, wall, stderr = run_child(_IMPORT_CODE % module, args=['-X', 'importtime'] if i == 0 else [])
+            if i == 0:
+                slowest = parse_importtime(stderr)
+            else:
+                # The first run also pays for -X importtime and cold caches; it is not timed
+                seconds.append(report['seconds'])
+                process_seconds.append(wall)
+        results[module] = {'import_ms': median(seconds) * 1000, 'min_import_ms': min(seconds) * 1000,
+                           'process_ms': median(process_seconds) * 1000, 'slowest_dependencies': slowest}
+        print('import %-28s %8.1f ms' % (module, results[module]['import_ms']), file=sys.stderr)
+    return results
+
+
+def bench_board(repeats):
+    """Time headless Board construction and copying in this process; game.go does not import pygame."""
+    from game.go import Board
+    results = {}
+    for board_size in (9, 13, 19):
+        number = 1000
+        construct = min(timeit.repeat(lambda: Board(board_size=board_size), number=number, repeat=repeats))
+        board = Board(board_size=board_size)
+        copy = min(timeit.repeat(board.copy, number=number, repeat=repeats))
+        results[str(board_size)] = {'construct_us': construct / number * 1e6, 'copy_us': copy / number * 1e6}
+        print('board %-2d construct %7.1f us; copy %7.1f us'
+              % (board_size, results[str(board_size)]['construct_us'], results[str(board_size)]['copy_us']),
+              file=sys.stderr)
+    return results
+
+
+def bench_first_frame(repeats):
+    results = {}
+    for name, (argv, screen) in FIRST_FRAME_SCENARIOS.items():
+        seconds = []
+        process_seconds = []
+        marks = None
+        for _ in range(repeats + 1):
+            report, wall, _ = run_child(_FIRST_FRAME_CODE % argv)
+            if report.get('screen') != screen:
+                raise RuntimeError('First frame scenario %s reached the %s screen instead of the %s screen'
+                                   % (name, report.get('screen'), screen))
+            seconds.append(report['seconds'])
+            process_seconds.append(wall)
+            marks = report['marks']
+        # Drop the first launch, which warms the OS file cache and the font path cache
+        seconds, process_seconds = seconds[1:], process_seconds[1:]
+        results[name] = {'first_frame_ms': median(seconds) * 1000, 'process_ms': median(process_seconds) * 1000,
+                         'marks': {mark: seconds * 1000 for mark, seconds in marks}}
+        print('first frame %-10s %8.1f ms (process %.1f ms)'
+              % (name, results[name]['first_frame_ms'], results[name]['process_ms']), file=sys.stderr)
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    """Return descriptions of the timings more than tolerance (a fraction) slower than in baseline."""
+    regressions = []
+    checks = [('imports', 'import_ms'), ('board', 'construct_us'), ('first_frame', 'first_frame_ms')]
+    for section, metric in checks:
+        for name, result in results.get(section, {}).items():
+            old = baseline.get(section, {}).get(name, {}).get(metric)
+            if old and result[metric] > old * (1 + tolerance):
+                regressions.append('%s %s %s: %.1f -> %.1f' % (section, name, metric, old, result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark startup and import times')
+    parser.add_argument('-o', '--output', default=None, help='write the JSON results to this file; DEFAULT is stdout')
+    parser.add_argument('-n', '--repeats', type=int, default=5, help='runs per measurement; DEFAULT is 5')
+    parser.add_argument('-m', '--modules', nargs='*', default=MODULES, help='modules to time the import of')
+    parser.add_argument('--no-gui', action='store_true', help='skip the time to first frame')
+    parser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against the baseline as a fraction; DEFAULT is 0.2')
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error('--repeats must be at least 1')
+
+    results = {'python': sys.version.split()[0], 'platform': sys.platform,
+               'imports': bench_imports(args.modules, args.repeats + 1),
+               'board': bench_board(args.repeats)}
+    if not args.no_gui:
+        results['first_frame'] = bench_first_frame(args.repeats)
+
+    if args.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('Regression: ' + regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import math
+import random
+from functools import lru_cache
+from game.go import opponent_color
+"""
+The built-in AI used by the GUI. choose_move() only reads the board it is given,
+so it can run on a copy of the board in a worker thread or process.
+"""
+
+EDGE_PENALTY = 5  # Subtracted for moves on the two outermost lines
+CAPTURE_BONUS = 10  # Added per opponent group a move captures
+NEARBY_BONUS = 2  # Added per stone among the 8 surrounding points
+
+
+@lru_cache(maxsize=None)
+def get_position_table(board_size):
+    """
+    Return the positional value of every point: closeness to the center (territory control)
+    minus the edge penalty. Computed once per board size.
+    :return: tuple of tuples, indexed [x][y]
+    """
+    center = board_size // 2
+    table = []
+    for x in range(board_size):
+        column = []
+        for y in range(board_size):
+            value = board_size - math.sqrt((x - center) ** 2 + (y - center) ** 2)
+            if x < 2 or x > board_size - 3 or y < 2 or y > board_size - 3:
+                value -= EDGE_PENALTY
+            column.append(value)
+        table.append(tuple(column))
+    return tuple(table)
+
+
+def get_capturing_moves(board, color):
+    """
+    Return {point: number of groups of color captured by playing point}. Each chain is scanned once:
+    a chain in atari is captured by a move on its last liberty.
+    """
+    captures = {}
+    checked = set()
+    for x in range(board.size):
+        for y in range(board.size):
+            if (x, y) in checked or board.board[x][y] != color:
+                continue
+            group = board._get_group(x, y)
+            checked.update(group)
+            liberties = set()
+            for gx, gy in group:
+                for nx, ny in board._get_neighbors(gx, gy):
+                    if board.board[nx][ny] is None:
+                        liberties.add((nx, ny))
+                if len(liberties) > 1:
+                    break
+            if len(liberties) == 1:
+                point = liberties.pop()
+                captures[point] = captures.get(point, 0) + 1
+    return captures
+
+
+def evaluate_move(board, point, color, captures=None):
+    """
+    Evaluate the strategic value of a potential move.
+    :param captures: the result of get_capturing_moves() for the opponent, if already known;
+                     otherwise only the chains next to point are examined
+    """
+    if not board.is_valid_move(point):
+        return float('-inf')
+
+    x, y = point
+    score = 0
+
+    # Proximity to existing stones (encourage clustering)
+    nearby_stones = 0
+    for nx in range(max(0, x - 1), min(board.size, x + 2)):
+        column = board.board[nx]
+        for ny in range(max(0, y - 1), min(board.size, y + 2)):
+            if column[ny] is not None and (nx, ny) != point:
+                nearby_stones += 1
+    score += nearby_stones * NEARBY_BONUS
+
+    # Potential stone capture
+    if captures is None:
+        board.board[x][y] = color
+        try:
+            num_captured = len(board._find_captured_neighbors(x, y, opponent_color(color)))
+        finally:
+            board.board[x][y] = None
+    else:
+        num_captured = captures.get(point, 0)
+    score += num_captured * CAPTURE_BONUS
+
+    # Territory control and edge penalty
+    score += get_position_table(board.size)[x][y]
+
+    return score
+
+
+def choose_move(board):
+    """
+    Advanced AI player with strategic move selection.
+    :return: the point to play for board.next, or None to pass
+    """
+    # Find all valid moves, in board order so that ties are broken as before
+    valid_moves = sorted(board.get_legal_moves())
+
+    if not valid_moves:
+        return None
+
+    # Determine current player color
+    current_color = board.next
+    captures = get_capturing_moves(board, opponent_color(current_color))
+
+    # Rank moves by strategic value
+    ranked_moves = [(move, evaluate_move(board, move, current_color, captures)) for move in valid_moves]
+    ranked_moves.sort(key=lambda x: x[1], reverse=True)
+
+    # Select top moves, with some randomness to prevent predictability
+    top_moves = ranked_moves[:max(3, len(ranked_moves) // 2)]
+    return random.choice(top_moves)[0]
@@ -0,0 +1,112 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import pygame
+"""
+Compute AI moves off the UI thread. Results are delivered as AI_MOVE_DONE_EVENT on the pygame event queue.
+"""
+
+# Posted when a requested AI move is ready; event.move is the point, or None to pass
+AI_MOVE_DONE_EVENT = pygame.USEREVENT + 3
+
+
+class AIWorker:
+    def __init__(self, choose_move, ponder=False, use_processes=False):
+        """
+        :param choose_move: function(board) -> point or None; must be picklable if use_processes
+        :param ponder: if True, guess the opponent's move while they think and prepare the reply
+        :param use_processes: compute in a process pool instead of a thread pool
+        """
+        self.choose_move = choose_move
+        self.ponder_enabled = ponder
+        if use_processes:
+            # Imported on demand; multiprocessing is not needed for the default thread pool
+            from concurrent.futures import ProcessPoolExecutor
+            executor_cls = ProcessPoolExecutor
+        else:
+            executor_cls = ThreadPoolExecutor
+        self.executor = executor_cls(max_workers=2)  # One for the requested move, one for pondering
+        self.lock = threading.Lock()
+        self.generation = 0  # Bumped by cancel(); results of older generations are dropped
+        self.future = None
+        self.ponder_future = None  # Resolves to (predicted opponent move, position after it, reply)
+
+    @property
+    def busy(self):
+        return self.future is not None
+
+    def request_move(self, board):
+        """Start computing the move for board.next; AI_MOVE_DONE_EVENT is posted when it is ready."""
+        with self.lock:
+            generation = self.generation
+        future = self._take_ponder_hit(board)
+        if future is None:
+            self._cancel_ponder()
+            future = self.executor.submit(self.choose_move, board.copy())
+        self.future = future
+        future.add_done_callback(lambda f: self._post_result(f, generation))
+
+    def ponder(self, board):
+        """While the opponent (board.next) thinks, predict their move and compute the reply to it."""
+        if not self.ponder_enabled:
+            return
+        self._cancel_ponder()
+        self.ponder_future = self.executor.submit(_ponder, self.choose_move, board.copy())
+
+    def cancel(self):
+        """Drop the pending move and pondering, e.g. on Restart or Home; running computations finish unused."""
+        with self.lock:
+            self.generation += 1
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+        self._cancel_ponder()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+
+    def _take_ponder_hit(self, board):
+        """Return a future of the pondered reply if the opponent played the predicted move."""
+        future = self.ponder_future
+        if future is None or future.cancelled():
+            return None
+        if not future.done():
+            # Pondering is still guessing; only wait for it if the guess can be checked now
+            return None
+        predicted_move, position, reply = future.result()
+        if predicted_move is None or board.last_move != predicted_move or position != board.board:
+            return None
+        self.ponder_future = None
+        hit = Future()
+        hit.set_result(reply)
+        return hit
+
+    def _cancel_ponder(self):
+        if self.ponder_future is not None:
+            self.ponder_future.cancel()
+            self.ponder_future = None
+
+    def _post_result(self, future, generation):
+        with self.lock:
+            if future.cancelled() or generation != self.generation:
+                return
+        if self.future is future:
+            self.future = None
+        if future.exception() is not None:
+            print('AI move failed: %s' % future.exception())
+            move = None
+        else:
+            move = future.result()
+        pygame.event.post(pygame.event.Event(AI_MOVE_DONE_EVENT, move=move, generation=generation))
+
+
+def _ponder(choose_move, board):
+    """Return the predicted opponent move, the position after it, and the reply to that position."""
+    predicted_move = choose_move(board)
+    if predicted_move is None:
+        return None, None, None
+    success, _ = board.put_stone(predicted_move)
+    if not success:
+        return None, None, None
+    return predicted_move, [row[:] for row in board.board], choose_move(board)
+
@@ -0,0 +1,93 @@
+"""
+Non-blocking animations for the GUI. Tweens are queued and advanced by the frame clock
+of the main loop, so animating never sleeps and never blocks input.
+"""
+
+
+class Tween:
+    def __init__(self, kind, points, color, start, end, duration):
+        """
+        Interpolate a value (e.g. a stone radius) for a set of board points.
+        :param kind: 'place' or 'remove'; tweens of kind 'remove' started in the same frame are coalesced
+        :param points: list of board points the tween draws
+        :param color: the stone color to draw
+        :param start: the value at the beginning
+        :param end: the value at the end
+        :param duration: in ms
+        """
+        self.kind = kind
+        self.points = list(points)
+        self.color = color
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.elapsed = 0
+
+    @property
+    def done(self):
+        return self.elapsed >= self.duration
+
+    @property
+    def value(self):
+        if self.duration <= 0:
+            return self.end
+        t = min(1., self.elapsed / self.duration)
+        return self.start + (self.end - self.start) * t
+
+    def discard(self, points):
+        """Stop drawing these points, e.g. because a newer tween draws them."""
+        self.points = [point for point in self.points if point not in points]
+
+
+class Animator:
+    def __init__(self, draw_frame):
+        """
+        :param draw_frame: function(tween) that draws the current frame of a tween
+        """
+        self.draw_frame = draw_frame
+        self.tweens = []
+
+    @property
+    def active(self):
+        return len(self.tweens) > 0
+
+    def add(self, tween):
+        """Queue a tween; it is drawn from the next update() on."""
+        points = set(tween.points)
+        for other in self.tweens:
+            other.discard(points)
+        # Coalesce simultaneous captures into one tween
+        if tween.kind == 'remove':
+            for other in self.tweens:
+                if other.kind == 'remove' and other.elapsed == 0 and other.color == tween.color \
+                        and other.duration == tween.duration:
+                    other.points.extend(tween.points)
+                    return other
+        self.tweens.append(tween)
+        return tween
+
+    def show(self, tween):
+        """Draw the final frame of a tween right away, replacing queued animations of its points."""
+        points = set(tween.points)
+        for other in self.tweens:
+            other.discard(points)
+        tween.elapsed = tween.duration
+        self.draw_frame(tween)
+
+    def update(self, dt):
+        """Advance all tweens by dt ms and draw them; finished tweens draw their final frame and are dropped."""
+        for tween in self.tweens:
+            tween.elapsed += dt
+            self.draw_frame(tween)
+        self.tweens = [tween for tween in self.tweens if not tween.done and tween.points]
+
+    def finish_all(self):
+        """Skip to the end of all animations."""
+        for tween in self.tweens:
+            tween.elapsed = tween.duration
+            self.draw_frame(tween)
+        self.tweens = []
+
+    def clear(self):
+        """Drop all animations without drawing, e.g. when the whole board is redrawn."""
+        self.tweens = []
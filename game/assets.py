@@ -0,0 +1,131 @@
+import json
+import os
+import pygame
+import pygame.gfxdraw
+"""
+Process-wide caches for images, fonts, rendered text and stone sprites used by the GUI,
+so that drawing a frame neither touches the disk nor allocates new surfaces.
+"""
+
+MAX_CACHED_TEXTS = 1024
+CAPTURED = 'captured'  # Sprite color of a stone being removed
+_SPRITE_COLORS = {'black': (0, 0, 0), 'white': (255, 255, 255), CAPTURED: (128, 128, 128)}
+
+# Resolved system font files, kept across runs so later launches skip pygame's font directory scan
+FONT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'go-game', 'fonts.json')
+
+_images = {}
+_fonts = {}
+_font_paths = None
+_texts = {}
+_stones = {}
+
+
+def load_image(path, size=None, convert=False):
+    """
+    Load an image once; later calls return the same surface.
+    Callers that draw onto the image must draw onto a copy.
+    :param size: if not None, the image scaled to (width, height)
+    :param convert: convert to the display format; requires the display to be initialized
+    """
+    key = (path, size, convert)
+    if key not in _images:
+        if size is not None:
+            image = pygame.transform.scale(load_image(path, convert=convert), size)
+        else:
+            image = pygame.image.load(path)
+            if convert:
+                image = image.convert()
+        _images[key] = image
+    return _images[key]
+
+
+def get_font(name, size, bold=False):
+    """
+    Return the system font like pygame.font.SysFont, but loaded from its cached file path.
+    Fonts that are not installed fall back to pygame's default font.
+    """
+    key = (name, size, bold)
+    if key not in _fonts:
+        path, synthetic_bold = get_font_path(name, bold)
+        if path is not None and not os.path.exists(path):
+            # The font was uninstalled since it was cached
+            path, synthetic_bold = get_font_path(name, bold, refresh=True)
+        font = pygame.font.Font(path, size)
+        if synthetic_bold:
+            font.set_bold(True)
+        _fonts[key] = font
+    return _fonts[key]
+
+
+def get_font_path(name, bold=False, refresh=False):
+    """
+    Resolve a system font to its file, scanning the installed fonts only if it is not in FONT_CACHE_FILE.
+    :return: (path or None for pygame's default font, whether bold has to be synthesized)
+    """
+    global _font_paths
+    if _font_paths is None:
+        _font_paths = _read_font_cache()
+    key = '%s:%s' % (name.lower(), 'bold' if bold else 'regular')
+    if refresh or key not in _font_paths:
+        path = pygame.font.match_font(name, bold=bold)
+        # Like SysFont, fake the bold style if there is no bold variant
+        synthetic_bold = bold and (path is None or path == pygame.font.match_font(name))
+        _font_paths[key] = [path, synthetic_bold]
+        _write_font_cache(_font_paths)
+    path, synthetic_bold = _font_paths[key]
+    return path, synthetic_bold
+
+
+def _read_font_cache():
+    try:
+        with open(FONT_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_font_cache(font_paths):
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_FILE), exist_ok=True)
+        tmp = FONT_CACHE_FILE + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(font_paths, f)
+        os.replace(tmp, FONT_CACHE_FILE)
+    except OSError as e:
+        print('Could not write the font cache: %s' % e)
+
+
+def render_text(font, text, color, antialias=True):
+    """Render text with font, memoized by (font, text, color)."""
+    key = (font, text, color, antialias)
+    surface = _texts.get(key)
+    if surface is None:
+        if len(_texts) >= MAX_CACHED_TEXTS:
+            _texts.clear()
+        surface = font.render(text, antialias, color)
+        _texts[key] = surface
+    return surface
+
+
+def get_stone(radius, color):
+    """
+    Return a pre-rendered anti-aliased stone of the given radius, centered in a transparent square
+    of side 2 * radius + 1. White stones get a black outline.
+    :param color: 'black', 'white' or CAPTURED
+    """
+    key = (radius, color)
+    if key not in _stones:
+        size = 2 * radius + 1
+        surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        rgb = _SPRITE_COLORS[color]
+        pygame.gfxdraw.filled_circle(surface, radius, radius, radius, rgb)
+        pygame.gfxdraw.aacircle(surface, radius, radius, radius, (0, 0, 0) if color == 'white' else rgb)
+        _stones[key] = surface
+    return _stones[key]
+
+
+def blit_stone(screen, center, radius, color):
+    """Blit the stone sprite centered at the pixel center; return the affected rect."""
+    sprite = get_stone(radius, color)
+    return screen.blit(sprite, (center[0] - radius, center[1] - radius))
@@ -0,0 +1,96 @@
+import os
+import pygame
+"""
+Process-wide audio service. The mixer is initialized on first use and kept for the whole process,
+so new games reuse it instead of opening the audio device again. Background music is streamed
+from its file by pygame.mixer.music rather than decoded into memory.
+Audio is disabled with GO_GAME_AUDIO=0, and in headless runs (SDL_VIDEODRIVER=dummy).
+"""
+
+AUDIO_ENV = 'GO_GAME_AUDIO'
+MIXER_BUFFER = 2048  # Samples; larger buffers are cheaper to open and music does not need low latency
+
+_audio = None
+
+
+class AudioService:
+    def __init__(self, enabled=True):
+        """
+        :param enabled: if False, nothing ever touches the mixer or the audio device
+        """
+        self.enabled = enabled
+        self.music_file = None  # The music currently streamed
+        self.paused = False  # Paused by the user; kept across games
+
+    @property
+    def playing(self):
+        """Return True if music is audible (loaded and not paused)."""
+        return self.enabled and self.music_file is not None and not self.paused
+
+    def play_music(self, path_file, volume=0.5):
+        """
+        Stream path_file in a loop, unless it is already streaming or the user paused the music.
+        :return: True if the music is playing
+        """
+        if not self.enabled or self.music_file == path_file:
+            return self.playing
+        if not self._init_mixer():
+            return False
+        try:
+            pygame.mixer.music.load(path_file)
+            pygame.mixer.music.set_volume(volume)
+            pygame.mixer.music.play(-1)  # Loop indefinitely
+            if self.paused:
+                pygame.mixer.music.pause()
+            self.music_file = path_file
+        except pygame.error as e:
+            print(f"Error loading music: {e}")
+            self.music_file = None
+        return self.playing
+
+    def toggle_music(self):
+        """Pause or resume the music; return True if it is playing afterwards."""
+        if not self.enabled or self.music_file is None:
+            return False
+        if self.paused:
+            pygame.mixer.music.unpause()
+        else:
+            pygame.mixer.music.pause()
+        self.paused = not self.paused
+        return self.playing
+
+    def disable(self):
+        """Stop any music and keep the audio device closed from now on."""
+        self.shutdown()
+        self.enabled = False
+
+    def shutdown(self):
+        if pygame.mixer.get_init():
+            pygame.mixer.music.stop()
+            pygame.mixer.quit()
+        self.music_file = None
+
+    def _init_mixer(self):
+        if pygame.mixer.get_init():
+            return True
+        try:
+            pygame.mixer.init(buffer=MIXER_BUFFER)
+            return True
+        except pygame.error as e:
+            print(f"Audio is not available: {e}")
+            self.enabled = False
+            return False
+
+
+def is_audio_enabled_by_default():
+    if os.environ.get(AUDIO_ENV) == '0':
+        return False
+    return os.environ.get('SDL_VIDEODRIVER') != 'dummy'
+
+
+def get_audio():
+    """Return the audio service of this process, created on first use."""
+    global _audio
+    if _audio is None:
+        _audio = AudioService(enabled=is_audio_enabled_by_default())
+    return _audio
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import struct
 from copy import deepcopy
 from game.util import PointDict
 """
@@ -7,6 +8,17 @@ This file is the full backend environment of the game.
 
 BOARD_SIZE = 20  # number of rows/cols = BOARD_SIZE - 1
 
+# Board.to_bytes(): header | stones, 2 bits per point | moves, uint16 each
+SNAPSHOT_VERSION = 1
+# version, size, next, passes, ko x, ko y, last move x, last move y, winner, komi,
+# black captures, white captures, counter_move, number of moves; -1 stands for no point
+_SNAPSHOT_HEADER = struct.Struct('<BBBBbbbbBfIIII')
+_COLOR_CODES = {None: '0', 'black': '1', 'white': '2'}
+_COLORS = (None, 'black', 'white')
+_BIT_PAIRS = {('0', '0'): None, ('0', '1'): 'black', ('1', '0'): 'white'}
+_MOVE_PASS = 0x7FFF
+_MOVE_WHITE = 0x8000
+
 
 def opponent_color(color):
     """
@@ -22,6 +34,15 @@ def opponent_color(color):
         raise ValueError("Invalid color")
 
 
+def _decode_snapshot_point(x, y, size, name):
+    """Return the point (x, y) of a board snapshot, or None for (-1, -1); raise ValueError if it is off the board."""
+    if x == -1 and y == -1:
+        return None
+    if not (0 <= x < size and 0 <= y < size):
+        raise ValueError('Invalid %s in board snapshot' % name)
+    return x, y
+
+
 def neighbors(point, board_size):
     """Return a list of neighboring points."""
     neighboring = [(point[0] - 1, point[1]),
@@ -38,6 +59,18 @@ def cal_liberty(points, board):
     return set(liberties)
 
 
+_neighbor_tables = {}
+
+
+def get_neighbor_table(board_size):
+    """Return table[x][y] = tuple of the points next to (x, y), computed once per board size."""
+    if board_size not in _neighbor_tables:
+        _neighbor_tables[board_size] = [[tuple((x + dx, y + dy) for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                                               if 0 <= x + dx < board_size and 0 <= y + dy < board_size)
+                                         for y in range(board_size)] for x in range(board_size)]
+    return _neighbor_tables[board_size]
+
+
 class Group(object):
     def __init__(self, point, color, liberties):
         """
@@ -98,12 +131,20 @@ class Board(object):
         self.last_board_state = None  # For ko rule checking
         self.passes = 0  # Count consecutive passes for game end
         self.captured_stones = {'black': 0, 'white': 0}  # Count captured stones
+        self.moves = []  # History of (color, point) in the order played; point is None for a pass
+        self.history = []  # The change made by each move, for undo(); see _record_move()
+        self.redo_history = []  # Changes undone and not yet redone, the most recently undone last
+        self.version = 0  # Incremented on every change of the position, e.g. as a cache key
+        self.neighbor_table = get_neighbor_table(board_size)
 
         # Set komi to 6.5 for all board sizes
         self.komi = 6.5
 
     def is_valid_move(self, point):
-        """Check if a move is valid according to Go rules."""
+        """
+        Check if a move is valid according to Go rules.
+        Only the chains next to the point are examined, so this is cheap even on a full board.
+        """
         x, y = point
         
         # Check basic validity
@@ -116,27 +157,30 @@ class Board(object):
         if point == self.ko_point:
             return False
             
-        # Try the move
-        self.board[x][y] = self.next
-        
-        # Check if the move captures any opponent stones
-        opponent = self._get_opponent_color()
-        captured_groups = self._find_captured_groups(opponent)
-        
-        if captured_groups:
-            # Move is valid if it captures opponent stones
-            self.board[x][y] = None
-            return True
+        # A stone with an empty neighbor always has a liberty
+        for nx, ny in self._get_neighbors(x, y):
+            if self.board[nx][ny] is None:
+                return True
             
-        # If no captures, check if the move is suicide
-        own_group = self._get_group(x, y)
-        if self._count_liberties(own_group) == 0:
-            # Move is suicide
+        # Otherwise the move is valid if it captures or connects to a chain with another liberty
+        return not self.is_suicide(point)
+
+    def is_suicide(self, point):
+        """Return True if playing point for the next player would leave its chain without liberties."""
+        x, y = point
+        self.board[x][y] = self.next
+        try:
+            # Moves that capture opponent stones are never suicide
+            if self._find_captured_neighbors(x, y, self._get_opponent_color()):
+                return False
+            return not self._has_liberty(self._get_group(x, y))
+        finally:
             self.board[x][y] = None
-            return False
-            
-        self.board[x][y] = None
-        return True
+
+    def get_legal_moves(self):
+        """Return the set of points the next player may play."""
+        return {(x, y) for x in range(self.size) for y in range(self.size)
+                if self.board[x][y] is None and self.is_valid_move((x, y))}
 
     def put_stone(self, point):
         """Place a stone and handle captures."""
@@ -144,6 +188,7 @@ class Board(object):
             return False, []  # Return False and empty list of captured points
 
         x, y = point
+        before = (self.ko_point, self.passes, self.last_move)
         self.passes = 0  # Reset pass counter
         
         # Store current board state for ko rule
@@ -153,21 +198,13 @@ class Board(object):
         self.board[x][y] = self.next
         opponent = self._get_opponent_color()
         
-        # Find and remove captured opponent groups
+        # Find and remove captured opponent groups; only chains next to the stone can lose their last liberty
         captured_points = []
-        captured_groups = self._find_captured_groups(opponent)
+        captured_groups = self._find_captured_neighbors(x, y, opponent)
         for group in captured_groups:
             captured_points.extend(group)
             self._remove_group(group)
         
-        # If no opponent stones were captured, check if the placed stone's group is captured
-        if not captured_points:
-            own_group = self._get_group(x, y)
-            if self._count_liberties(own_group) == 0:
-                # Move is suicide, not allowed
-                self.board[x][y] = None
-                return False, []
-        
         # Update captured stones count
         self.captured_stones[self.next.lower()] += len(captured_points)
         
@@ -179,6 +216,7 @@ class Board(object):
             self.ko_point = captured_points[0]
         
         self.last_move = point
+        self._record_move(point, captured_points, before)
         self.next = opponent
         self.counter_move += 1
         
@@ -186,6 +224,7 @@ class Board(object):
 
     def pass_move(self):
         """Pass the current turn."""
+        before = (self.ko_point, self.passes, self.last_move)
         # Reset consecutive passes if the last move wasn't a pass
         if self.last_move is not None:  # There was a stone placed last turn
             self.passes = 0
@@ -194,6 +233,7 @@ class Board(object):
         # Store this pass as the last move
         self.last_move = None
         self.ko_point = None
+        self._record_move(None, [], before)
         
         # Switch to next player
         self.next = opponent_color(self.next)
@@ -201,6 +241,81 @@ class Board(object):
         # Return True if both players passed consecutively
         return self.passes >= 2
 
+    def _record_move(self, point, captured_points, before):
+        """
+        Record the move of self.next as a change that undo() and redo() apply in O(1) per stone:
+        (color, point, captured points, (ko point, passes, last move) before, the same after).
+        A new move discards the moves undone before it.
+        """
+        after = (self.ko_point, self.passes, self.last_move)
+        self.moves.append((self.next, point))
+        self.history.append((self.next, point, tuple(captured_points), before, after))
+        if self.redo_history:
+            self.redo_history = []
+        self.version += 1
+
+    def undo(self):
+        """
+        Take back the last move.
+        :return: the change undone (see _record_move()), or None if there is no move to undo
+        """
+        if not self.history:
+            return None
+        change = self.history.pop()
+        color, point, captured_points, before, _ = change
+        if point is not None:
+            opponent = opponent_color(color)
+            self.board[point[0]][point[1]] = None
+            for x, y in captured_points:
+                self.board[x][y] = opponent
+            self.captured_stones[color] -= len(captured_points)
+            self.counter_move -= 1
+        self.ko_point, self.passes, self.last_move = before
+        self.next = color
+        self.moves.pop()
+        self.redo_history.append(change)
+        self.version += 1
+        return change
+
+    def redo(self):
+        """
+        Play the last move undone again.
+        :return: the change redone, or None if there is no move to redo
+        """
+        if not self.redo_history:
+            return None
+        change = self.redo_history.pop()
+        color, point, captured_points, _, after = change
+        if point is not None:
+            self.board[point[0]][point[1]] = color
+            for x, y in captured_points:
+                self.board[x][y] = None
+            self.captured_stones[color] += len(captured_points)
+            self.counter_move += 1
+        self.ko_point, self.passes, self.last_move = after
+        self.next = opponent_color(color)
+        self.moves.append((color, point))
+        self.history.append(change)
+        self.version += 1
+        return change
+
+    def jump_to(self, num_moves):
+        """
+        Undo or redo moves until num_moves moves are played, or as far as the history goes.
+        :return: the set of points whose stones changed
+        """
+        changed = set()
+        while len(self.moves) > num_moves and self.history:
+            _, point, captured_points, _, _ = self.undo()
+            changed.update(captured_points)
+            changed.add(point)
+        while len(self.moves) < num_moves and self.redo_history:
+            _, point, captured_points, _, _ = self.redo()
+            changed.update(captured_points)
+            changed.add(point)
+        changed.discard(None)
+        return changed
+
     def get_score(self):
         """Calculate the score using territory scoring rules."""
         territory = {'black': 0, 'white': 0}
@@ -229,12 +344,7 @@ class Board(object):
 
     def _get_neighbors(self, x, y):
         """Get valid neighboring points."""
-        neighbors = []
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.size and 0 <= ny < self.size:
-                neighbors.append((nx, ny))
-        return neighbors
+        return self.neighbor_table[x][y]
 
     def _get_group(self, x, y):
         """Get all connected stones of the same color."""
@@ -262,6 +372,42 @@ class Board(object):
                     liberties.add((nx, ny))
         return len(liberties)
 
+    def _has_liberty(self, group):
+        """Return True if the group has at least one liberty; stops at the first one found."""
+        for x, y in group:
+            for nx, ny in self._get_neighbors(x, y):
+                if self.board[nx][ny] is None:
+                    return True
+        return False
+
+    def _find_captured_neighbors(self, x, y, color):
+        """Find the groups of the given color next to (x, y) that have no liberties."""
+        captured = []
+        for nx, ny in self._get_neighbors(x, y):
+            if self.board[nx][ny] == color and not any((nx, ny) in group for group in captured):
+                group = self._get_group_without_liberty(nx, ny)
+                if group is not None:
+                    captured.append(list(group))
+        return captured
+
+    def _get_group_without_liberty(self, x, y):
+        """Return the group at (x, y) if it has no liberties, else None; stops at the first liberty found."""
+        board = self.board
+        table = self.neighbor_table
+        color = board[x][y]
+        group = {(x, y)}
+        frontier = [(x, y)]
+        while frontier:
+            cx, cy = frontier.pop()
+            for nx, ny in table[cx][cy]:
+                stone = board[nx][ny]
+                if stone is None:
+                    return None
+                if stone == color and (nx, ny) not in group:
+                    group.add((nx, ny))
+                    frontier.append((nx, ny))
+        return group
+
     def _find_captured_groups(self, color):
         """Find all groups of the given color that have been captured."""
         captured = []
@@ -310,6 +456,84 @@ class Board(object):
         """Return the current board state."""
         return [row[:] for row in self.board]
 
+    def to_bytes(self, history=True):
+        """
+        Encode the position compactly, e.g. 120 bytes for an empty 19x19 board plus 2 bytes per move,
+        cheap enough to snapshot after every move.
+        :param history: include the moves played; without them the snapshot has a fixed size
+        """
+        size = self.size
+        codes = _COLOR_CODES
+        digits = ''.join([codes[color] for column in self.board[:size] for color in column[:size]])
+        ko_x, ko_y = self.ko_point if self.ko_point is not None else (-1, -1)
+        last_x, last_y = self.last_move if self.last_move is not None else (-1, -1)
+        moves = self.moves if history else []
+        header = _SNAPSHOT_HEADER.pack(SNAPSHOT_VERSION, size, self.next == 'white', self.passes, ko_x, ko_y,
+                                       last_x, last_y, _COLORS.index(self.winner), self.komi,
+                                       self.captured_stones['black'], self.captured_stones['white'],
+                                       self.counter_move, len(moves))
+        stones = int(digits, 4).to_bytes((2 * size * size + 7) // 8, 'little')
+        move_codes = [(_MOVE_PASS if point is None else point[0] * size + point[1]) | (_MOVE_WHITE if color == 'white'
+                      else 0) for color, point in moves]
+        return header + stones + struct.pack('<%dH' % len(move_codes), *move_codes)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Decode a position encoded by to_bytes(); raise ValueError if data is not a valid snapshot.
+        The moves are restored for the record, but undo() cannot go back past the decoded position.
+        """
+        data = bytes(data)
+        if len(data) < _SNAPSHOT_HEADER.size:
+            raise ValueError('Board snapshot too short')
+        (version, size, white_next, passes, ko_x, ko_y, last_x, last_y, winner, komi,
+         captured_black, captured_white, counter_move, num_moves) = _SNAPSHOT_HEADER.unpack_from(data)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError('Unsupported board snapshot version %d' % version)
+        num_stone_bytes = (2 * size * size + 7) // 8
+        if len(data) != _SNAPSHOT_HEADER.size + num_stone_bytes + 2 * num_moves:
+            raise ValueError('Board snapshot has a wrong length')
+        if white_next > 1 or winner >= len(_COLORS) or komi != komi or abs(komi) == float('inf'):
+            raise ValueError('Invalid header in board snapshot')
+        board = cls(board_size=size, next_color='white' if white_next else 'black')
+        offset = _SNAPSHOT_HEADER.size
+        bits = format(int.from_bytes(data[offset:offset + num_stone_bytes], 'little'), '0%db' % (2 * size * size))
+        if len(bits) != 2 * size * size:
+            raise ValueError('Invalid stone in board snapshot')  # Padding bits are set
+        # Point i is the base-4 digit i: bit pair 2i (high), 2i + 1 (low)
+        try:
+            colors = [_BIT_PAIRS[pair] for pair in zip(bits[0::2], bits[1::2])]
+        except KeyError:
+            raise ValueError('Invalid stone in board snapshot')
+        for x in range(size):
+            board.board[x][:size] = colors[x * size:(x + 1) * size]
+        board.passes = passes
+        board.ko_point = _decode_snapshot_point(ko_x, ko_y, size, 'ko point')
+        board.last_move = _decode_snapshot_point(last_x, last_y, size, 'last move')
+        board.winner = _COLORS[winner]
+        board.komi = komi
+        board.captured_stones = {'black': captured_black, 'white': captured_white}
+        board.counter_move = counter_move
+        offset += num_stone_bytes
+        for code in struct.unpack_from('<%dH' % num_moves, data, offset):
+            color = 'white' if code & _MOVE_WHITE else 'black'
+            code &= _MOVE_PASS
+            if code != _MOVE_PASS and code >= size * size:
+                raise ValueError('Invalid move in board snapshot')
+            board.moves.append((color, None if code == _MOVE_PASS else divmod(code, size)))
+        return board
+
+    def copy(self):
+        """Return an independent copy of the board; much cheaper than deepcopy."""
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.board = [row[:] for row in self.board]
+        board.captured_stones = dict(self.captured_stones)
+        board.moves = list(self.moves)
+        board.history = list(self.history)
+        board.redo_history = list(self.redo_history)
+        return board
+
     def __str__(self):
         """String representation of the board."""
         rows = []
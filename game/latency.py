@@ -0,0 +1,41 @@
+import math
+from collections import deque
+"""
+Latency statistics over a sliding window of samples, shared by the game server and the load tester.
+"""
+
+WINDOW = 10000  # Samples kept for the percentiles; the count and mean cover all samples
+
+
+def percentile(sorted_values, q):
+    """Return the q-th percentile (0 <= q <= 100) of sorted values by the nearest-rank method; None if empty."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100. * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencyStats:
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        """:return: dict of count, mean, p50, p95, p99 and max, in milliseconds"""
+        values = sorted(self.samples)
+        to_ms = lambda value: None if value is None else round(value * 1000, 3)
+        return {'count': self.count,
+                'mean': to_ms(self.total / self.count if self.count else None),
+                'p50': to_ms(percentile(values, 50)),
+                'p95': to_ms(percentile(values, 95)),
+                'p99': to_ms(percentile(values, 99)),
+                'max': to_ms(self.max if self.count else None)}
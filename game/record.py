@@ -0,0 +1,243 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+from game.go import Board
+from game.sgf import SgfGame, iter_games
+"""
+Compact binary game records for large game collections.
+
+Layout of a record file:
+    magic (4 bytes) | version (uint16) | then one entry per game:
+    game header | setup stones (uint16 move codes) | moves (uint16 move codes)
+A move code is color << 15 | x * board_size + y, or color << 15 | PASS.
+The index file next to it holds the uint64 offset of every game, so game k is found in O(1);
+the names of the agents that played are kept in a small JSON file.
+"""
+
+MAGIC = b'GOGR'
+INDEX_MAGIC = b'GOGI'
+VERSION = 1
+EXTENSION = '.gqr'
+PASS = 0x7FFF
+WHITE_BIT = 0x8000
+
+_PREFIX = struct.Struct('<4sH')
+# board size, komi, result (SGF, ASCII), black agent id, white agent id, number of setup stones, number of moves
+_GAME_HEADER = struct.Struct('<Bf8sHHHH')
+_OFFSET = struct.Struct('<Q')
+NO_AGENT = 0xFFFF
+
+
+def get_index_path(path_file):
+    return path_file + '.idx'
+
+
+def get_agents_path(path_file):
+    return path_file + '.agents.json'
+
+
+def encode_move(color, point, board_size):
+    code = PASS if point is None else point[0] * board_size + point[1]
+    return code | WHITE_BIT if color == 'white' else code
+
+
+def decode_move(code, board_size):
+    """:return: (color, point); point is None for a pass"""
+    color = 'white' if code & WHITE_BIT else 'black'
+    code &= PASS
+    if code == PASS:
+        return color, None
+    return color, divmod(code, board_size)
+
+
+class RecordWriter:
+    def __init__(self, path_file, append=False):
+        """
+        Write games to a record file and its index; use as a context manager or call close().
+        :param append: add to an existing record file instead of overwriting it
+        """
+        self.path_file = path_file
+        self.agents = {}  # name -> id
+        if append and os.path.exists(path_file):
+            self.agents = {name: i for i, name in enumerate(_read_agents(path_file))}
+            self.f = open(path_file, 'ab')
+            self.f_index = open(get_index_path(path_file), 'ab')
+        else:
+            self.f = open(path_file, 'wb')
+            self.f.write(_PREFIX.pack(MAGIC, VERSION))
+            self.f_index = open(get_index_path(path_file), 'wb')
+            self.f_index.write(_PREFIX.pack(INDEX_MAGIC, VERSION))
+            self._write_agents()  # Replace the names of an earlier record at this path
+        self.num_added = 0
+
+    def _write_agents(self):
+        # Atomically, so that the agent ids on disk always have their names, even if the writer is killed
+        path_agents = get_agents_path(self.path_file)
+        path_tmp = '%s.tmp%d' % (path_agents, os.getpid())
+        with open(path_tmp, 'w') as f:
+            json.dump(sorted(self.agents, key=self.agents.get), f)
+        os.replace(path_tmp, path_agents)
+
+    def get_agent_id(self, name):
+        """Return the id of an agent name, assigning the next free id to new names."""
+        if name is None:
+            return NO_AGENT
+        if name not in self.agents:
+            if len(self.agents) >= NO_AGENT:
+                raise ValueError('Too many agents')
+            self.agents[name] = len(self.agents)
+            self._write_agents()
+        return self.agents[name]
+
+    def add(self, game):
+        """Append a game (SgfGame); the player names are recorded as agent ids."""
+        size = game.board_size
+        if len(game.moves) > 0xFFFF or len(game.setup) > 0xFFFF:
+            raise ValueError('Game too long for the record format')
+        result = (game.result or '').encode('ascii', 'replace')
+        if len(result) > 8:
+            raise ValueError('Result %r does not fit the record format' % game.result)
+        header = _GAME_HEADER.pack(size, game.komi, result,
+                                   self.get_agent_id(game.players.get('black')),
+                                   self.get_agent_id(game.players.get('white')),
+                                   len(game.setup), len(game.moves))
+        codes = [encode_move(color, point, size) for color, point in game.setup]
+        codes.extend(encode_move(color, point, size) for color, point in game.moves)
+
+        offset = self.f.tell()
+        self.f.write(header)
+        self.f.write(struct.pack('<%dH' % len(codes), *codes))
+        # The data reaches the file before its index entry, so that the index never points past the data
+        self.f.flush()
+        self.f_index.write(_OFFSET.pack(offset))
+        self.num_added += 1
+
+    def add_board(self, board, result=None, black_agent=None, white_agent=None):
+        """Append the game played on board."""
+        self.add(SgfGame.from_board(board, result=result, players={'black': black_agent, 'white': white_agent}))
+
+    def close(self):
+        self.f.close()
+        self.f_index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RecordReader:
+    def __init__(self, path_file):
+        """Memory-map a record file and its index; games are only decoded when accessed."""
+        self.path_file = path_file
+        self._f = open(path_file, 'rb')
+        self._f_index = open(get_index_path(path_file), 'rb')
+        self.data = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = mmap.mmap(self._f_index.fileno(), 0, access=mmap.ACCESS_READ)
+        for buffer, magic in ((self.data, MAGIC), (self.index, INDEX_MAGIC)):
+            file_magic, version = _PREFIX.unpack_from(buffer, 0)
+            if file_magic != magic:
+                raise ValueError('Not a game record file: %s' % path_file)
+            if version > VERSION:
+                raise ValueError('Game record version %d is newer than supported (%d)' % (version, VERSION))
+        self._agents = None
+
+    @property
+    def agents(self):
+        """List of agent names; the id of an agent is its position."""
+        if self._agents is None:
+            self._agents = _read_agents(self.path_file)
+        return self._agents
+
+    def __len__(self):
+        return (len(self.index) - _PREFIX.size) // _OFFSET.size
+
+    def get_offset(self, k):
+        if not 0 <= k < len(self):
+            raise IndexError('Game %d out of range' % k)
+        return _OFFSET.unpack_from(self.index, _PREFIX.size + k * _OFFSET.size)[0]
+
+    def read_header(self, k):
+        """:return: dict of the header of game k, without decoding its moves"""
+        size, komi, result, black, white, num_setup, num_moves = _GAME_HEADER.unpack_from(self.data, self.get_offset(k))
+        return {'board_size': size, 'komi': komi, 'result': result.rstrip(b'\0').decode('ascii') or None,
+                'black_agent': black, 'white_agent': white, 'num_setup': num_setup, 'num_moves': num_moves}
+
+    def read_codes(self, k):
+        """:return: (header, setup stone codes, move codes) of game k"""
+        header = self.read_header(k)
+        offset = self.get_offset(k) + _GAME_HEADER.size
+        num_setup, num_moves = header['num_setup'], header['num_moves']
+        codes = struct.unpack_from('<%dH' % (num_setup + num_moves), self.data, offset)
+        return header, codes[:num_setup], codes[num_setup:]
+
+    def __getitem__(self, k):
+        """Decode game k into an SgfGame."""
+        header, setup, moves = self.read_codes(k)
+        size = header['board_size']
+        players = {color: self.agents[header[color + '_agent']]
+                   for color in ('black', 'white') if header[color + '_agent'] != NO_AGENT}
+        return SgfGame(board_size=size, komi=header['komi'], result=header['result'], players=players,
+                       moves=[decode_move(code, size) for code in moves],
+                       setup=[decode_move(code, size) for code in setup])
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def replay(self, k, num_moves=None):
+        """Play game k onto a new Board, touching only its own bytes of the record file."""
+        header, setup, moves = self.read_codes(k)
+        size = header['board_size']
+        board = Board(board_size=size)
+        board.komi = header['komi']
+        for code in setup:
+            color, (x, y) = decode_move(code, size)
+            board.board[x][y] = color
+        for code in moves[:num_moves]:
+            board.next, point = decode_move(code, size)
+            if point is None:
+                board.pass_move()
+            elif not board.put_stone(point)[0]:
+                raise ValueError('Illegal move in game %d: %s' % (k, point))
+        return board
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+        self._f.close()
+        self._f_index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _read_agents(path_file):
+    try:
+        with open(get_agents_path(path_file)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def convert_sgf(path_sgf, path_file, append=False):
+    """Convert an SGF collection into a record file, streaming; return the number of games converted."""
+    with RecordWriter(path_file, append=append) as writer:
+        for game in iter_games(path_sgf):
+            writer.add(game)
+        return writer.num_added
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert an SGF collection into a binary game record file')
+    parser.add_argument('path_sgf', help='the SGF file to convert')
+    parser.add_argument('path_record', help='the record file to write, e.g. games%s' % EXTENSION)
+    parser.add_argument('-a', '--append', action='store_true', help='append to an existing record file')
+    args = parser.parse_args()
+    print('Converted %d games' % convert_sgf(args.path_sgf, args.path_record, append=args.append))
@@ -0,0 +1,254 @@
+import io
+import re
+from game.go import Board
+"""
+SGF (Smart Game Format, FF[4]) import and export of Go games.
+iter_games() streams games out of collections of any size, holding only one game in memory at a time;
+replay() plays a game onto a Board.
+"""
+
+CHUNK_SIZE = 1 << 20  # Characters read from a file at a time
+COLORS = {'B': 'black', 'W': 'white'}
+SGF_COLORS = {'black': 'B', 'white': 'W'}
+
+# Skips plain text and complete property values, stopping at a parenthesis or an unterminated value
+_SKIP = re.compile(r'(?:[^()\[]+|\[(?:[^\]\\]|\\.)*\])*', re.S)
+_TOKEN = re.compile(r'\s*(?:([;()])|([A-Za-z]+)\s*((?:\[(?:[^\]\\]|\\.)*\]\s*)+))', re.S)
+_VALUE = re.compile(r'\[((?:[^\]\\]|\\.)*)\]', re.S)
+_POINTS = {chr(97 + x) + chr(97 + y): (x, y) for x in range(26) for y in range(26) if (x, y) != (19, 19)}
+_ESCAPE = re.compile(r'\\(\n\r?|\r\n?|.)', re.S)
+
+
+class SgfGame:
+    def __init__(self, board_size=19, komi=6.5, result=None, players=None, moves=None, setup=None, properties=None):
+        """
+        The main line of one game.
+        :param result: SGF result such as 'B+3.5', 'W+R' or None if unknown
+        :param players: {'black': name, 'white': name}
+        :param moves: list of (color, point); point is None for a pass
+        :param setup: list of (color, point) of stones placed before the first move, e.g. handicap stones
+        :param properties: the other root properties, {identifier: [values]}
+        """
+        self.board_size = board_size
+        self.komi = komi
+        self.result = result
+        self.players = players or {}
+        self.moves = moves or []
+        self.setup = setup or []
+        self.properties = properties or {}
+
+    @classmethod
+    def from_board(cls, board, result=None, players=None):
+        """Record the moves played on board."""
+        return cls(board_size=board.size, komi=board.komi, result=result, players=players, moves=list(board.moves))
+
+    @property
+    def winner(self):
+        """Return 'black', 'white' or None for a draw or an unknown result."""
+        if self.result and self.result[0] in COLORS and self.result[1:2] == '+':
+            return COLORS[self.result[0]]
+        return None
+
+    def replay(self, board=None, num_moves=None, strict=True):
+        """
+        Play the game onto a new board, or onto board.
+        :param num_moves: stop after this many moves; None for all
+        :param strict: if True, raise ValueError on an illegal move; otherwise stop before it
+        :return: the board
+        """
+        if board is None:
+            board = Board(board_size=self.board_size)
+            board.komi = self.komi
+        for color, (x, y) in self.setup:
+            board.board[x][y] = color
+        moves = self.moves if num_moves is None else self.moves[:num_moves]
+        for i, (color, point) in enumerate(moves):
+            board.next = color
+            if point is None:
+                board.pass_move()
+            elif not board.put_stone(point)[0]:
+                if strict:
+                    raise ValueError('Illegal move %d: %s %s' % (i + 1, color, to_sgf_point(point)))
+                break
+        return board
+
+    def to_sgf(self):
+        """Return the game as an SGF string."""
+        root = ['GM[1]FF[4]CA[UTF-8]SZ[%d]KM[%s]' % (self.board_size, _format_number(self.komi))]
+        if self.result:
+            root.append('RE[%s]' % _escape(self.result))
+        for color, name in sorted(self.players.items()):
+            if name:
+                root.append('P%s[%s]' % (SGF_COLORS[color], _escape(name)))
+        for identifier, values in self.properties.items():
+            if identifier not in ('GM', 'FF', 'CA', 'SZ', 'KM', 'RE', 'PB', 'PW', 'AB', 'AW', 'B', 'W'):
+                root.append(identifier + ''.join('[%s]' % _escape(value) for value in values))
+        for sgf_color in ('B', 'W'):
+            points = [point for color, point in self.setup if color == COLORS[sgf_color]]
+            if points:
+                root.append('A%s%s' % (sgf_color, ''.join('[%s]' % to_sgf_point(point) for point in points)))
+        nodes = ';'.join('%s[%s]' % (SGF_COLORS[color], to_sgf_point(point) if point is not None else '')
+                         for color, point in self.moves)
+        return '(;%s%s)\n' % (''.join(root), ';' + nodes if nodes else '')
+
+    def __str__(self):
+        return 'SgfGame(%dx%d, %d moves, %s)' % (self.board_size, self.board_size, len(self.moves), self.result)
+
+
+def format_result(scores):
+    """Return the SGF result for final scores {'black': score, 'white': score}, e.g. 'B+3.5', or '0' for a draw."""
+    margin = scores['black'] - scores['white']
+    if margin == 0:
+        return '0'
+    return '%s+%s' % ('B' if margin > 0 else 'W', _format_number(abs(margin)))
+
+
+def to_sgf_point(point):
+    """(x, y) -> 'ab'; x is the column and y the row, both from the top left."""
+    return chr(97 + point[0]) + chr(97 + point[1])
+
+
+def from_sgf_point(value, board_size=19):
+    """'ab' -> (x, y); '' and 'tt' (on boards up to 19x19) are passes and return None."""
+    if not value or (value == 'tt' and board_size <= 19):
+        return None
+    if len(value) != 2:
+        raise ValueError('Invalid SGF point: %r' % value)
+    return ord(value[0]) - 97, ord(value[1]) - 97
+
+
+def write_sgf(path_file, games):
+    """Write games as an SGF collection; games may be any iterable and is written as it is consumed."""
+    with open(path_file, 'w', encoding='utf-8') as f:
+        for game in games:
+            f.write(game.to_sgf())
+
+
+def read_sgf(path_file):
+    """Return the first game of an SGF file."""
+    for game in iter_games(path_file):
+        return game
+    raise ValueError('No game in %s' % path_file)
+
+
+def iter_games(source, encoding='utf-8', chunk_size=CHUNK_SIZE, errors='replace'):
+    """
+    Yield an SgfGame for each game of an SGF collection, reading the source in chunks.
+    :param source: a path, a text file object or an SGF string
+    """
+    for text in iter_game_texts(source, encoding=encoding, chunk_size=chunk_size, errors=errors):
+        yield parse_game(text)
+
+
+def iter_game_texts(source, encoding='utf-8', chunk_size=CHUNK_SIZE, errors='replace'):
+    """Yield the SGF text of each game of a collection, e.g. to parse them in parallel."""
+    if isinstance(source, str) and source.lstrip().startswith('('):
+        f, close = io.StringIO(source), True
+    elif isinstance(source, str):
+        f, close = open(source, encoding=encoding, errors=errors, newline=''), True
+    else:
+        f, close = source, False
+    try:
+        buffer = ''
+        start = 0  # Start of the current game in buffer
+        pos = 0  # Where scanning continues in buffer
+        depth = 0  # Parenthesis depth outside of property values
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer = buffer[start:] + chunk
+            pos -= start
+            start = pos if depth == 0 else 0  # Text between games is dropped
+            while True:
+                pos = _SKIP.match(buffer, pos).end()
+                if pos >= len(buffer) or buffer[pos] == '[':
+                    break  # The rest of the value is in the next chunk
+                if buffer[pos] == '(':
+                    if depth == 0:
+                        start = pos
+                    depth += 1
+                elif depth > 0:
+                    depth -= 1
+                    if depth == 0:
+                        yield buffer[start:pos + 1]
+                        start = pos + 1
+                pos += 1
+        if depth > 0:
+            raise ValueError('Unterminated SGF game at the end of the input')
+    finally:
+        if close:
+            f.close()
+
+
+def parse_game(text):
+    """Parse the main line of a single SGF game: the first variation wherever the game tree branches."""
+    root = None  # Properties of the first node; only moves and setup stones are kept from the others
+    node = None
+    moves = []  # (color, SGF point)
+    setup = []  # (color, SGF point or rectangle)
+    for punctuation, identifier, values in _TOKEN.findall(text):
+        if punctuation:
+            if punctuation == ';':
+                if root is None:
+                    root = node = {}
+                else:
+                    node = None
+            elif punctuation == ')' and root is not None:
+                break  # The first variation is over; the main line ends with it
+            continue
+        if not identifier.isupper():
+            identifier = ''.join(c for c in identifier if c.isupper())  # FF[3] allows e.g. 'AddBlack'
+        if '\\' in values or values.count(']') > 1:
+            values = [_unescape(value) for value in _VALUE.findall(values)]
+        else:
+            values = [values.rstrip()[1:-1]]
+        if identifier in COLORS:
+            moves.append((COLORS[identifier], values[0]))
+        elif identifier in ('AB', 'AW'):
+            setup.extend((COLORS[identifier[1]], value) for value in values)
+        elif node is not None:
+            node.setdefault(identifier, []).extend(values)
+    if root is None:
+        raise ValueError('SGF game without nodes')
+
+    board_size = int(root.get('SZ', ['19'])[0].split(':')[0])
+    game = SgfGame(board_size=board_size,
+                   komi=float(root['KM'][0]) if root.get('KM', [''])[0].strip() else 0.,
+                   result=root.get('RE', [None])[0],
+                   players={color: root['P' + sgf_color][0] for sgf_color, color in COLORS.items()
+                            if 'P' + sgf_color in root},
+                   properties=root)
+    points = _POINTS
+    for color, value in moves:
+        point = points.get(value)
+        if point is None and value and (value != 'tt' or board_size > 19):
+            point = from_sgf_point(value, board_size)  # Raises for invalid points
+        game.moves.append((color, point))
+    for color, value in setup:
+        game.setup.extend((color, point) for point in _expand_points(value, board_size))
+    return game
+
+
+def _expand_points(value, board_size):
+    """Expand a point or a compressed rectangle 'aa:cc' of setup stones."""
+    if ':' not in value:
+        point = from_sgf_point(value, board_size)
+        return [point] if point is not None else []
+    (x1, y1), (x2, y2) = [from_sgf_point(corner, 52) for corner in value.split(':')]
+    return [(x, y) for x in range(min(x1, x2), max(x1, x2) + 1) for y in range(min(y1, y2), max(y1, y2) + 1)]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace(']', '\\]')
+
+
+def _unescape(value):
+    if '\\' not in value:
+        return value
+    # Escaped line breaks are soft line breaks and are removed
+    return _ESCAPE.sub(lambda m: '' if m.group(1)[0] in '\r\n' else m.group(1), value)
+
+
+def _format_number(value):
+    return ('%d' % value) if float(value).is_integer() else ('%s' % value)
@@ -0,0 +1,227 @@
+import atexit
+import os
+import struct
+from multiprocessing import shared_memory
+from game.go import Board
+"""
+Batches of board positions in shared memory, for handing positions to worker processes without pickling them.
+
+Layout of the shared memory block:
+    header   int32 x 4                        magic, version, number of boards, board size
+    meta     int32 (num_boards, NUM_META)      player to move, ko point, passes, ... of every board
+    stones   int8  (num_boards, size * size)   0 empty, 1 black, 2 white; point (x, y) at x * size + y
+A batch passed to a worker process pickles as its name only; the worker attaches to the same memory,
+so both sides read and write the positions in place. Attach only from processes started by the creator,
+which share its resource tracker; the creator unlinks the memory.
+"""
+
+MAGIC = 0x42424F47  # b'GOBB'
+VERSION = 1
+_HEADER = struct.Struct('=4i')  # Native byte order, like the memoryviews of the arrays
+
+# Fields of the meta array
+NEXT = 0  # 0 if black is to move, 1 if white
+KO_POINT = 1  # x * size + y, or -1
+PASSES = 2
+CAPTURED_BLACK = 3
+CAPTURED_WHITE = 4
+COUNTER_MOVE = 5
+LAST_MOVE = 6  # x * size + y, or -1
+KOMI = 7  # In tenths of a point
+RESULT = 8  # Free for workers to report on a position, e.g. the move chosen; NO_RESULT until then
+NUM_META = 9
+
+NO_POINT = -1
+NO_RESULT = -2
+DEFAULT_KOMI = 65  # The komi of a new Board, in tenths
+_CODES = {None: 0, 'black': 1, 'white': 2}
+_COLORS = (None, 'black', 'white')
+
+_attached = {}  # name -> batch, the batches a worker process has attached to
+
+
+def encode_point(point, board_size):
+    return NO_POINT if point is None else point[0] * board_size + point[1]
+
+
+def decode_point(code, board_size):
+    return None if code < 0 else divmod(code, board_size)
+
+
+class SharedBoardBatch:
+    def __init__(self, num_boards=None, board_size=19, name=None):
+        """
+        Create a batch of num_boards empty positions, or attach to the existing batch called name.
+        Use as a context manager or call close(); the creator also unlinks the memory on close().
+        """
+        if name is None:
+            if not num_boards or num_boards < 1:
+                raise ValueError('A batch needs at least one board')
+            size = (_HEADER.size + num_boards * NUM_META * 4 + num_boards * board_size * board_size)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+            _HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, num_boards, board_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            magic, version, num_boards, board_size = _HEADER.unpack_from(self.shm.buf, 0)
+            if magic != MAGIC or version != VERSION:
+                self.shm.close()
+                raise ValueError('%s is not a shared board batch' % name)
+        self.num_boards = num_boards
+        self.board_size = board_size
+        self.num_points = board_size * board_size
+        offset = _HEADER.size
+        self.meta = self.shm.buf[offset:offset + num_boards * NUM_META * 4].cast('i')
+        offset += num_boards * NUM_META * 4
+        self._stones_offset = offset
+        self._raw_stones = self.shm.buf[offset:offset + num_boards * self.num_points]
+        self.stones = self._raw_stones.cast('b')
+        if self.owner:
+            for i in range(num_boards):
+                self.clear(i)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def attach(cls, name):
+        """Return the batch called name, attaching to it once per process."""
+        batch = _attached.get(name)
+        if batch is None:
+            if not _attached:
+                atexit.register(_close_attached)
+            batch = _attached[name] = cls(name=name)
+        return batch
+
+    def __reduce__(self):
+        # Workers attach to the shared memory instead of receiving a copy
+        return SharedBoardBatch.attach, (self.name,)
+
+    def __len__(self):
+        return self.num_boards
+
+    def _check_index(self, i):
+        if not 0 <= i < self.num_boards:
+            raise IndexError('Board %d out of range' % i)
+
+    def clear(self, i):
+        """Make board i an empty position with black to move."""
+        self._check_index(i)
+        start = i * self.num_points
+        self._raw_stones[start:start + self.num_points] = bytes(self.num_points)
+        base = i * NUM_META
+        self.meta[base:base + NUM_META] = memoryview(struct.pack('=%di' % NUM_META, 0, NO_POINT, 0, 0, 0, 0, NO_POINT,
+                                                                 DEFAULT_KOMI, NO_RESULT)).cast('i')
+
+    def put(self, i, board):
+        """Write the position of board (without its move history) to board i."""
+        self._check_index(i)
+        size = self.board_size
+        if board.size != size:
+            raise ValueError('Board size %d does not match the batch (%d)' % (board.size, size))
+        codes = _CODES
+        start = i * self.num_points
+        self._raw_stones[start:start + self.num_points] = bytes([codes[color] for column in board.board[:size]
+                                                                 for color in column[:size]])
+        base = i * NUM_META
+        meta = self.meta
+        meta[base + NEXT] = board.next == 'white'
+        meta[base + KO_POINT] = encode_point(board.ko_point, size)
+        meta[base + PASSES] = board.passes
+        meta[base + CAPTURED_BLACK] = board.captured_stones['black']
+        meta[base + CAPTURED_WHITE] = board.captured_stones['white']
+        meta[base + COUNTER_MOVE] = board.counter_move
+        meta[base + LAST_MOVE] = encode_point(board.last_move, size)
+        meta[base + KOMI] = int(round(board.komi * 10))
+        meta[base + RESULT] = NO_RESULT
+
+    def get(self, i):
+        """Return board i as a new Board."""
+        self._check_index(i)
+        size = self.board_size
+        base = i * NUM_META
+        meta = self.meta
+        board = Board(board_size=size, next_color='white' if meta[base + NEXT] else 'black')
+        start = i * self.num_points
+        colors = [_COLORS[code] for code in self._raw_stones[start:start + self.num_points]]
+        for x in range(size):
+            board.board[x][:size] = colors[x * size:(x + 1) * size]
+        board.ko_point = decode_point(meta[base + KO_POINT], size)
+        board.passes = meta[base + PASSES]
+        board.captured_stones = {'black': meta[base + CAPTURED_BLACK], 'white': meta[base + CAPTURED_WHITE]}
+        board.counter_move = meta[base + COUNTER_MOVE]
+        board.last_move = decode_point(meta[base + LAST_MOVE], size)
+        board.komi = meta[base + KOMI] / 10.
+        return board
+
+    def get_point(self, i, point):
+        """Return the color of the stone at point of board i, or None, reading the shared memory directly."""
+        return _COLORS[self._raw_stones[i * self.num_points + point[0] * self.board_size + point[1]]]
+
+    def set_point(self, i, point, color):
+        self._raw_stones[i * self.num_points + point[0] * self.board_size + point[1]] = _CODES[color]
+
+    def get_result(self, i):
+        return self.meta[i * NUM_META + RESULT]
+
+    def set_result(self, i, value):
+        self.meta[i * NUM_META + RESULT] = value
+
+    def as_arrays(self):
+        """
+        Return NumPy views (stones (n, size, size) int8, meta (n, NUM_META) int32) of the shared memory.
+        Delete them before close(); the memory cannot be released while views exist.
+        """
+        import numpy as np
+        buf = self.shm.buf
+        meta = np.frombuffer(buf, dtype=np.int32, count=self.num_boards * NUM_META, offset=_HEADER.size)
+        stones = np.frombuffer(buf, dtype=np.int8, count=self.num_boards * self.num_points,
+                               offset=self._stones_offset)
+        return (stones.reshape(self.num_boards, self.board_size, self.board_size),
+                meta.reshape(self.num_boards, NUM_META))
+
+    def close(self):
+        """Release this process's mapping; the creator also unlinks the memory."""
+        _attached.pop(self.name, None)
+        for view in (self.stones, self._raw_stones, self.meta):
+            view.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _close_attached():
+    # The memory cannot be unmapped once the interpreter collects the views on it
+    for batch in list(_attached.values()):
+        batch.close()
+
+
+def choose_moves(batch, start, stop):
+    """
+    Worker task: store the built-in AI's move for boards start to stop - 1 of batch as their RESULT
+    (x * size + y, or NO_POINT to pass). Only the indices travel to the worker; the positions are read in place.
+    """
+    from game.ai import choose_move
+    for i in range(start, stop):
+        batch.set_result(i, encode_point(choose_move(batch.get(i)), batch.board_size))
+    return stop - start
+
+
+def parallel_choose_moves(batch, pool, num_tasks=None):
+    """
+    Compute the AI's move for every board of batch with a multiprocessing pool.
+    :param num_tasks: number of chunks the batch is split into; DEFAULT is 4 per CPU
+    :return: list of moves (point or None), in board order
+    """
+    num_tasks = min(len(batch), num_tasks or 4 * (os.cpu_count() or 1))
+    bounds = [len(batch) * k // num_tasks for k in range(num_tasks + 1)]
+    pool.starmap(choose_moves, [(batch, bounds[k], bounds[k + 1]) for k in range(num_tasks)])
+    return [decode_point(batch.get_result(i), batch.board_size) for i in range(len(batch))]
@@ -0,0 +1,61 @@
+import json
+import os
+import time
+"""
+Startup timing report. Import this module first; mark() records named milestones relative to
+that moment, and report() prints them once the first frame is on the screen.
+Enabled by setting GO_GAME_STARTUP_REPORT to 1 (print) or to a file path (write JSON).
+"""
+
+_start = time.perf_counter()
+_marks = []
+_reported = False
+_first_screen = None
+REPORT_ENV = 'GO_GAME_STARTUP_REPORT'
+
+
+def enabled():
+    return bool(os.environ.get(REPORT_ENV))
+
+
+def mark(name):
+    """Record a startup milestone; cheap enough to leave in even if reporting is disabled."""
+    _marks.append((name, time.perf_counter() - _start))
+
+
+def get_marks():
+    """:return: list of (milestone, seconds since startup began)"""
+    return list(_marks)
+
+
+def get_first_screen():
+    """:return: the screen passed to first_frame(), e.g. 'menu' or 'game'; None before the first frame"""
+    return _first_screen
+
+
+def first_frame(screen=None):
+    """
+    Mark that the first frame is on the screen and report the startup timings, once.
+    :param screen: the screen the frame shows, e.g. 'menu' or 'game'
+    """
+    global _reported, _first_screen
+    if _reported:
+        return
+    _reported = True
+    _first_screen = screen
+    mark('first frame')
+    if enabled():
+        report(os.environ[REPORT_ENV])
+
+
+def report(target='1'):
+    """
+    :param target: '1' to print the milestones, otherwise the path of a JSON file to write them to
+    """
+    if target == '1':
+        print('Startup timings:')
+        for name, seconds in _marks:
+            print('  %-24s %8.1f ms' % (name, seconds * 1000))
+        return
+    with open(target, 'w') as f:
+        json.dump({'marks': [{'name': name, 'seconds': seconds} for name, seconds in _marks]}, f, indent=2)
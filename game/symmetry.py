@@ -0,0 +1,174 @@
+import random
+"""
+The 8 symmetries of the square board (rotations and reflections), canonical position keys
+shared by all symmetric positions, and 8-fold augmentation of training data.
+A transform t in range(8) maps (x, y) by optionally swapping x and y (t & 4), then mirroring x (t & 1)
+and y (t & 2); transform 0 is the identity.
+"""
+
+NUM_TRANSFORMS = 8
+ZOBRIST_SEED = 20240601
+
+_zobrist_tables = {}
+_permutations = {}
+
+
+def transform_point(point, t, board_size):
+    """Map a point by transform t; None (a pass) stays None."""
+    if point is None:
+        return None
+    x, y = point
+    if t & 4:
+        x, y = y, x
+    if t & 1:
+        x = board_size - 1 - x
+    if t & 2:
+        y = board_size - 1 - y
+    return x, y
+
+
+def inverse_transform(t):
+    """Return the transform that undoes t."""
+    if t & 4:
+        # Mirroring after the swap; undoing it swaps which axis is mirrored
+        return 4 | ((t & 1) << 1) | ((t & 2) >> 1)
+    return t
+
+
+def get_zobrist_table(board_size):
+    """
+    Return the Zobrist keys of a board size as {'black': [[key] * size] * size, 'white': ..., 'white_to_move': key},
+    plus their 8 transformed copies under 'symmetric': symmetric[t][color][x][y] is the key of the stone
+    of that color at transform_point((x, y), t). Computed once per board size.
+    """
+    if board_size not in _zobrist_tables:
+        rng = random.Random(ZOBRIST_SEED + board_size)
+        table = {color: [[rng.getrandbits(64) for _ in range(board_size)] for _ in range(board_size)]
+                 for color in ('black', 'white', 'ko')}
+        table['white_to_move'] = rng.getrandbits(64)
+        symmetric = []
+        for t in range(NUM_TRANSFORMS):
+            keys = {}
+            for color in ('black', 'white', 'ko'):
+                keys[color] = [[None] * board_size for _ in range(board_size)]
+                for x in range(board_size):
+                    for y in range(board_size):
+                        tx, ty = transform_point((x, y), t, board_size)
+                        keys[color][x][y] = table[color][tx][ty]
+            symmetric.append(keys)
+        table['symmetric'] = symmetric
+        _zobrist_tables[board_size] = table
+    return _zobrist_tables[board_size]
+
+
+def get_symmetric_keys(board):
+    """Return the Zobrist keys of the 8 transforms of the position (stones, ko point and player to move)."""
+    size = board.size
+    symmetric = get_zobrist_table(size)['symmetric']
+    keys = [0] * NUM_TRANSFORMS
+    for x in range(size):
+        column = board.board[x]
+        for y in range(size):
+            color = column[y]
+            if color is not None:
+                for t in range(NUM_TRANSFORMS):
+                    keys[t] ^= symmetric[t][color][x][y]
+    if board.ko_point is not None:
+        x, y = board.ko_point
+        for t in range(NUM_TRANSFORMS):
+            keys[t] ^= symmetric[t]['ko'][x][y]
+    if board.next == 'white':
+        white_to_move = get_zobrist_table(size)['white_to_move']
+        keys = [key ^ white_to_move for key in keys]
+    return keys
+
+
+def canonical_key(board):
+    """
+    Return (key, t): the smallest key of the 8 symmetric positions, and the transform that maps
+    the position onto the canonical one. Symmetric positions have the same key.
+    """
+    keys = get_symmetric_keys(board)
+    key = min(keys)
+    return key, keys.index(key)
+
+
+class SymmetricTable:
+    def __init__(self, max_entries=100000):
+        """
+        A transposition table keyed by canonical_key(), so that symmetric positions share entries.
+        Moves are stored in canonical orientation and mapped back to the position they are looked up for.
+        """
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, board, default=None):
+        """:return: (move, value) stored for this position or a symmetric one, or default"""
+        key, t = canonical_key(board)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        move, value = entry
+        return transform_point(move, inverse_transform(t), board.size), value
+
+    def put(self, board, move, value=None):
+        if len(self.entries) >= self.max_entries:
+            self.entries.clear()
+        key, t = canonical_key(board)
+        self.entries[key] = (transform_point(move, t, board.size), value)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def get_point_permutations(board_size):
+    """
+    Return an int array perm of shape (8, size * size + 1): perm[t][i] is the flat index of
+    transform_point of flat index i = x * size + y; the last index, the pass, maps to itself.
+    """
+    import numpy as np
+    if board_size not in _permutations:
+        num_points = board_size * board_size
+        perm = np.empty((NUM_TRANSFORMS, num_points + 1), dtype=np.intp)
+        for t in range(NUM_TRANSFORMS):
+            for x in range(board_size):
+                for y in range(board_size):
+                    tx, ty = transform_point((x, y), t, board_size)
+                    perm[t, x * board_size + y] = tx * board_size + ty
+            perm[t, num_points] = num_points
+        _permutations[board_size] = perm
+    return _permutations[board_size]
+
+
+def augment(planes, moves=None, masks=None):
+    """
+    Return all 8 transforms of a batch, in one gather per array.
+    :param planes: array (n, channels, size, size)
+    :param moves: optional int array (n,) of flat move indices, size * size for a pass
+    :param masks: optional array (n, size * size + 1), e.g. legal-move masks
+    :return: (planes (8n, channels, size, size), moves (8n,) or None, masks (8n, size * size + 1) or None);
+             sample t * n + i is sample i under transform t
+    """
+    import numpy as np
+    planes = np.asarray(planes)
+    n, channels, size, _ = planes.shape
+    perm = get_point_permutations(size)
+    # inverse[t][j] is the source index of target index j under transform t
+    inverse = np.empty_like(perm)
+    inverse[np.arange(NUM_TRANSFORMS)[:, None], perm] = np.arange(perm.shape[1])
+
+    flat = planes.reshape(n, channels, size * size)
+    gathered = flat[:, :, inverse[:, :-1]]  # (n, channels, 8, size * size)
+    planes_aug = gathered.transpose(2, 0, 1, 3).reshape(NUM_TRANSFORMS * n, channels, size, size)
+
+    moves_aug = None
+    if moves is not None:
+        moves_aug = perm[:, np.asarray(moves)].reshape(-1)
+    masks_aug = None
+    if masks is not None:
+        masks_aug = np.asarray(masks)[:, inverse].transpose(1, 0, 2).reshape(NUM_TRANSFORMS * n, -1)
+    return planes_aug, moves_aug, masks_aug
@@ -1,6 +1,9 @@
 import pygame
 import os
 import sys
+from game.assets import load_image, get_font, render_text, get_stone, blit_stone, CAPTURED
+from game.animation import Tween, Animator
+from game.audio import get_audio
 
 """
 This file is the GUI on top of the game backend.
@@ -21,6 +24,7 @@ MUSIC_FILE = resource_path('game/audio/game music.mp3')
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 BACKGROUND_COLOR = (219, 186, 130)
+STONE_ANIMATION_MS = 80  # Duration of the placing and capturing animations
 
 
 def get_rbg(color):
@@ -62,50 +66,62 @@ class UI:
         self.home_icon = None
 
         # Music control
-        self.music_playing = True  # Start with music on
+        self.music_playing = get_audio().enabled  # Start with music on
         self.music_button = None
         self.music_text = None
 
+        # Retained state for partial redraws
+        self.dirty_rects = []  # Screen regions changed since the last flush()
+        self._game_state_key = None  # What the info panel currently shows
+        self._scores_key = None
+        self._scores = None
+
+        # Placing and capturing animations, advanced by update_animations() from the main loop
+        self.animations_enabled = True
+        self.animator = Animator(self._draw_tween)
+        self.stones = {}  # point -> color of the stones drawn on the screen
+
+    @staticmethod
+    def preload(board_sizes=(9, 13, 19)):
+        """Load the images, fonts and stone sprites of the game screen ahead of time, e.g. behind a splash screen."""
+        load_image(BACKGROUND, convert=True)
+        load_image(HOME_ICON, size=(30, 30))
+        get_font('Arial', 24)
+        for board_size in board_sizes:
+            radius = UI(board_size).stone_radius
+            for color in ('black', 'white', CAPTURED):
+                get_stone(radius, color)
+
     def initialize(self):
         """Initialize the game board."""
-        pygame.init()
-        pygame.mixer.init()
+        # The mixer is left to the audio service, which opens it once per process
+        pygame.display.init()
+        pygame.font.init()
         pygame.display.set_caption('Go Game')
         window_width = max(820, self.margin * 2 + self.board_pixels + 200)
         window_height = self.margin * 2 + self.board_pixels + 100
         self.screen = pygame.display.set_mode((window_width, window_height), 0, 32)
-        self.background = pygame.image.load(BACKGROUND).convert()
-        self.font = pygame.font.SysFont('Arial', 24)
+        self.background = load_image(BACKGROUND, convert=True).copy()  # The grid is drawn onto it below
+        self.font = get_font('Arial', 24)
 
         # Initialize home button - position in top left corner
-        self.home_icon = pygame.image.load(HOME_ICON)
-        self.home_icon = pygame.transform.scale(self.home_icon, (30, 30))  # Scale the icon to appropriate size
+        self.home_icon = load_image(HOME_ICON, size=(30, 30))  # Scale the icon to appropriate size
         self.home_button = pygame.Rect(10, 10, 30, 30)  # Position it in the top-left corner
         
         # Initialize pass button - position relative to board
         button_y = self.margin + self.board_pixels + 15
         self.pass_button = pygame.Rect(self.margin + self.board_pixels - 100, button_y, 100, 30)
-        self.pass_text = self.font.render('Pass Turn', True, BLACK)
+        self.pass_text = render_text(self.font, 'Pass Turn', BLACK)
 
         # Initialize restart button - position below pass button
         restart_y = button_y + 40
         self.restart_button = pygame.Rect(self.margin + self.board_pixels - 100, restart_y, 100, 30)
-        self.restart_text = self.font.render('Restart', True, BLACK)
+        self.restart_text = render_text(self.font, 'Restart', BLACK)
 
         # Initialize music button - position below restart button
         music_y = restart_y + 40
         self.music_button = pygame.Rect(self.margin + self.board_pixels - 100, music_y, 100, 30)
         
-        # Load and start background music
-        try:
-            pygame.mixer.music.load(MUSIC_FILE)
-            pygame.mixer.music.set_volume(0.5)  # Set volume to 50%
-            pygame.mixer.music.play(-1)  # Loop indefinitely
-            self.music_playing = True
-        except pygame.error as e:
-            print(f"Error loading music: {e}")
-            self.music_playing = False
-        
         self.update_music_text()
 
         # Initialize score display
@@ -155,20 +171,21 @@ class UI:
         self.draw_buttons()
         pygame.display.update()
 
+        # Start the background music once the board is on the screen; it keeps playing across games
+        self.music_playing = get_audio().play_music(MUSIC_FILE, volume=0.5)
+        self.update_music_text()
+        self.draw_buttons()
+        self.flush()
+
     def update_music_text(self):
         """Update the music button text based on current state"""
         text = 'Music: ON' if self.music_playing else 'Music: OFF'
-        self.music_text = self.font.render(text, True, BLACK)
+        self.music_text = render_text(self.font, text, BLACK)
 
     def toggle_music(self):
         """Toggle the background music on/off"""
         try:
-            if self.music_playing:
-                pygame.mixer.music.pause()
-                self.music_playing = False
-            else:
-                pygame.mixer.music.unpause()
-                self.music_playing = True
+            self.music_playing = get_audio().toggle_music()
             
             self.update_music_text()
             self.draw_buttons()
@@ -176,6 +193,20 @@ class UI:
         except pygame.error as e:
             print(f"Error toggling music: {e}")
 
+    def mark_dirty(self, rect):
+        """Remember a screen region that changed since the last flush()."""
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def flush(self):
+        """Push only the changed regions to the display."""
+        if self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+            self.dirty_rects = []
+
+    def invalidate(self):
+        """Force the info panel to be redrawn, e.g. after the whole screen was overdrawn."""
+        self._game_state_key = None
+
     def draw_buttons(self):
         """Draw all buttons on the screen"""
         # Draw pass button
@@ -198,7 +229,9 @@ class UI:
 
         # Draw home button
         self.screen.blit(self.home_icon, self.home_button)
-        pygame.display.update()
+        for rect in (self.pass_button, self.restart_button, self.music_button, self.home_button):
+            self.mark_dirty(rect)
+        self.flush()
 
     def pixel_to_board_coords(self, x, y):
         """Convert pixel coordinates to board coordinates."""
@@ -229,100 +262,137 @@ class UI:
         return (self.margin + x * self.cell_size,
                 self.margin + y * self.cell_size)
 
-    def draw(self, pos, color):
-        """Draw a stone at the given board position with a growing animation."""
+    def draw(self, pos, color, animate=True):
+        """
+        Draw a stone at the given board position. The growing animation is queued and
+        advanced by update_animations(), so this returns immediately.
+        """
         if not (0 <= pos[0] < self.board_size and 0 <= pos[1] < self.board_size):
             return False
-            
-        x, y = self.board_coords_to_pixel(*pos)
-        stone_color = BLACK if color == 'black' else WHITE
-        final_radius = int(self.cell_size * 0.35)  # Reduced stone size to 35% of cell size
-        
-        # Store the background before drawing
-        bg_rect = pygame.Rect(x - final_radius, y - final_radius,
-                            final_radius * 2, final_radius * 2)
-        bg_surface = self.screen.subsurface(bg_rect).copy()
-        
-        # Growing animation
-        for radius in range(2, final_radius + 1, 2):
-            # Restore background
-            self.screen.blit(bg_surface, bg_rect)
-            
-            # Draw stone with current radius
-            pygame.draw.circle(self.screen, stone_color, (x, y), radius)
-            if color == 'white':  # Add a black outline to white stones
-                pygame.draw.circle(self.screen, BLACK, (x, y), radius, 1)
-            
-            pygame.display.update(bg_rect)
-            pygame.time.delay(5)  # Short delay for smooth animation
-        
+        self.stones[pos] = color
+        radius = self.stone_radius
+        if animate and self.animations_enabled:
+            self.animator.add(Tween('place', [pos], color, 2, radius, STONE_ANIMATION_MS))
+        else:
+            self.animator.show(Tween('place', [pos], color, radius, radius, 0))
         return True
 
-    def remove(self, point):
-        """Remove a stone from the board at the given point with shrinking animation."""
-        x, y = self.board_coords_to_pixel(*point)
-        
-        # Calculate the area to clear
-        radius = int(self.cell_size * 0.35)  # Match the stone size
-        rect = pygame.Rect(x - radius, y - radius, radius * 2, radius * 2)
-        
-        # Get the clean background
-        bg_surface = self.background.subsurface(rect).copy()
-        
-        # Shrinking animation
-        for r in range(radius, 1, -2):
-            # Draw background
-            self.screen.blit(bg_surface, rect)
-            
-            # Draw shrinking stone
-            pygame.draw.circle(self.screen, (128, 128, 128), (x, y), r)  # Gray color for fading effect
-            
-            pygame.display.update(rect)
-            pygame.time.delay(5)
-        
-        # Finally restore the clean background
-        self.screen.blit(bg_surface, rect)
-        pygame.display.update(rect)
+    def remove(self, point, animate=True):
+        """
+        Remove a stone from the board at the given point with a shrinking animation.
+        Stones removed in the same frame, e.g. a captured group, shrink together.
+        """
+        self.stones.pop(point, None)
+        radius = self.stone_radius
+        if animate and self.animations_enabled:
+            self.animator.add(Tween('remove', [point], CAPTURED, radius, 0, STONE_ANIMATION_MS))
+        else:
+            self.animator.show(Tween('remove', [point], CAPTURED, radius, 0, 0))
+
+    def sync_board(self, board, points=None):
+        """
+        Bring the stones on the screen up to date with board without animations, drawing only
+        the intersections that changed; positions in between are never drawn.
+        :param points: only look at these points, e.g. those Board.jump_to() changed; None for the whole board
+        :return: the number of intersections redrawn
+        """
+        if points is None:
+            points = [(x, y) for x in range(self.board_size) for y in range(self.board_size)]
+        changed = 0
+        for x, y in points:
+            color = board.board[x][y]
+            if self.stones.get((x, y)) != color:
+                if color is None:
+                    self.remove((x, y), animate=False)
+                else:
+                    self.draw((x, y), color, animate=False)
+                changed += 1
+        return changed
+
+    @property
+    def stone_radius(self):
+        return int(self.cell_size * 0.35)  # Stone size is 35% of cell size
+
+    @property
+    def animating(self):
+        return self.animator.active
+
+    def update_animations(self, dt):
+        """Advance the queued animations by dt ms and push the changed regions to the display."""
+        self.animator.update(dt)
+        self.flush()
+
+    def finish_animations(self):
+        """Skip all queued animations to their final frame."""
+        self.animator.finish_all()
+        self.flush()
+
+    def _draw_tween(self, tween):
+        """Draw the current frame of a stone tween onto the clean background."""
+        radius = int(round(tween.value))
+        size = self.stone_radius
+        for point in tween.points:
+            x, y = self.board_coords_to_pixel(*point)
+            rect = pygame.Rect(x - size, y - size, size * 2 + 1, size * 2 + 1)
+            self.screen.blit(self.background, rect, rect)
+            if radius > 0:
+                blit_stone(self.screen, (x, y), radius, tween.color)
+            self.mark_dirty(rect)
 
     def save_image(self, path_to_save):
+        self.finish_animations()
         pygame.image.save(self.screen, path_to_save)
 
     def update_score_display(self, black_score, white_score, game_over=False):
         """Update the score display at the bottom of the board."""
         # Clear the score area
-        pygame.draw.rect(self.screen, (255, 255, 255), self.score_rect)
+        self.mark_dirty(pygame.draw.rect(self.screen, (255, 255, 255), self.score_rect))
         
         # Create score text
         black_text = f"Black: {black_score:.1f}"
         white_text = f"White: {white_score:.1f}"
         
         # Render score text
-        black_surface = self.font.render(black_text, True, (0, 0, 0))
-        white_surface = self.font.render(white_text, True, (0, 0, 0))
+        black_surface = render_text(self.font, black_text, (0, 0, 0))
+        white_surface = render_text(self.font, white_text, (0, 0, 0))
         
         # Position and display scores - adjust spacing for 19x19
         spacing = 200 if self.board_size == 19 else 250
-        self.screen.blit(black_surface, (50, self.margin + self.board_pixels + 20))
-        self.screen.blit(white_surface, (50 + spacing, self.margin + self.board_pixels + 20))
+        self.mark_dirty(self.screen.blit(black_surface, (50, self.margin + self.board_pixels + 20)))
+        self.mark_dirty(self.screen.blit(white_surface, (50 + spacing, self.margin + self.board_pixels + 20)))
         
         # If game is over, display winner
         if game_over:
             winner = "Black" if black_score > white_score else "White"
             winner_text = f"Winner: {winner}!"
-            winner_surface = self.font.render(winner_text, True, (0, 100, 0))
-            self.screen.blit(winner_surface, (50 + spacing * 2, self.margin + self.board_pixels + 20))
+            winner_surface = render_text(self.font, winner_text, (0, 100, 0))
+            self.mark_dirty(self.screen.blit(winner_surface, (50 + spacing * 2, self.margin + self.board_pixels + 20)))
         
-        pygame.display.update()
+        self.flush()
+
+    def get_scores(self, board):
+        """Return board.get_score(), recomputed only after the position changed."""
+        key = (id(board), board.version)
+        if key != self._scores_key:
+            self._scores = board.get_score()
+            self._scores_key = key
+        return self._scores
 
     def draw_game_state(self, current_player, board):
-        """Draw game state information including current player, scores, and pass button"""
+        """
+        Draw game state information including current player, scores, and pass button.
+        Nothing is drawn if the displayed information did not change; return if anything was drawn.
+        """
+        scores = self.get_scores(board)
+        key = (current_player, scores['black'], scores['white'], board.passes, self.music_playing)
+        if key == self._game_state_key:
+            return False
+        self._game_state_key = key
+
         # Clear the info area
         info_rect = pygame.Rect(self.margin + self.board_pixels + 20, self.margin + 20, 180, 200)
         pygame.draw.rect(self.screen, BACKGROUND_COLOR, info_rect)
         
-        # Get current scores
-        scores = board.get_score()
-        
         # Colors for different sections
         current_player_bg = (135, 206, 235)  # Sky blue
         black_score_bg = (144, 238, 144)  # Light green
@@ -331,19 +401,19 @@ class UI:
         # Draw current player indicator with rounded rectangle background
         current_rect = pygame.Rect(self.margin + self.board_pixels + 25, self.margin + 25, 160, 30)
         pygame.draw.rect(self.screen, current_player_bg, current_rect, border_radius=15)
-        player_text = self.font.render(f"Current: {current_player}", True, (0, 0, 0))
+        player_text = render_text(self.font, f"Current: {current_player}", (0, 0, 0))
         self.screen.blit(player_text, (self.margin + self.board_pixels + 35, self.margin + 30))
         
         # Draw black score with rounded rectangle background
         black_rect = pygame.Rect(self.margin + self.board_pixels + 25, self.margin + 65, 160, 30)
         pygame.draw.rect(self.screen, black_score_bg, black_rect, border_radius=15)
-        black_text = self.font.render(f"Black: {scores['black']:.1f}", True, (0, 0, 0))
+        black_text = render_text(self.font, f"Black: {scores['black']:.1f}", (0, 0, 0))
         self.screen.blit(black_text, (self.margin + self.board_pixels + 35, self.margin + 70))
         
         # Draw white score with rounded rectangle background
         white_rect = pygame.Rect(self.margin + self.board_pixels + 25, self.margin + 105, 160, 30)
         pygame.draw.rect(self.screen, white_score_bg, white_rect, border_radius=15)
-        white_text = self.font.render(f"White: {scores['white']:.1f}", True, (0, 0, 0))
+        white_text = render_text(self.font, f"White: {scores['white']:.1f}", (0, 0, 0))
         self.screen.blit(white_text, (self.margin + self.board_pixels + 35, self.margin + 110))
         
         # Draw buttons with enhanced styling
@@ -370,14 +440,18 @@ class UI:
             pass_rect = pygame.Rect(self.margin + self.board_pixels + 30, self.margin + 130, 100, 30)
             pygame.draw.rect(self.screen, (255, 220, 220), pass_rect)
             pygame.draw.rect(self.screen, (200, 0, 0), pass_rect, 2)
-            pass_count = self.font.render(f"Passes: {board.passes}", True, (200, 0, 0))
+            pass_count = render_text(self.font, f"Passes: {board.passes}", (200, 0, 0))
             text_rect = pass_count.get_rect(center=pass_rect.center)
             self.screen.blit(pass_count, text_rect)
         
-        pygame.display.update()
+        for rect in (info_rect, self.pass_button, self.restart_button, self.music_button):
+            self.mark_dirty(rect)
+        self.flush()
+        return True
 
     def show_game_over(self, black_score, white_score, board):
         """Display game over screen with final scores and details"""
+        self.finish_animations()
         # Store current window dimensions
         screen_width = max(820, self.margin * 2 + self.board_pixels + 200)
         screen_height = self.margin * 2 + self.board_pixels + 100
@@ -385,10 +459,9 @@ class UI:
         # Create a new surface for the game over screen
         game_over_surface = pygame.Surface((screen_width, screen_height))
         
-        # Load and scale background image for game over screen
+        # Scaled background image for game over screen, loaded only once
         try:
-            bg_image = pygame.image.load(BACKGROUND).convert()
-            bg_image = pygame.transform.scale(bg_image, (screen_width, screen_height))
+            bg_image = load_image(BACKGROUND, size=(screen_width, screen_height), convert=True)
             game_over_surface.blit(bg_image, (0, 0))
         except pygame.error:
             game_over_surface.fill((0, 0, 0))  # Black fallback if image fails to load
@@ -400,10 +473,10 @@ class UI:
         game_over_surface.blit(overlay, (0, 0))
         
         # Fonts for different text elements
-        game_over_font = pygame.font.SysFont('Arial', 48, bold=True)
-        score_font = pygame.font.SysFont('Arial', 36, bold=True)
-        detail_font = pygame.font.SysFont('Arial', 24)
-        instruction_font = pygame.font.SysFont('Arial', 20)
+        game_over_font = get_font('Arial', 48, bold=True)
+        score_font = get_font('Arial', 36, bold=True)
+        detail_font = get_font('Arial', 24)
+        instruction_font = get_font('Arial', 20)
 
         # Colors for different sections
         title_color = (255, 215, 0)  # Gold
@@ -459,14 +532,14 @@ class UI:
             if event.type == pygame.QUIT:
                 self._handle_exit()
         
-        # Wait for click to exit
+        # Wait for click to exit, sleeping until an event arrives
         waiting = True
         while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self._handle_exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    waiting = False
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                self._handle_exit()
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                waiting = False
         
         # Redraw the game board and all its elements
         self.initialize()
@@ -514,6 +587,10 @@ class UI:
                 y = self.margin + point[1] * self.cell_size
                 pygame.draw.circle(self.screen, BLACK, (x, y), 3)
         
+        self.invalidate()
+        self.animator.clear()
+        self.stones = {}
+        self.dirty_rects = []
         pygame.display.update()
 
     def clear_board(self):
@@ -564,6 +641,7 @@ class UI:
 
     def show_popup(self, message, duration=800):
         """Show a popup message for specified duration in milliseconds"""
+        self.finish_animations()
         # Store the current screen state
         current_screen = self.screen.copy()
 
@@ -585,23 +663,23 @@ class UI:
         pygame.draw.rect(self.screen, BLACK, popup_rect, 2)
 
         # Render message
-        text_surface = self.font.render(message, True, BLACK)
+        text_surface = render_text(self.font, message, BLACK)
         text_rect = text_surface.get_rect(center=popup_rect.center)
         self.screen.blit(text_surface, text_rect)
 
         # Update display
         pygame.display.update()
 
-        # Handle events during popup display
-        start_time = pygame.time.get_ticks()
-        while pygame.time.get_ticks() - start_time < duration:
+        # Handle events during popup display, sleeping until an event arrives or time is up
+        end_time = pygame.time.get_ticks() + duration
+        while pygame.time.get_ticks() < end_time:
             # Process events to prevent game from appearing frozen
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-            pygame.time.wait(10)  # Short delay to prevent high CPU usage
+            event = pygame.event.wait(max(1, end_time - pygame.time.get_ticks()))
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
 
         # Restore the previous screen state
         self.screen.blit(current_screen, (0, 0))
+        self.dirty_rects = []
         pygame.display.update()
\ No newline at end of file
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from game.go import Board, opponent_color
+from game.ai import choose_move
+from game.latency import LatencyStats
+from game.sgf import format_result
+"""
+Asyncio server hosting many games against the built-in AI at once, without pygame.
+
+Clients connect over TCP and exchange one JSON object per line. Every request may carry an "id",
+which is echoed in its response; responses have "ok": true, or "ok": false and an "error".
+    {"cmd": "new", "size": 9, "color": "black", "komi": 6.5}   -> game, and the AI's move if it starts
+    {"cmd": "play", "game": 1, "point": [x, y]}                 -> captured, the AI's reply, game over and result
+    {"cmd": "play", "game": 1, "point": null}                   passes
+    {"cmd": "resign" | "state" | "close", "game": 1}
+    {"cmd": "stats"}                                            -> server-wide counters and latencies
+Points are [x, y] as in game.go.Board: x is the column and y the row, both from the top left.
+Human moves are validated on the server's Board; AI moves are computed in a bounded process pool.
+Games are not tied to a connection, so a client may reconnect; games idle for too long are dropped.
+"""
+
+MAX_GAMES = 10000
+MAX_PENDING = 1024  # AI moves queued or running at once; further requests are answered with 'server busy'
+IDLE_TIMEOUT = 600.  # Seconds after which an untouched game is dropped
+MAX_MOVES = 2  # Moves per intersection after which a game ends, as a guard against endless games
+
+
+def compute_ai_move(snapshot):
+    """Run in a worker process: return the AI's move for the position Board.to_bytes() encoded, or None to pass."""
+    return choose_move(Board.from_bytes(snapshot))
+
+
+def is_int(value):
+    """JSON integers only: bool is a subclass of int, but true is not a number."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class Game:
+    def __init__(self, game_id, board_size, human_color, komi):
+        self.id = game_id
+        self.board = Board(board_size=board_size)
+        self.board.komi = komi
+        self.human_color = human_color
+        self.ai_color = opponent_color(human_color)
+        self.over = False
+        self.result = None
+        self.thinking = False  # An AI move is being computed
+        self.last_active = time.monotonic()
+        self.latency = LatencyStats(window=100)
+
+    def finish(self, result=None):
+        self.over = True
+        self.result = result or format_result(self.board.get_score())
+
+    def check_over(self):
+        """End the game after two passes or when the move limit is reached."""
+        if not self.over and (self.board.passes >= 2 or len(self.board.moves) >= MAX_MOVES * self.board.size ** 2):
+            self.finish()
+
+    def to_dict(self):
+        return {'game': self.id, 'size': self.board.size, 'human': self.human_color, 'next': self.board.next,
+                'moves': len(self.board.moves), 'over': self.over, 'result': self.result,
+                'captured': self.board.captured_stones, 'latency': self.latency.summary()}
+
+
+class GameServer:
+    def __init__(self, workers=None, max_games=MAX_GAMES, max_pending=MAX_PENDING, idle_timeout=IDLE_TIMEOUT):
+        """
+        :param workers: processes computing AI moves; None for one per CPU
+        :param max_pending: AI moves queued or running at once
+        """
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.max_games = max_games
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self.games = {}
+        self.game_ids = itertools.count(1)
+        self.pending = 0
+        self.num_connections = 0
+        self.counters = {'requests': 0, 'errors': 0, 'busy': 0, 'games_created': 0, 'games_dropped': 0}
+        self.move_latency = LatencyStats()  # From receiving a human move to sending the AI's reply
+        self.ai_latency = LatencyStats()  # Of the AI move alone, including the wait for a worker
+        self.commands = {'new': self.cmd_new, 'play': self.cmd_play, 'resign': self.cmd_resign,
+                         'state': self.cmd_state, 'close': self.cmd_close, 'stats': self.cmd_stats}
+
+    async def serve(self, host='127.0.0.1', port=8765, stats_interval=0):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print('Serving on %s' % ', '.join('%s:%d' % s.getsockname()[:2] for s in server.sockets))
+        tasks = [asyncio.ensure_future(self._reap_idle_games())]
+        if stats_interval > 0:
+            tasks.append(asyncio.ensure_future(self._report_stats(stats_interval)))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_client(self, reader, writer):
+        """Answer the requests of one connection in order."""
+        self.num_connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_request(line)
+                writer.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.num_connections -= 1
+            writer.close()
+
+    async def handle_request(self, line):
+        self.counters['requests'] += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+            request_id = request.get('id')
+            command = self.commands.get(request.get('cmd'))
+            if command is None:
+                raise ValueError('unknown command: %s' % request.get('cmd'))
+            response = await command(request)
+            response['ok'] = True
+        except (ValueError, KeyError, TypeError, RuntimeError) as e:
+            self.counters['errors'] += 1
+            response = {'ok': False, 'error': str(e) if not isinstance(e, KeyError) else 'missing %s' % e}
+        if request_id is not None:
+            response['id'] = request_id
+        return response
+
+    def get_game(self, request):
+        if not is_int(request['game']):
+            raise ValueError('invalid game: %s' % json.dumps(request['game']))
+        game = self.games.get(request['game'])
+        if game is None:
+            raise ValueError('no game %s' % request['game'])
+        game.last_active = time.monotonic()
+        return game
+
+    async def cmd_new(self, request):
+        if len(self.games) >= self.max_games:
+            raise RuntimeError('server full')
+        color = request.get('color', 'black')
+        if color not in ('black', 'white'):
+            raise ValueError('invalid color: %s' % color)
+        komi = request.get('komi', 6.5)
+        if not (is_int(komi) or isinstance(komi, float)) or not math.isfinite(komi):
+            raise ValueError('invalid komi: %s' % json.dumps(komi))
+        size = request.get('size', 19)
+        if not is_int(size):
+            raise ValueError('invalid size: %s' % json.dumps(size))
+        if color == 'white':
+            self.check_capacity()  # The AI starts
+        game = Game(next(self.game_ids), size, color, float(komi))
+        self.games[game.id] = game
+        self.counters['games_created'] += 1
+        response = {'game': game.id}
+        if game.board.next == game.ai_color:
+            response.update(await self.play_ai_move(game))
+        return response
+
+    async def cmd_play(self, request):
+        start = time.perf_counter()
+        game = self.get_game(request)
+        if game.over:
+            raise ValueError('game over')
+        if game.thinking or game.board.next != game.human_color:
+            raise ValueError('not your turn')
+        # Checked before the human move is played, so that a busy server never leaves the AI without its turn
+        self.check_capacity()
+        point = request['point']
+        if point is None:
+            game.board.pass_move()
+            response = {'captured': []}
+        else:
+            if not isinstance(point, list) or len(point) != 2 or not all(is_int(v) for v in point):
+                raise ValueError('invalid point: %s' % json.dumps(point))
+            success, captured = game.board.put_stone(tuple(point))
+            if not success:
+                raise ValueError('illegal move')
+            response = {'captured': captured}
+        game.check_over()
+        if not game.over:
+            response.update(await self.play_ai_move(game))
+        response.update({'over': game.over, 'result': game.result})
+        elapsed = time.perf_counter() - start
+        game.latency.add(elapsed)
+        self.move_latency.add(elapsed)
+        return response
+
+    def check_capacity(self):
+        """Raise RuntimeError if no further AI move may be queued."""
+        if self.pending >= self.max_pending:
+            self.counters['busy'] += 1
+            raise RuntimeError('server busy')
+
+    async def play_ai_move(self, game):
+        """Compute the AI's move in the process pool and play it; call check_capacity() first."""
+        self.pending += 1
+        game.thinking = True
+        start = time.perf_counter()
+        try:
+            # The position without its history is a small fixed-size snapshot, cheap to send to a worker
+            move = await asyncio.get_running_loop().run_in_executor(self.executor, compute_ai_move,
+                                                                    game.board.to_bytes(history=False))
+        except Exception as e:
+            print('AI move failed: %s' % e)
+            move = None
+        finally:
+            self.pending -= 1
+            game.thinking = False
+        self.ai_latency.add(time.perf_counter() - start)
+        if game.over or game.id not in self.games:
+            return {'ai_move': None}  # Resigned or closed meanwhile
+        if move is None:
+            game.board.pass_move()
+            captured = []
+        else:
+            success, captured = game.board.put_stone(move)
+            if not success:
+                raise RuntimeError('AI chose an illegal move: %s' % (move,))
+        game.check_over()
+        return {'ai_move': move, 'ai_captured': captured}
+
+    async def cmd_resign(self, request):
+        game = self.get_game(request)
+        if not game.over:
+            game.finish('%s+R' % ('B' if game.ai_color == 'black' else 'W'))
+        return {'over': True, 'result': game.result}
+
+    async def cmd_state(self, request):
+        game = self.get_game(request)
+        response = game.to_dict()
+        response['board'] = str(game.board).split('\n')
+        return response
+
+    async def cmd_close(self, request):
+        game = self.get_game(request)
+        del self.games[game.id]
+        return {}
+
+    async def cmd_stats(self, request=None):
+        return {'games': len(self.games), 'connections': self.num_connections, 'pending_ai_moves': self.pending,
+                'counters': dict(self.counters), 'move_latency': self.move_latency.summary(),
+                'ai_latency': self.ai_latency.summary()}
+
+    async def _reap_idle_games(self):
+        while True:
+            await asyncio.sleep(min(60., self.idle_timeout / 2))
+            deadline = time.monotonic() - self.idle_timeout
+            idle = [game_id for game_id, game in self.games.items() if game.last_active < deadline and not game.thinking]
+            for game_id in idle:
+                del self.games[game_id]
+            self.counters['games_dropped'] += len(idle)
+
+    async def _report_stats(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            stats = await self.cmd_stats()
+            latency = stats['move_latency']
+            print('%d games, %d connections, %d pending; move latency p50 %s p95 %s p99 %s ms; %d errors'
+                  % (stats['games'], stats['connections'], stats['pending_ai_moves'], latency['p50'], latency['p95'],
+                     latency['p99'], stats['counters']['errors']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host many games against the built-in AI over TCP (JSON lines)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=8765)
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='processes computing AI moves; DEFAULT is one per CPU')
+    parser.add_argument('--max-games', type=int, default=MAX_GAMES)
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING,
+                        help='AI moves queued or running at once; DEFAULT is %d' % MAX_PENDING)
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT, help='seconds before idle games are dropped')
+    parser.add_argument('--stats-interval', type=float, default=10., help='seconds between stats lines; 0 for none')
+    args = parser.parse_args()
+
+    server = GameServer(workers=args.workers, max_games=args.max_games, max_pending=args.max_pending,
+                        idle_timeout=args.idle_timeout)
+    try:
+        asyncio.run(server.serve(args.host, args.port, stats_interval=args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
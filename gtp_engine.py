@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+import argparse
+import sys
+import time
+from game.go import Board
+from game.ai import choose_move
+from game.sgf import format_result
+"""
+GTP (Go Text Protocol, version 2) engine: plays through stdin/stdout under a tournament manager
+such as gogui-twogtp, without the GUI. Log messages go to stderr.
+"""
+
+NAME = 'PPD-GO-GAME'
+VERSION = '1.0'
+GTP_COLUMNS = 'ABCDEFGHJKLMNOPQRSTUVWXYZ'  # GTP skips the letter I
+SAFETY_MARGIN = 0.8  # Fraction of the computed time budget actually used, for overhead and clock jitter
+MIN_MOVES_LEFT = 15  # The main time is never spread over fewer moves than this
+DEFAULT_MOVE_TIME = 5.  # Seconds per move for search agents if the controller sets no time limit
+
+
+class TimeManager:
+    def __init__(self):
+        """Tracks the clocks of both players, as set by time_settings and time_left."""
+        self.main_time = None  # None means no time limit
+        self.byo_yomi_time = 0
+        self.byo_yomi_stones = 0
+        self.time_left = {}  # color -> seconds left in the current period
+        self.stones_left = {}  # color -> stones left in the byo-yomi period; 0 while in main time
+
+    def set_time_settings(self, main_time, byo_yomi_time, byo_yomi_stones):
+        if byo_yomi_time > 0 and byo_yomi_stones == 0:
+            # By the GTP specification this means no time limit
+            self.main_time = None
+        else:
+            self.main_time = main_time
+        self.byo_yomi_time = byo_yomi_time
+        self.byo_yomi_stones = byo_yomi_stones
+        for color in ('black', 'white'):
+            self.time_left[color] = main_time
+            self.stones_left[color] = 0
+            if main_time == 0:
+                self.time_left[color], self.stones_left[color] = byo_yomi_time, byo_yomi_stones
+
+    def set_time_left(self, color, seconds, stones):
+        self.time_left[color] = seconds
+        self.stones_left[color] = stones
+
+    def get_budget(self, color, board):
+        """Return the seconds color may think about the next move, or None if there is no time limit."""
+        if self.main_time is None:
+            return None
+        time_left = self.time_left.get(color, self.main_time)
+        stones_left = self.stones_left.get(color, 0)
+        if stones_left > 0:
+            # In byo-yomi: spread the period over the stones still to be played in it
+            return max(0., time_left / stones_left * SAFETY_MARGIN)
+        # In main time: assume the game lasts until about a third of the empty points are filled
+        num_empty = sum(column[:board.size].count(None) for column in board.board[:board.size])
+        moves_left = max(MIN_MOVES_LEFT, num_empty // 3)
+        budget = time_left / moves_left
+        if self.byo_yomi_stones > 0:
+            budget += self.byo_yomi_time / self.byo_yomi_stones
+        return max(0., budget * SAFETY_MARGIN)
+
+    def record_used(self, color, seconds):
+        """Update our own view of the clock; the controller corrects it with time_left."""
+        if self.main_time is None or color not in self.time_left:
+            return
+        self.time_left[color] -= seconds
+        if self.stones_left[color] > 0:
+            self.stones_left[color] -= 1
+            if self.stones_left[color] == 0:
+                self.time_left[color], self.stones_left[color] = self.byo_yomi_time, self.byo_yomi_stones
+        elif self.time_left[color] <= 0 and self.byo_yomi_stones > 0:
+            self.time_left[color], self.stones_left[color] = self.byo_yomi_time, self.byo_yomi_stones
+
+
+class BuiltinPlayer:
+    """The built-in AI of the GUI; it takes a few milliseconds per move, so it needs no time management."""
+    name = 'builtin'
+
+    def genmove(self, board, budget):
+        """:return: the point to play for board.next, or None to pass"""
+        return choose_move(board)
+
+
+class AgentPlayer:
+    def __init__(self, agent_cls, *args):
+        """
+        Plays with an agent from agent/, created for the color to move.
+        :param args: further arguments of the agent constructor
+        """
+        self.agent_cls = agent_cls
+        self.args = args
+        self.name = agent_cls.__name__
+
+    def genmove(self, board, budget):
+        agent = self.agent_cls(board.next.upper(), *self.args)
+        return agent.get_action(board)
+
+
+class DeepeningPlayer(AgentPlayer):
+    def __init__(self, agent_cls, max_depth=4):
+        """
+        Plays with a search agent by iterative deepening: the search depth grows by one
+        while the next iteration is expected to finish within the time budget.
+        """
+        super().__init__(agent_cls)
+        self.max_depth = max_depth
+
+    def genmove(self, board, budget):
+        if budget is None:
+            budget = DEFAULT_MOVE_TIME
+        deadline = time.perf_counter() + budget
+        move = None
+        previous_elapsed = None
+        for depth in range(1, self.max_depth + 1):
+            start = time.perf_counter()
+            move = self.agent_cls(board.next.upper(), depth).get_action(board.copy())
+            elapsed = time.perf_counter() - start
+            # Each level multiplies the work by about the ratio seen between the last two levels
+            growth = elapsed / previous_elapsed if previous_elapsed else 10.
+            previous_elapsed = max(elapsed, 1e-6)
+            if time.perf_counter() + elapsed * growth > deadline:
+                break
+        print('%s searched to depth %d' % (self.name, depth), file=sys.stderr)
+        return move
+
+
+def create_player(name, depth=None):
+    """
+    :param name: builtin; random; greedy; minimax; expectimax
+    :param depth: maximum search depth of minimax and expectimax
+    """
+    # The agents are only imported if asked for; they pull in NumPy
+    if name == 'builtin':
+        return BuiltinPlayer()
+    if name in ('random', 'greedy'):
+        from agent.basic_agent import RandomAgent, GreedyAgent
+        return AgentPlayer(RandomAgent if name == 'random' else GreedyAgent)
+    if name in ('minimax', 'expectimax'):
+        from agent.search.search_agent import AlphaBetaAgent, ExpectimaxAgent
+        return DeepeningPlayer(AlphaBetaAgent if name == 'minimax' else ExpectimaxAgent, max_depth=depth or 4)
+    raise ValueError('Unknown agent: %s' % name)
+
+
+def parse_color(value):
+    value = value.lower()
+    if value in ('b', 'black'):
+        return 'black'
+    if value in ('w', 'white'):
+        return 'white'
+    raise ValueError('invalid color')
+
+
+def parse_vertex(value, board_size):
+    """'D4' -> (x, y) with y counted from the top as in Board; 'pass' -> None."""
+    value = value.upper()
+    if value == 'PASS':
+        return None
+    if len(value) < 2 or value[0] not in GTP_COLUMNS[:board_size] or not value[1:].isdigit():
+        raise ValueError('invalid vertex')
+    row = int(value[1:])
+    if not 1 <= row <= board_size:
+        raise ValueError('invalid vertex')
+    return GTP_COLUMNS.index(value[0]), board_size - row
+
+
+def format_vertex(point, board_size):
+    if point is None:
+        return 'pass'
+    return '%s%d' % (GTP_COLUMNS[point[0]], board_size - point[1])
+
+
+class GtpEngine:
+    def __init__(self, player, board_size=19, komi=6.5):
+        self.player = player
+        self.board = Board(board_size=board_size)
+        self.board.komi = komi
+        self.time_manager = TimeManager()
+        self.quit = False
+        self.commands = {name[len('cmd_'):]: getattr(self, name) for name in dir(self) if name.startswith('cmd_')}
+
+    def handle(self, line):
+        """Execute one command line; return the response, or None for empty and comment lines."""
+        line = ''.join(c for c in line.split('#', 1)[0] if c == '\t' or c == '\n' or ord(c) >= 32).strip()
+        if not line:
+            return None
+        parts = line.replace('\t', ' ').split()
+        command_id = ''
+        if parts[0].isdigit():
+            command_id = parts.pop(0)
+            if not parts:
+                return '?%s missing command\n\n' % command_id
+        command, args = parts[0].lower(), parts[1:]
+        if command not in self.commands:
+            return '?%s unknown command\n\n' % command_id
+        try:
+            result = self.commands[command](*args)
+        except (ValueError, TypeError, IndexError) as e:
+            return '?%s %s\n\n' % (command_id, e)
+        return '=%s %s\n\n' % (command_id, result or '')
+
+    def run(self, f_in=sys.stdin, f_out=sys.stdout):
+        for line in f_in:
+            response = self.handle(line)
+            if response is not None:
+                f_out.write(response)
+                f_out.flush()
+            if self.quit:
+                break
+
+    # Administrative commands
+    def cmd_protocol_version(self):
+        return '2'
+
+    def cmd_name(self):
+        return NAME
+
+    def cmd_version(self):
+        return '%s (%s)' % (VERSION, self.player.name)
+
+    def cmd_known_command(self, name):
+        return 'true' if name in self.commands else 'false'
+
+    def cmd_list_commands(self):
+        return '\n'.join(sorted(self.commands))
+
+    def cmd_quit(self):
+        self.quit = True
+
+    # Setup commands
+    def cmd_boardsize(self, size):
+        try:
+            board = Board(board_size=int(size))
+        except ValueError:
+            raise ValueError('unacceptable size')
+        board.komi = self.board.komi
+        self.board = board
+
+    def cmd_clear_board(self):
+        self.cmd_boardsize(str(self.board.size))
+
+    def cmd_komi(self, komi):
+        try:
+            self.board.komi = float(komi)
+        except ValueError:
+            raise ValueError('syntax error')
+
+    # Core play commands
+    def cmd_play(self, color, vertex):
+        color = parse_color(color)
+        point = parse_vertex(vertex, self.board.size)
+        self.board.next = color
+        if point is None:
+            self.board.pass_move()
+        elif not self.board.put_stone(point)[0]:
+            raise ValueError('illegal move')
+
+    def cmd_genmove(self, color):
+        color = parse_color(color)
+        self.board.next = color
+        budget = self.time_manager.get_budget(color, self.board)
+        start = time.perf_counter()
+        try:
+            point = self.player.genmove(self.board.copy(), budget)
+        except Exception as e:
+            # A controller counts an error reply as a loss; play the built-in AI's move instead
+            print('%s failed (%r); using the built-in AI' % (self.player.name, e), file=sys.stderr)
+            point = choose_move(self.board.copy())
+        if point is not None and not self.board.is_valid_move(point):
+            print('%s chose the illegal move %s; passing' % (self.player.name, point), file=sys.stderr)
+            point = None
+        if point is None:
+            self.board.pass_move()
+        else:
+            self.board.put_stone(point)
+        self.time_manager.record_used(color, time.perf_counter() - start)
+        return format_vertex(point, self.board.size)
+
+    def cmd_undo(self):
+        if self.board.undo() is None:
+            raise ValueError('cannot undo')
+
+    # Time control commands
+    def cmd_time_settings(self, main_time, byo_yomi_time, byo_yomi_stones):
+        self.time_manager.set_time_settings(float(main_time), float(byo_yomi_time), int(byo_yomi_stones))
+
+    def cmd_time_left(self, color, seconds, stones):
+        self.time_manager.set_time_left(parse_color(color), float(seconds), int(stones))
+
+    # Informative commands
+    def cmd_showboard(self):
+        return '\n' + str(self.board)
+
+    def cmd_final_score(self):
+        return format_result(self.board.get_score())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GTP engine for the Go agents')
+    parser.add_argument('-a', '--agent', default='builtin',
+                        help='builtin; random; greedy; minimax; expectimax; DEFAULT is builtin')
+    parser.add_argument('-d', '--depth', type=int, default=None,
+                        help='maximum search depth of minimax and expectimax; DEFAULT is 4')
+    parser.add_argument('-s', '--size', type=int, default=19, help='initial board size; DEFAULT is 19')
+    args = parser.parse_args()
+
+    engine = GtpEngine(create_player(args.agent, args.depth), board_size=args.size)
+    engine.run()
+
+
+if __name__ == '__main__':
+    main()
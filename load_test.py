@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import json
+import random
+import shlex
+import sys
+import time
+from collections import Counter
+from game.go import Board
+from game.latency import LatencyStats
+from gtp_engine import format_vertex, parse_vertex
+"""
+Load generator for the game server (game_server.py) and the GTP engine (gtp_engine.py).
+
+Simulates N concurrent human players. Each one plays games against the AI, choosing random legal moves
+on its own Board and waiting a think time drawn from a distribution before each move, and reports
+throughput, move latency percentiles (from sending the human move to receiving the AI's reply) and error rates.
+Against the GTP engine every player runs its own engine process.
+"""
+
+MAX_MOVES = 2  # Moves per intersection after which a simulated player passes
+
+
+class ThinkTime:
+    def __init__(self, spec):
+        """
+        A think time distribution, in seconds.
+        :param spec: 'const:S', 'uniform:A:B', 'exp:MEAN' or 'lognormal:MEDIAN:SIGMA'; a bare number is constant
+        """
+        self.spec = spec
+        kind, *values = spec.split(':') if ':' in spec else ('const', spec)
+        try:
+            values = [float(value) for value in values]
+        except ValueError:
+            raise ValueError('Invalid think time: %s' % spec)
+        num_values = {'const': 1, 'uniform': 2, 'exp': 1, 'lognormal': 2}.get(kind)
+        if num_values is None or len(values) != num_values or min(values) < 0:
+            raise ValueError('Invalid think time: %s' % spec)
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng):
+        if self.kind == 'const':
+            return self.values[0]
+        if self.kind == 'uniform':
+            return rng.uniform(*self.values)
+        if self.kind == 'exp':
+            return rng.expovariate(1. / self.values[0]) if self.values[0] > 0 else 0.
+        median, sigma = self.values
+        return median * rng.lognormvariate(0., sigma)
+
+
+class Results:
+    def __init__(self):
+        self.latency = LatencyStats(window=1000000)
+        self.games = 0
+        self.moves = 0
+        self.errors = Counter()
+        self.start = time.perf_counter()
+        self.end = None
+
+    def summary(self):
+        elapsed = (self.end or time.perf_counter()) - self.start
+        requests = self.moves + sum(self.errors.values())
+        return {'elapsed': round(elapsed, 3), 'games': self.games, 'moves': self.moves,
+                'moves_per_second': round(self.moves / elapsed, 2) if elapsed > 0 else None,
+                'latency_ms': self.latency.summary(),
+                'errors': dict(self.errors),
+                'error_rate': round(sum(self.errors.values()) / requests, 4) if requests else 0.}
+
+
+class ServerClient:
+    """A player's connection to game_server.py."""
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+        self.game = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, **request):
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError('connection closed by the server')
+        response = json.loads(line)
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response
+
+    async def new_game(self, board_size):
+        """Start a game with the simulated player as black."""
+        if self.game is not None:
+            try:
+                await self.request(cmd='close', game=self.game)
+            except RuntimeError:
+                pass
+        self.game = (await self.request(cmd='new', size=board_size, color='black'))['game']
+
+    async def play(self, point, board_size):
+        """:return: (the AI's reply or None for a pass, game over)"""
+        response = await self.request(cmd='play', game=self.game, point=list(point) if point is not None else None)
+        move = response.get('ai_move')
+        return (tuple(move) if move is not None else None), response['over']
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class GtpClient:
+    """A player's own GTP engine process."""
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+
+    async def connect(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *shlex.split(self.command), stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL)
+
+    async def request(self, command):
+        self.process.stdin.write(command.encode() + b'\n')
+        await self.process.stdin.drain()
+        lines = []
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise ConnectionError('engine exited')
+            line = line.decode().rstrip('\r\n')
+            if not line and lines:
+                break
+            if line:
+                lines.append(line)
+        response = '\n'.join(lines)
+        if response.startswith('?'):
+            raise RuntimeError(response[1:].strip() or 'engine error')
+        return response[1:].strip()
+
+    async def new_game(self, board_size):
+        await self.request('boardsize %d' % board_size)
+        await self.request('clear_board')
+
+    async def play(self, point, board_size):
+        await self.request('play b %s' % format_vertex(point, board_size))
+        vertex = await self.request('genmove w')
+        if vertex.lower() == 'resign':
+            return None, True
+        # A GTP engine does not end the game itself; two passes in a row do
+        return parse_vertex(vertex, board_size), False
+
+    async def close(self):
+        if self.process is not None and self.process.returncode is None:
+            try:
+                await self.request('quit')
+            except (ConnectionError, RuntimeError, BrokenPipeError):
+                pass
+            await self.process.wait()
+
+
+async def run_player(create_client, board_size, think_time, deadline, results, rng):
+    """Play games until the deadline; errors are counted, and the game or connection is started over."""
+    client = None
+    while time.perf_counter() < deadline:
+        try:
+            if client is None:
+                client = create_client()
+                await client.connect()
+            await client.new_game(board_size)
+            board = Board(board_size=board_size)
+            over = False
+            while not over and time.perf_counter() < deadline:
+                await asyncio.sleep(think_time.sample(rng))
+                moves = board.get_legal_moves()
+                if moves and len(board.moves) < MAX_MOVES * board_size ** 2:
+                    point = rng.choice(sorted(moves))
+                else:
+                    point = None
+                start = time.perf_counter()
+                reply, over = await client.play(point, board_size)
+                results.latency.add(time.perf_counter() - start)
+                results.moves += 1
+                if point is None:
+                    board.pass_move()
+                elif not board.put_stone(point)[0]:
+                    raise RuntimeError('local board rejected %s' % (point,))
+                if reply is None:
+                    over = over or board.passes >= 1
+                    if not over:
+                        board.pass_move()
+                elif not board.put_stone(reply)[0]:
+                    raise RuntimeError('illegal AI move %s' % (reply,))
+            results.games += over
+        except (ConnectionError, OSError) as e:
+            results.errors['connection: %s' % e.__class__.__name__] += 1
+            if client is not None:
+                await client.close()
+            client = None
+            await asyncio.sleep(0.5)
+        except (RuntimeError, ValueError) as e:
+            results.errors[str(e)] += 1
+    if client is not None:
+        await client.close()
+
+
+async def run_load_test(create_client, num_players, duration, board_size=9, think_time='exp:1', ramp_up=0.,
+                        seed=None, report_interval=0.):
+    """
+    :param create_client: function() -> a new ServerClient or GtpClient
+    :param ramp_up: seconds over which the players are started
+    :return: Results
+    """
+    think_time = ThinkTime(think_time)
+    rng = random.Random(seed)
+    results = Results()
+    deadline = results.start + duration
+
+    async def start_player(i):
+        await asyncio.sleep(ramp_up * i / max(1, num_players))
+        await run_player(create_client, board_size, think_time, deadline, results, random.Random(rng.random()))
+
+    async def report():
+        while True:
+            await asyncio.sleep(report_interval)
+            summary = results.summary()
+            print('%.0fs: %d moves (%s/s), p50 %s p95 %s p99 %s ms, error rate %s'
+                  % (summary['elapsed'], summary['moves'], summary['moves_per_second'], summary['latency_ms']['p50'],
+                     summary['latency_ms']['p95'], summary['latency_ms']['p99'], summary['error_rate']),
+                  file=sys.stderr)
+
+    reporter = asyncio.ensure_future(report()) if report_interval > 0 else None
+    await asyncio.gather(*[start_player(i) for i in range(num_players)])
+    if reporter is not None:
+        reporter.cancel()
+    results.end = time.perf_counter()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate concurrent players against the game server or GTP engine')
+    parser.add_argument('-n', '--players', type=int, default=100, help='concurrent players; DEFAULT is 100')
+    parser.add_argument('-d', '--duration', type=float, default=30., help='seconds to run; DEFAULT is 30')
+    parser.add_argument('-s', '--size', type=int, default=9, help='board size; DEFAULT is 9')
+    parser.add_argument('-t', '--think', default='exp:1',
+                        help='think time distribution in seconds: const:S, uniform:A:B, exp:MEAN or '
+                             'lognormal:MEDIAN:SIGMA; DEFAULT is exp:1')
+    parser.add_argument('--ramp-up', type=float, default=0., help='seconds over which the players are started')
+    parser.add_argument('--host', default='127.0.0.1', help='host of the game server')
+    parser.add_argument('-p', '--port', type=int, default=8765, help='port of the game server')
+    parser.add_argument('--gtp', default=None,
+                        help='test a GTP engine started with this command per player, e.g. "./gtp_engine.py", '
+                             'instead of the game server')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--report-interval', type=float, default=5., help='seconds between progress lines; 0 for none')
+    parser.add_argument('-o', '--output', default=None, help='also write the results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.gtp:
+        create_client = lambda: GtpClient(args.gtp)
+    else:
+        create_client = lambda: ServerClient(args.host, args.port)
+    results = asyncio.run(run_load_test(create_client, args.players, args.duration, board_size=args.size,
+                                        think_time=args.think, ramp_up=args.ramp_up, seed=args.seed,
+                                        report_interval=args.report_interval))
+    summary = results.summary()
+    summary.update({'players': args.players, 'board_size': args.size, 'think_time': args.think,
+                    'target': args.gtp or '%s:%d' % (args.host, args.port)})
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
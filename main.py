@@ -1,11 +1,18 @@
 #!/usr/bin/env python
+from game import startup
 from game.go import Board, opponent_color
 from game.ui import UI
+from game.assets import get_font, render_text, load_image
+from game.ai import choose_move, get_position_table
+from game.ai_worker import AIWorker, AI_MOVE_DONE_EVENT
+from game.audio import get_audio
+from game.sgf import SgfGame, format_result, write_sgf
+import argparse
 import pygame
 import sys
-import time
 from os.path import join
 import os
+startup.mark('imports')
 
 def get_resource_path(relative_path):
     """Get the absolute path to a resource, works for dev and for PyInstaller"""
@@ -16,28 +23,76 @@ def get_resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+# Posted by a timer when the AI should make its move
+AI_MOVE_EVENT = pygame.USEREVENT + 1
+AI_MOVE_DELAY = 500  # ms
+ANIMATION_FRAME_MS = 16  # Frame time while stone animations are running
+SPECTATOR_MAX_MOVES = 2  # Spectated AI vs AI games end after this many moves per intersection
+REVIEW_STEP = 10  # Moves skipped by Page Up and Page Down
+# The game in progress is saved here after every move, so that it survives a crash; see --resume
+AUTOSAVE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'go-game', 'autosave.bin')
+GAME_MODES = ('PVP', 'AI_HUMAN', 'AI_AI')
+
+
+def load_autosave(path=AUTOSAVE_FILE):
+    """:return: (game mode, Board) of the autosaved game, or None if there is none"""
+    try:
+        with open(path, 'rb') as f:
+            game_mode, snapshot = f.read().split(b'\n', 1)
+        game_mode = game_mode.decode('ascii')
+        if game_mode not in GAME_MODES:
+            raise ValueError('unknown game mode %r' % game_mode)
+        return game_mode, Board.from_bytes(snapshot)
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print('Could not load the autosaved game: %s' % e)
+        return None
+
 class Match:
-    def __init__(self, game_mode="PVP", board_size=19):
-        """Initialize game state."""
-        pygame.init()
+    def __init__(self, game_mode="PVP", board_size=19, ponder=False, speed=None, max_fps=30, board=None,
+                 show_menu=True):
+        """
+        Initialize game state.
+        :param show_menu: let the player choose the game mode and board size on the welcome screen;
+                          if False, play game_mode on a board of board_size
+        :param board: a position to continue, e.g. from load_autosave(); board_size is ignored
+        :param ponder: if True, the AI prepares its reply while the human thinks
+        :param speed: AI vs AI spectator mode: moves per second, 0 for as fast as the engine plays;
+                      None plays at the normal pace with animations
+        :param max_fps: spectator mode: at most this many frames per second are drawn
+        """
+        pygame.display.init()
         pygame.font.init()
-        self.font = pygame.font.SysFont('Arial', 20)
+        startup.mark('pygame init')
+        self.font = get_font('Arial', 20)
         self.dir_save = None  # Initialize dir_save to None
         self.time_elapsed = 0  # Initialize time_elapsed
         
         # Select game mode and board size if not provided
-        if game_mode == "PVP" and board_size == 19:
+        if board is not None:
+            self.game_mode = game_mode
+            self.board_size = board.size
+        elif show_menu:
             self.game_mode, self.board_size = self._select_game_mode_and_board_size()
         else:
             self.game_mode = game_mode
             self.board_size = board_size
         
         # Initialize board with Black starting
-        self.board = Board(board_size=self.board_size, next_color='black')
+        self.board = board if board is not None else Board(board_size=self.board_size, next_color='black')
         self.ui = UI(board_size=self.board_size)
         self.ui.initialize()
         self.game_over = False
-        self.last_move_was_pass = False
+        self.last_move_was_pass = self.board.passes > 0
+        self.autosaved = (self.board, len(self.board.moves))  # The board and number of moves last autosaved
+        self.ai_worker = AIWorker(choose_move, ponder=ponder)
+        
+        # Spectator mode draws the latest position once per frame instead of every move
+        self.speed = speed
+        self.frame_ms = 1000 // max_fps
+        self.render_pending = False
+        self.last_render = 0
+        self.ui.animations_enabled = not self.spectator
         
         # Add signal handler for clean exit
         try:
@@ -49,12 +104,17 @@ class Match:
 
     def _handle_exit(self, *args):
         """Handle clean exit when window is closed"""
+        self.ai_worker.shutdown()
         try:
             pygame.quit()
         except:
             pass
         sys.exit(0)
 
+    @property
+    def spectator(self):
+        return self.speed is not None and self.game_mode == "AI_AI"
+
     @property
     def winner(self):
         return self.board.winner
@@ -77,7 +137,7 @@ class Match:
         Second page: Board Size Selection
         Third page: Game Mode Selection
         """
-        pygame.init()
+        pygame.display.init()
         screen_width, screen_height = 600, 500
         screen = pygame.display.set_mode((screen_width, screen_height))
         pygame.display.set_caption('Go Game - Welcome')
@@ -90,15 +150,14 @@ class Match:
         TEXT_COLOR = (255, 255, 255)  # White text for better visibility on background
         
         # Fonts
-        title_font = pygame.font.SysFont('Arial', 48, bold=True)
-        button_font = pygame.font.SysFont('Arial', 22)
-        subtitle_font = pygame.font.SysFont('Arial', 20)
-        rules_font = pygame.font.SysFont('Arial', 16)
+        title_font = get_font('Arial', 48, bold=True)
+        button_font = get_font('Arial', 22)
+        subtitle_font = get_font('Arial', 20)
+        rules_font = get_font('Arial', 16)
         
         # Load and scale background image
         try:
-            bg_image = pygame.image.load(get_resource_path('game/images/ramin.jpg'))
-            bg_image = pygame.transform.scale(bg_image, (screen_width, screen_height))
+            bg_image = load_image(get_resource_path('game/images/ramin.jpg'), size=(screen_width, screen_height))
         except pygame.error:
             print("Warning: Could not load background image")
             bg_image = None
@@ -116,7 +175,7 @@ class Match:
             screen.blit(overlay, (0, 0))
             
             # Draw title
-            title = title_font.render("GO GAME", True, SPLASH_TEXT_COLOR)
+            title = render_text(title_font, "GO GAME", SPLASH_TEXT_COLOR)
             title_rect = title.get_rect(center=(screen_width//2, screen_height//4))
             screen.blit(title, title_rect)
             
@@ -129,7 +188,7 @@ class Match:
                                     screen_height//2 - button_height - button_spacing//2,
                                     button_width, button_height)
             pygame.draw.rect(screen, BUTTON_COLOR, play_button, border_radius=10)
-            play_text = button_font.render("Play Game", True, MENU_TEXT_COLOR)
+            play_text = render_text(button_font, "Play Game", MENU_TEXT_COLOR)
             play_text_rect = play_text.get_rect(center=play_button.center)
             screen.blit(play_text, play_text_rect)
             
@@ -138,7 +197,7 @@ class Match:
                                      screen_height//2 + button_spacing//2,
                                      button_width, button_height)
             pygame.draw.rect(screen, BUTTON_COLOR, rules_button, border_radius=10)
-            rules_text = button_font.render("Rules", True, MENU_TEXT_COLOR)
+            rules_text = render_text(button_font, "Rules", MENU_TEXT_COLOR)
             rules_text_rect = rules_text.get_rect(center=rules_button.center)
             screen.blit(rules_text, rules_text_rect)
             
@@ -168,35 +227,14 @@ class Match:
             # Initialize scrolling variables
             scroll_y = 0
             scroll_speed = 25
-            max_scroll = 0  # Will be calculated after rendering text
             
             # Back button
             button_width, button_height = 100, 40
             back_button = pygame.Rect(20, screen_height - button_height - 20,
                                     button_width, button_height)
 
-            # Create a loop for the rules screen
-            viewing_rules = True
-            while viewing_rules:
-                # Handle events first
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        return None
-                    if event.type == pygame.MOUSEBUTTONDOWN:
-                        if back_button.collidepoint(event.pos):
-                            return back_button
-                        # Scroll with mouse wheel
-                        if event.button == 4:  # Mouse wheel up
-                            scroll_y = min(0, scroll_y + scroll_speed)
-                        if event.button == 5:  # Mouse wheel down
-                            scroll_y = max(-(max_scroll - screen_height + 150), scroll_y - scroll_speed)
-                    if event.type == pygame.KEYDOWN:
-                        # Scroll with arrow keys
-                        if event.key == pygame.K_UP:
-                            scroll_y = min(0, scroll_y + scroll_speed)
-                        if event.key == pygame.K_DOWN:
-                            scroll_y = max(-(max_scroll - screen_height + 150), scroll_y - scroll_speed)
-
+            def draw_rules(scroll_y):
+                """Draw the rules scrolled by scroll_y; return the height of the content."""
                 # Clear screen and redraw background
                 if bg_image:
                     screen.blit(bg_image, (0, 0))
@@ -205,27 +243,27 @@ class Match:
                 screen.blit(overlay, (0, 0))
 
                 # Draw title
-                title = title_font.render("Rules of Go", True, SPLASH_TEXT_COLOR)
+                title = render_text(title_font, "Rules of Go", SPLASH_TEXT_COLOR)
                 title_rect = title.get_rect(center=(screen_width//2, 40))
                 screen.blit(title, title_rect)
-                
+
                 # Draw rules text with scrolling
                 y_offset = 100 + scroll_y
                 line_spacing = 25
-                max_scroll = 0  # Reset max_scroll for recalculation
-                
+                max_scroll = 0
+
                 for line in rules_text.split('\n'):
                     if line.strip():  # Skip empty lines
                         if line.strip().endswith(':') or line.strip().isupper():  # Section headers
-                            text = subtitle_font.render(line, True, SPLASH_TEXT_COLOR)
+                            text = render_text(subtitle_font, line, SPLASH_TEXT_COLOR)
                         else:
-                            text = rules_font.render(line, True, SPLASH_TEXT_COLOR)
+                            text = render_text(rules_font, line, SPLASH_TEXT_COLOR)
                         text_rect = text.get_rect(left=50, top=y_offset)
-                        
+
                         # Only draw if within visible area
                         if y_offset + text_rect.height > 0 and y_offset < screen_height - button_height - 40:
                             screen.blit(text, text_rect)
-                        
+
                         y_offset += line_spacing
                         max_scroll = max(max_scroll, y_offset)
 
@@ -235,7 +273,7 @@ class Match:
                     if scroll_y < 0:
                         pygame.draw.polygon(screen, SPLASH_TEXT_COLOR, 
                             [(screen_width - 30, 60), (screen_width - 20, 40), (screen_width - 10, 60)])
-                    
+
                     # Down arrow
                     if scroll_y > -(max_scroll - screen_height + 150):
                         pygame.draw.polygon(screen, SPLASH_TEXT_COLOR,
@@ -245,74 +283,91 @@ class Match:
 
                 # Draw back button
                 pygame.draw.rect(screen, BUTTON_COLOR, back_button, border_radius=10)
-                back_text = button_font.render("Back", True, MENU_TEXT_COLOR)
+                back_text = render_text(button_font, "Back", MENU_TEXT_COLOR)
                 back_text_rect = back_text.get_rect(center=back_button.center)
                 screen.blit(back_text, back_text_rect)
 
                 pygame.display.flip()
+                return max_scroll
 
-            return back_button
-
-        # Welcome screen loop
-        while True:
-            play_button, rules_button = draw_welcome_screen()
-            pygame.display.flip()
-            
-            for event in pygame.event.get():
+            # Block until an event arrives; redraw only when the scroll position changed
+            max_scroll = draw_rules(scroll_y)
+            while True:
+                event = pygame.event.wait()
+                previous_scroll_y = scroll_y
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return None, None
-                
+                    return None
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = event.pos
-                    if play_button.collidepoint(mouse_pos):
-                        # Continue to board size selection
-                        return_to_welcome = False
-                        break
-                    elif rules_button.collidepoint(mouse_pos):
-                        # Show rules screen
-                        back_button = draw_rules_screen()
-                        if back_button:  # If back button was clicked
-                            continue  # Return to welcome screen loop
-                        else:  # If window was closed
-                            return None, None
+                    if back_button.collidepoint(event.pos):
+                        return back_button
+                    # Scroll with mouse wheel
+                    if event.button == 4:  # Mouse wheel up
+                        scroll_y = min(0, scroll_y + scroll_speed)
+                    if event.button == 5:  # Mouse wheel down
+                        scroll_y = max(-(max_scroll - screen_height + 150), scroll_y - scroll_speed)
+                if event.type == pygame.KEYDOWN:
+                    # Scroll with arrow keys
+                    if event.key == pygame.K_UP:
+                        scroll_y = min(0, scroll_y + scroll_speed)
+                    if event.key == pygame.K_DOWN:
+                        scroll_y = max(-(max_scroll - screen_height + 150), scroll_y - scroll_speed)
+                if scroll_y != previous_scroll_y or event.type == pygame.VIDEOEXPOSE:
+                    max_scroll = draw_rules(scroll_y)
+
+        # Welcome screen loop; redraw only when coming back from the rules screen
+        play_button, rules_button = draw_welcome_screen()
+        pygame.display.flip()
+        startup.first_frame('menu')
+        while True:
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return None, None
             
-            if 'return_to_welcome' in locals() and not return_to_welcome:
-                break
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = event.pos
+                if play_button.collidepoint(mouse_pos):
+                    # Continue to board size selection
+                    break
+                elif rules_button.collidepoint(mouse_pos):
+                    # Show rules screen
+                    back_button = draw_rules_screen()
+                    if not back_button:  # If window was closed
+                        return None, None
+                    # Back button was clicked; return to welcome screen
+                    play_button, rules_button = draw_welcome_screen()
+                    pygame.display.flip()
         
-        # Logo splash screen
-        start_time = time.time()
-        while time.time() - start_time < 3:  # 3 second delay
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-            
-            # Draw background
-            if bg_image:
-                screen.blit(bg_image, (0, 0))
-            else:
-                screen.fill((0, 0, 0))  # Black fallback if image fails to load
-            
-            # Create semi-transparent overlay for better text visibility
-            overlay = pygame.Surface((screen_width, screen_height))
-            overlay.fill((0, 0, 0))
-            overlay.set_alpha(128)  # 50% transparent
-            screen.blit(overlay, (0, 0))
-            
-            # Draw game title
-            title = title_font.render("GO GAME", True, SPLASH_TEXT_COLOR)
-            title_rect = title.get_rect(center=(screen_width//2, screen_height//2))
-            screen.blit(title, title_rect)
-            
-            # Add a loading text
-            loading_font = pygame.font.SysFont('Arial', 20)
-            loading_text = loading_font.render("Loading...", True, SPLASH_TEXT_COLOR)
-            loading_rect = loading_text.get_rect(center=(screen_width//2, screen_height//2 + 50))
-            screen.blit(loading_text, loading_rect)
-            
-            pygame.display.flip()
-            pygame.time.wait(100)  # Small delay to prevent high CPU usage
+        # Logo splash screen, shown while the game screen is loading
+        # Draw background
+        if bg_image:
+            screen.blit(bg_image, (0, 0))
+        else:
+            screen.fill((0, 0, 0))  # Black fallback if image fails to load
+        
+        # Create semi-transparent overlay for better text visibility
+        overlay = pygame.Surface((screen_width, screen_height))
+        overlay.fill((0, 0, 0))
+        overlay.set_alpha(128)  # 50% transparent
+        screen.blit(overlay, (0, 0))
+        
+        # Draw game title
+        title = render_text(title_font, "GO GAME", SPLASH_TEXT_COLOR)
+        title_rect = title.get_rect(center=(screen_width//2, screen_height//2))
+        screen.blit(title, title_rect)
+        
+        # Add a loading text
+        loading_font = get_font('Arial', 20)
+        loading_text = render_text(loading_font, "Loading...", SPLASH_TEXT_COLOR)
+        loading_rect = loading_text.get_rect(center=(screen_width//2, screen_height//2 + 50))
+        screen.blit(loading_text, loading_rect)
+        
+        pygame.display.flip()
+
+        self._preload()
+        for event in pygame.event.get(pygame.QUIT):
+            pygame.quit()
+            sys.exit()
         
         # Clear screen before moving to board size selection
         screen.fill((0, 0, 0))  # Black fallback if image fails to load
@@ -348,7 +403,41 @@ class Match:
         selected_mode = None
         current_page = 'BOARD_SIZE'
         
+        redraw = True
         while True:
+            if not redraw:
+                # Nothing changed; block until the next event
+                event = pygame.event.wait()
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    return "PVP", 19  # Default to PVP and 19x19 if window is closed
+                
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    mouse_pos = event.pos
+                    
+                    if current_page == 'BOARD_SIZE':
+                        # Board size selection
+                        for board_option in board_sizes:
+                            if board_option['rect'].collidepoint(mouse_pos):
+                                selected_size = board_option['size']
+                                current_page = 'GAME_MODE'
+                                redraw = True
+                                break
+                    
+                    elif current_page == 'GAME_MODE':
+                        # Game mode selection
+                        for mode_option in game_modes:
+                            if mode_option['rect'].collidepoint(mouse_pos):
+                                selected_mode = mode_option['mode']
+                                # Return selected mode and size
+                                return selected_mode, selected_size
+                
+                # Key to return to board size selection
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE and current_page == 'GAME_MODE':
+                    current_page = 'BOARD_SIZE'
+                    redraw = True
+                continue
+            redraw = False
             screen.fill((0, 0, 0))  # Black fallback if image fails to load
             
             # Page logic
@@ -366,12 +455,12 @@ class Match:
                 screen.blit(overlay, (0, 0))
 
                 # Title for board size selection
-                title = title_font.render("Select Board Size", True, SPLASH_TEXT_COLOR)
+                title = render_text(title_font, "Select Board Size", SPLASH_TEXT_COLOR)
                 title_rect = title.get_rect(centerx=screen_width//2, top=50)
                 screen.blit(title, title_rect)
                 
                 # Subtitle
-                subtitle = subtitle_font.render("Choose a board size that suits your skill level", True, SPLASH_TEXT_COLOR)
+                subtitle = render_text(subtitle_font, "Choose a board size that suits your skill level", SPLASH_TEXT_COLOR)
                 subtitle_rect = subtitle.get_rect(centerx=screen_width//2, top=100)
                 screen.blit(subtitle, subtitle_rect)
                 
@@ -382,7 +471,7 @@ class Match:
                     pygame.draw.rect(screen, BUTTON_COLOR, board_option['rect'], width=2, border_radius=10)
                     
                     # Button text
-                    size_text = button_font.render(board_option['label'], True, MENU_TEXT_COLOR)
+                    size_text = render_text(button_font, board_option['label'], MENU_TEXT_COLOR)
                     size_text_rect = size_text.get_rect(center=board_option['rect'].center)
                     screen.blit(size_text, size_text_rect)
                 
@@ -406,12 +495,12 @@ class Match:
                 screen.blit(overlay, (0, 0))
 
                 # Title for game mode selection
-                title = title_font.render("Select Game Mode", True, SPLASH_TEXT_COLOR)
+                title = render_text(title_font, "Select Game Mode", SPLASH_TEXT_COLOR)
                 title_rect = title.get_rect(centerx=screen_width//2, top=50)
                 screen.blit(title, title_rect)
                 
                 # Subtitle
-                subtitle = subtitle_font.render("Choose how you want to play Go", True, SPLASH_TEXT_COLOR)
+                subtitle = render_text(subtitle_font, "Choose how you want to play Go", SPLASH_TEXT_COLOR)
                 subtitle_rect = subtitle.get_rect(centerx=screen_width//2, top=100)
                 screen.blit(subtitle, subtitle_rect)
                 
@@ -422,7 +511,7 @@ class Match:
                     pygame.draw.rect(screen, BUTTON_COLOR, mode_option['rect'], width=2, border_radius=10)
                     
                     # Button text
-                    mode_text = button_font.render(mode_option['label'], True, MENU_TEXT_COLOR)
+                    mode_text = render_text(button_font, mode_option['label'], MENU_TEXT_COLOR)
                     mode_text_rect = mode_text.get_rect(center=mode_option['rect'].center)
                     screen.blit(mode_text, mode_text_rect)
                 
@@ -433,371 +522,311 @@ class Match:
                             pygame.draw.rect(screen, HIGHLIGHT_COLOR, mode_option['rect'], width=4, border_radius=10)
                 
                 # Draw back instruction
-                back_text = subtitle_font.render("Press ESC to go back", True, MENU_TEXT_COLOR)
+                back_text = render_text(subtitle_font, "Press ESC to go back", MENU_TEXT_COLOR)
                 back_rect = back_text.get_rect(center=(screen_width//2, screen_height - 30))
                 screen.blit(back_text, back_rect)
             
             pygame.display.flip()
-            
-            # Event handling
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return "PVP", 19  # Default to PVP and 19x19 if window is closed
-                
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = event.pos
-                    
-                    if current_page == 'BOARD_SIZE':
-                        # Board size selection
-                        for board_option in board_sizes:
-                            if board_option['rect'].collidepoint(mouse_pos):
-                                selected_size = board_option['size']
-                                current_page = 'GAME_MODE'
-                                break
-                    
-                    elif current_page == 'GAME_MODE':
-                        # Game mode selection
-                        for mode_option in game_modes:
-                            if mode_option['rect'].collidepoint(mouse_pos):
-                                selected_mode = mode_option['mode']
-                                # Return selected mode and size
-                                return selected_mode, selected_size
-            
-            # Optional: Add a back button or key to return to board size selection
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_ESCAPE] and current_page == 'GAME_MODE':
-                current_page = 'BOARD_SIZE'
-
-    def _handle_game_events(self):
-        """Handle game events."""
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self._handle_exit()
-                return True
-            
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
-                
-                # Handle UI button clicks first
-                click_result = self.ui.handle_click(mouse_pos)
-                
-                if click_result == 'home':
-                    # Properly clean up the current game state
-                    pygame.display.quit()
-                    pygame.display.init()
-                    
-                    # Reset the game state
-                    self.game_over = False
-                    self.last_move_was_pass = False
-                    
-                    # Get new game mode and board size
-                    self.game_mode, self.board_size = self._select_game_mode_and_board_size()
-                    if self.game_mode is None:  # If window was closed during selection
-                        pygame.quit()
-                        return True
-                        
-                    # Initialize new board and UI
-                    self.board = Board(board_size=self.board_size, next_color='black')
-                    self.ui = UI(board_size=self.board_size)
-                    self.ui.initialize()  # Make sure to initialize the new UI
-                    return True
-                
-                elif click_result == 'restart':
-                    self._restart_game()
-                    return True
-                
-                elif click_result == 'pass':
-                    if self.last_move_was_pass:
-                        # Both players passed consecutively
-                        self._show_game_result()
-                        self.game_over = True
-                    else:
-                        # First pass
-                        self.last_move_was_pass = True
-                        self.board.pass_move()
-                        
-                        # If AI's turn after pass
-                        if self.game_mode == "AI_HUMAN" and self.board.next == 'white':
-                            pygame.time.wait(500)
-                            self._make_ai_move()
-                    return True
-                
-                elif click_result == 'music':
-                    # Music was toggled, just update the display
-                    self.ui.draw_game_state(self.board.next, self.board)
-                    return True
-                
-                # Handle stone placement if no button was clicked
-                if not self.game_over and click_result is None:
-                    board_pos = self.ui.pixel_to_board_coords(*mouse_pos)
-                    if board_pos is not None:  # Only proceed if we got valid board coordinates
-                        if self.game_mode == "PVP" or (self.game_mode == "AI_HUMAN" and self.board.next == 'black'):
-                            success, captured = self.board.put_stone(board_pos)
-                            if success:
-                                # Reset pass flag since a stone was placed
-                                self.last_move_was_pass = False
-                                
-                                # Remove captured stones
-                                for captured_point in captured:
-                                    self.ui.remove(captured_point)
-                                
-                                # Draw the new stone
-                                self.ui.draw(board_pos, opponent_color(self.board.next))
-                                
-                                # Update the game state display
-                                self.ui.draw_game_state(self.board.next, self.board)
-                                
-                                # If AI's turn, make its move
-                                if self.game_mode == "AI_HUMAN" and self.board.next == 'white':
-                                    pygame.time.wait(500)
-                                    self._make_ai_move()
-                            else:
-                                # Check if it's a suicide move
-                                self.board.board[board_pos[0]][board_pos[1]] = self.board.next
-                                own_group = self.board._get_group(*board_pos)
-                                is_suicide = self.board._count_liberties(own_group) == 0 and not self.board._find_captured_groups(self.board._get_opponent_color())
-                                self.board.board[board_pos[0]][board_pos[1]] = None
-                                
-                                if is_suicide:
-                                    self.ui.show_popup("Invalid Move: Suicide not allowed!")
-                                    # Redraw the game state to ensure everything is displayed correctly
-                                    self.ui.draw_game_state(self.board.next, self.board)
-            
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_p and not self.game_over:  # Pass move
-                    if self.last_move_was_pass:
-                        # Both players passed consecutively
-                        self._show_game_result()
-                        self.game_over = True
-                    else:
-                        # First pass
-                        self.last_move_was_pass = True
-                        self.board.pass_move()
-                    
-                    # If AI's turn after pass
-                    if self.game_mode == "AI_HUMAN" and self.board.next == 'white':
-                        pygame.time.wait(500)
-                        self._make_ai_move()
-        
-        return True
+
+    def _preload(self):
+        """Load what the game screen and the AI need, so the first game starts without a hitch."""
+        UI.preload()
+        for board_size in (9, 13, 19):
+            get_position_table(board_size)
+        startup.mark('preloaded')
+
+    def _is_ai_turn(self):
+        return (self.game_mode == "AI_HUMAN" and self.board.next == 'white') or self.game_mode == "AI_AI"
+
+    def _schedule_ai_move(self, delay=AI_MOVE_DELAY):
+        """
+        If the AI is to move, let the worker start on it; AI vs AI games are paced by
+        posting AI_MOVE_EVENT after delay ms. If the human is to move, ponder meanwhile.
+        """
+        if self.game_over or self.board.redo_history:
+            return  # While moves are taken back for review, the AI waits until the last one is redone
+        if not self._is_ai_turn():
+            if self.game_mode == "AI_HUMAN":
+                self.ai_worker.ponder(self.board)
+        elif self.spectator and self.speed == 0:
+            self._request_ai_move()
+        elif self.game_mode == "AI_AI":
+            if self.spectator:
+                delay = max(1, int(1000 / self.speed))
+            pygame.time.set_timer(AI_MOVE_EVENT, delay, 1)
+        else:
+            self._request_ai_move()
+
+    def _request_ai_move(self):
+        if not self.ai_worker.busy:
+            self.ai_worker.request_move(self.board)
+
+    def _cancel_ai_move(self):
+        """Cancel the pending AI move, e.g. on Restart or Home."""
+        pygame.time.set_timer(AI_MOVE_EVENT, 0)
+        self.ai_worker.cancel()
 
     def _start_game(self):
-        """Main game loop."""
-        clock = pygame.time.Clock()
+        """Main game loop; blocks in pygame.event.wait() until there is something to handle."""
         start_time = pygame.time.get_ticks()
         
         # Initialize game state display before the main loop
         self.ui.draw_board()
+        self.ui.sync_board(self.board)  # The stones of a resumed game
         self.ui.draw_game_state(self.board.next, self.board)
-        pygame.display.update()
+        startup.first_frame('game')  # Only the first frame of the process if the menu was skipped
+        self._schedule_ai_move()
         
+        clock = pygame.time.Clock()
         while not self.game_over:
-            # Update time elapsed
-            self.time_elapsed = (pygame.time.get_ticks() - start_time) // 1000
-            
-            # Always update game state at the start of each loop
-            self.ui.draw_game_state(self.board.next, self.board)
-            pygame.display.update()
-            
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self._handle_exit()
+            # Sleep until the next event, or only until the next frame while something is to be drawn
+            was_animating = self.ui.animating
+            if was_animating:
+                timeout = ANIMATION_FRAME_MS
+            elif self.render_pending:
+                timeout = max(1, self.frame_ms - (pygame.time.get_ticks() - self.last_render))
+            else:
+                timeout = 0  # Wait indefinitely
+            event = pygame.event.wait(timeout)
+            self._handle_event(event)
+            self._autosave()
+            
+            dt = clock.tick()
+            if not self.game_over and self.ui.animating:
+                # Animations started by this event begin at their first frame
+                self.ui.update_animations(dt if was_animating else 0)
+            
+            if self.render_pending:
+                # Spectator mode: positions reached within one frame are dropped
+                if not self.game_over and pygame.time.get_ticks() - self.last_render >= self.frame_ms:
+                    self._render()
+            elif not self.game_over:
+                # Render on change: the info panel is only redrawn if what it shows has changed
+                self.ui.draw_game_state(self.board.next, self.board)
+            
+        self.time_elapsed = (pygame.time.get_ticks() - start_time) // 1000
+        self._cancel_ai_move()
+        if self.dir_save:
+            self._save_game()
+
+    def _handle_event(self, event):
+        """Handle a single event of the main game loop."""
+        if event.type == pygame.QUIT:
+            self._handle_exit()
+            self.game_over = True
+            pygame.quit()
+            sys.exit(0)
+            
+        elif event.type == AI_MOVE_EVENT:
+            # The AI may have lost its turn meanwhile, e.g. after a restart
+            if not self.game_over and self._is_ai_turn():
+                self._request_ai_move()
+            
+        elif event.type == AI_MOVE_DONE_EVENT:
+            # Drop moves computed for a game that was restarted or left meanwhile
+            if event.generation == self.ai_worker.generation and not self.game_over and self._is_ai_turn():
+                self._apply_ai_move(event.move)
+                if self.spectator and self._is_demo_over():
+                    self._render()
+                    self._show_game_result()
+                    self.game_over = True
+                    return
+                self._schedule_ai_move()
+            
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_SPACE, pygame.K_ESCAPE):
+            self.ui.finish_animations()
+            
+        elif event.type == pygame.KEYDOWN and not self.spectator and event.key in (
+                pygame.K_LEFT, pygame.K_RIGHT, pygame.K_PAGEUP, pygame.K_PAGEDOWN, pygame.K_HOME, pygame.K_END):
+            self._review(event.key)
+            
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click
+            mouse_pos = event.pos
+            # A click skips running animations, so the board is up to date before it changes again
+            self.ui.finish_animations()
+            
+            # Handle UI button clicks first
+            click_result = self.ui.handle_click(mouse_pos)
+            
+            if click_result == 'pass':
+                if self.game_mode != "PVP" and self._is_ai_turn():
+                    return  # The AI is thinking; the human cannot pass for it
+                if self.last_move_was_pass:
+                    # Both players passed consecutively
+                    self._cancel_ai_move()
+                    self._show_game_result()
                     self.game_over = True
+                else:
+                    # First pass
+                    self.last_move_was_pass = True
+                    self.board.pass_move()
+                    # Update display after pass
+                    self.ui.draw_game_state(self.board.next, self.board)
+                    
+                    # If AI's turn after pass
+                    self._schedule_ai_move()
+                return
+            
+            elif click_result == 'home':
+                self._cancel_ai_move()
+                # Properly clean up the current game state
+                pygame.display.quit()
+                pygame.display.init()
+                
+                # Reset the game state
+                self.game_over = False
+                self.last_move_was_pass = False
+                
+                # Get new game mode and board size
+                self.game_mode, self.board_size = self._select_game_mode_and_board_size()
+                if self.game_mode is None:  # If window was closed during selection
                     pygame.quit()
                     sys.exit(0)
                     
-                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click
-                    mouse_pos = pygame.mouse.get_pos()
-                    
-                    # Handle UI button clicks first
-                    click_result = self.ui.handle_click(mouse_pos)
-                    
-                    if click_result == 'pass':
-                        if self.last_move_was_pass:
-                            # Both players passed consecutively
-                            self._show_game_result()
-                            self.game_over = True
-                        else:
-                            # First pass
-                            self.last_move_was_pass = True
-                            self.board.pass_move()
-                            # Update display after pass
+                # Initialize new board and UI
+                self.board = Board(board_size=self.board_size, next_color='black')
+                self.ui = UI(board_size=self.board_size)
+                self.ui.initialize()
+                self.ui.animations_enabled = not self.spectator
+                # Make sure to draw initial state
+                self.ui.draw_game_state(self.board.next, self.board)
+                self._schedule_ai_move()
+                return
+            
+            elif click_result == 'restart':
+                self._cancel_ai_move()
+                self._restart_game()
+                self._schedule_ai_move()
+                return
+            
+            elif click_result == 'music':
+                # Music was toggled, just update the display
+                self.ui.draw_game_state(self.board.next, self.board)
+                return
+            
+            # Handle stone placement if no button was clicked
+            if not self.game_over:
+                board_pos = self.ui.pixel_to_board_coords(*mouse_pos)
+                if board_pos is not None:  # Only proceed if we got valid board coordinates
+                    if self.game_mode == "PVP" or (self.game_mode == "AI_HUMAN" and self.board.next == 'black'):
+                        success, captured = self.board.put_stone(board_pos)
+                        if success:
+                            # Reset pass flag since a stone was placed
+                            self.last_move_was_pass = False
+                            
+                            # Remove captured stones
+                            for captured_point in captured:
+                                self.ui.remove(captured_point)
+                            
+                            # Draw the new stone
+                            self.ui.draw(board_pos, opponent_color(self.board.next))
+                            
+                            # Update the game state display
                             self.ui.draw_game_state(self.board.next, self.board)
-                            pygame.display.update()
                             
-                            # If AI's turn after pass
-                            if self.game_mode == "AI_HUMAN" and self.board.next == 'white':
-                                pygame.time.wait(500)
-                                self._make_ai_move()
-                        continue
-                    
-                    elif click_result == 'home':
-                        # Properly clean up the current game state
-                        pygame.display.quit()
-                        pygame.display.init()
-                        
-                        # Reset the game state
-                        self.game_over = False
-                        self.last_move_was_pass = False
-                        
-                        # Get new game mode and board size
-                        self.game_mode, self.board_size = self._select_game_mode_and_board_size()
-                        if self.game_mode is None:  # If window was closed during selection
-                            pygame.quit()
-                            sys.exit(0)
+                            # If AI's turn, let it move after a short pause
+                            self._schedule_ai_move()
+                        else:
+                            # Check if it's a suicide move
+                            is_suicide = self.board.board[board_pos[0]][board_pos[1]] is None \
+                                and self.board.is_suicide(board_pos)
                             
-                        # Initialize new board and UI
-                        self.board = Board(board_size=self.board_size, next_color='black')
-                        self.ui = UI(board_size=self.board_size)
-                        self.ui.initialize()
-                        # Make sure to draw initial state
-                        self.ui.draw_game_state(self.board.next, self.board)
-                        pygame.display.update()
-                        continue
-                    
-                    elif click_result == 'restart':
-                        self._restart_game()
-                        continue
-                    
-                    elif click_result == 'music':
-                        # Music was toggled, just update the display
-                        self.ui.draw_game_state(self.board.next, self.board)
-                        pygame.display.update()
-                        continue
-                    
-                    # Handle stone placement if no button was clicked
-                    if not self.game_over:
-                        board_pos = self.ui.pixel_to_board_coords(*mouse_pos)
-                        if board_pos is not None:  # Only proceed if we got valid board coordinates
-                            if self.game_mode == "PVP" or (self.game_mode == "AI_HUMAN" and self.board.next == 'black'):
-                                success, captured = self.board.put_stone(board_pos)
-                                if success:
-                                    # Reset pass flag since a stone was placed
-                                    self.last_move_was_pass = False
-                                    
-                                    # Remove captured stones
-                                    for captured_point in captured:
-                                        self.ui.remove(captured_point)
-                                    
-                                    # Draw the new stone
-                                    self.ui.draw(board_pos, opponent_color(self.board.next))
-                                    
-                                    # Update the game state display
-                                    self.ui.draw_game_state(self.board.next, self.board)
-                                    pygame.display.update()
-                                    
-                                    # If AI's turn, make its move
-                                    if self.game_mode == "AI_HUMAN" and self.board.next == 'white':
-                                        pygame.time.wait(500)
-                                        self._make_ai_move()
-                                else:
-                                    # Check if it's a suicide move
-                                    self.board.board[board_pos[0]][board_pos[1]] = self.board.next
-                                    own_group = self.board._get_group(*board_pos)
-                                    is_suicide = self.board._count_liberties(own_group) == 0 and not self.board._find_captured_groups(self.board._get_opponent_color())
-                                    self.board.board[board_pos[0]][board_pos[1]] = None
-                                    
-                                    if is_suicide:
-                                        self.ui.show_popup("Invalid Move: Suicide not allowed!")
-                                        # Redraw the game state
-                                        self.ui.draw_game_state(self.board.next, self.board)
-                                        pygame.display.update()
-            
-            # AI move handling
-            if (self.game_mode == "AI_HUMAN" and self.board.next == 'white') or \
-               (self.game_mode == "AI_AI" and not self.game_over):
-                pygame.time.wait(500)
-                self._make_ai_move()
-            
-            # Small delay to prevent high CPU usage
-            pygame.time.wait(10)
-            
-        self.time_elapsed = time.time() - self.time_elapsed
-        if self.dir_save:
-            self.ui.save_image(join(self.dir_save, 'final_board.png'))
-
-    def _make_ai_move(self):
-        """Advanced AI player with strategic move selection."""
-        import random
-        import math
-        import copy
-
-        def evaluate_move(point, color):
-            """Evaluate the strategic value of a potential move."""
-            if not self.board.is_valid_move(point):
-                return float('-inf')
-            
-            x, y = point
-            score = 0
-            
-            # Proximity to existing stones (encourage clustering)
-            nearby_stones = 0
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if dx == 0 and dy == 0:
-                        continue
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < self.board_size and 0 <= ny < self.board_size:
-                        if self.board.board[nx][ny] is not None:
-                            nearby_stones += 1
-            score += nearby_stones * 2
-            
-            # Potential stone capture
-            test_board = copy.deepcopy(self.board)
-            test_board.board[x][y] = color
-            captured_groups = test_board._find_captured_groups(opponent_color(color))
-            score += len(captured_groups) * 10
-            
-            # Territory control (proximity to board center)
-            center_x, center_y = self.board_size // 2, self.board_size // 2
-            distance_to_center = math.sqrt((x - center_x)**2 + (y - center_y)**2)
-            score += (self.board_size - distance_to_center)
-            
-            # Avoid moves near board edges
-            if x < 2 or x > self.board_size - 3 or y < 2 or y > self.board_size - 3:
-                score -= 5
-            
-            return score
+                            if is_suicide:
+                                self.ui.show_popup("Invalid Move: Suicide not allowed!")
+                                # Redraw the game state
+                                self.ui.invalidate()
+                                self.ui.draw_game_state(self.board.next, self.board)
 
-        # Find all valid moves
-        valid_moves = []
-        for i in range(self.board_size):
-            for j in range(self.board_size):
-                if self.board.is_valid_move((i, j)):
-                    valid_moves.append((i, j))
-        
-        if not valid_moves:
+    def _review(self, key):
+        """
+        Undo (Left), redo (Right), go back or forward REVIEW_STEP moves (Page Up, Page Down), or jump to the start
+        (Home) or the last move (End). Only the intersections that changed are redrawn.
+        """
+        self._cancel_ai_move()
+        self.ui.finish_animations()
+        board = self.board
+        num_moves = len(board.moves)
+        target = {pygame.K_LEFT: num_moves - 1, pygame.K_RIGHT: num_moves + 1,
+                  pygame.K_PAGEUP: num_moves - REVIEW_STEP, pygame.K_PAGEDOWN: num_moves + REVIEW_STEP,
+                  pygame.K_HOME: 0, pygame.K_END: num_moves + len(board.redo_history)}[key]
+        changed = board.jump_to(max(0, target))
+        if self.game_mode == "AI_HUMAN" and self._is_ai_turn():
+            # Step over the AI's move, so that the human is to move
+            forward = key in (pygame.K_RIGHT, pygame.K_PAGEDOWN, pygame.K_END)
+            changed |= board.jump_to(len(board.moves) + (1 if forward else -1))
+        self.last_move_was_pass = bool(board.moves) and board.moves[-1][1] is None
+        self.ui.sync_board(board, changed)
+        self.ui.draw_game_state(board.next, board)
+        self._schedule_ai_move()
+
+    def _apply_ai_move(self, move):
+        """Play the move chosen by the AI for the current player; None means pass."""
+        if move is None:
             # If no valid moves, pass
+            self.render_pending = self.spectator
             return self.board.pass_move()
         
         # Determine current player color
         current_color = self.board.next
         
-        # Rank moves by strategic value
-        ranked_moves = [(move, evaluate_move(move, current_color)) for move in valid_moves]
-        ranked_moves.sort(key=lambda x: x[1], reverse=True)
-        
-        # Select top moves, with some randomness to prevent predictability
-        top_moves = ranked_moves[:max(3, len(ranked_moves) // 2)]
-        best_move = random.choice(top_moves)[0]
-        
         # Try to place the stone
-        success, captured = self.board.put_stone(best_move)
+        success, captured = self.board.put_stone(move)
+        if success and self.spectator:
+            # Drawn by _render() at the next frame, together with any moves played until then
+            self.render_pending = True
+            return True
         if success:
             # Remove captured stones from the board
             for captured_point in captured:
                 self.ui.remove(captured_point)
             
             # Draw the new stone 
-            self.ui.draw(best_move, current_color)
+            self.ui.draw(move, current_color)
             return True
         
         return False
 
+    def _render(self):
+        """Spectator mode: draw the latest position and info panel."""
+        self.ui.sync_board(self.board)
+        self.ui.flush()
+        self.ui.draw_game_state(self.board.next, self.board)
+        self.render_pending = False
+        self.last_render = pygame.time.get_ticks()
+
+    def _is_demo_over(self):
+        """A spectated game ends when both players pass or after SPECTATOR_MAX_MOVES moves per intersection."""
+        return self.board.passes >= 2 or self.board.counter_move >= SPECTATOR_MAX_MOVES * self.board_size ** 2
+
+    def _autosave(self):
+        """
+        Snapshot the game if a move was played since the last snapshot. A game left by Restart or Home
+        stays saved until the next game has its first move; spectated demos are not saved.
+        """
+        board = self.board
+        if self.spectator or not board.moves or (self.autosaved[0] is board and self.autosaved[1] == len(board.moves)):
+            return
+        self.autosaved = (board, len(board.moves))
+        path_tmp = AUTOSAVE_FILE + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(AUTOSAVE_FILE), exist_ok=True)
+            with open(path_tmp, 'wb') as f:
+                f.write(self.game_mode.encode('ascii') + b'\n' + board.to_bytes())
+            os.replace(path_tmp, AUTOSAVE_FILE)
+        except OSError as e:
+            print('Could not autosave the game: %s' % e)
+
+    def _clear_autosave(self):
+        """Forget the autosaved game once it is over."""
+        self.autosaved = (self.board, len(self.board.moves))
+        try:
+            os.remove(AUTOSAVE_FILE)
+        except OSError:
+            pass
+
     def _show_game_result(self):
         """Display the final game result."""
+        self._clear_autosave()
         # Calculate final scores
         scores = self.board.get_score()
         
@@ -834,11 +863,20 @@ class Match:
         
         pygame.display.update()
 
+    def _save_game(self):
+        """Save the image of the last board state and the game record as SGF to dir_save."""
+        self.ui.save_image(join(self.dir_save, 'final_board.png'))
+        # Only games ended by two passes have been scored
+        result = format_result(self.board.get_score()) if self.board.passes >= 2 else None
+        players = {'black': 'AI' if self.game_mode == "AI_AI" else 'Human',
+                   'white': 'Human' if self.game_mode == "PVP" else 'AI'}
+        write_sgf(join(self.dir_save, 'game.sgf'), [SgfGame.from_board(self.board, result=result, players=players)])
+
     def end_game(self):
         """Clean up and end the game."""
         try:
             if hasattr(self, 'dir_save') and self.dir_save:
-                self.ui.save_image(join(self.dir_save, 'final_board.png'))
+                self._save_game()
         except Exception:
             pass  # Ignore any saving errors on exit
         
@@ -846,7 +884,46 @@ class Match:
         sys.exit()
 
 def main():
-    match = Match()
+    parser = argparse.ArgumentParser(description='Play Go')
+    parser.add_argument('--mode', choices=GAME_MODES, default=None,
+                        help='skip the menu and play this mode')
+    parser.add_argument('--size', type=int, choices=[9, 13, 19], default=19, help='board size')
+    parser.add_argument('--speed', type=float, default=None,
+                        help='watch AI vs AI at this many moves per second; 0 for engine speed')
+    parser.add_argument('--fps', type=int, default=30, help='frame rate cap when watching AI vs AI')
+    parser.add_argument('--ponder', action='store_true', help='let the AI think on the human\'s time')
+    parser.add_argument('--no-audio', action='store_true', help='never open the audio device')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue the game autosaved when the last one was interrupted')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print how long startup took until the first frame')
+    args = parser.parse_args()
+    if args.speed is not None and args.speed < 0:
+        parser.error('--speed must not be negative')
+    if args.speed is not None and args.mode not in (None, 'AI_AI'):
+        parser.error('--speed only applies to --mode AI_AI')
+    if args.speed is not None and args.resume:
+        parser.error('--speed cannot be combined with --resume')
+    if args.fps < 1:
+        parser.error('--fps must be at least 1')
+    if args.startup_report:
+        os.environ[startup.REPORT_ENV] = '1'
+    if args.no_audio:
+        get_audio().disable()
+
+    if args.speed is not None and args.mode is None:
+        args.mode = 'AI_AI'
+    autosave = load_autosave() if args.resume else None
+    if args.resume and autosave is None:
+        print('No autosaved game to resume')
+    if autosave is not None:
+        game_mode, board = autosave
+        match = Match(game_mode=game_mode, ponder=args.ponder, board=board)
+    elif args.mode is None:
+        match = Match(ponder=args.ponder)
+    else:
+        match = Match(game_mode=args.mode, board_size=args.size, ponder=args.ponder,
+                      speed=args.speed, max_fps=args.fps, show_menu=False)
     match.start()
 
 if __name__ == '__main__':
@@ -0,0 +1,65 @@
+import random
+import struct
+import pytest
+from game.go import Board
+
+
+def make_board():
+    board = Board(board_size=9)
+    for point in [(2, 2), (6, 6), (2, 6), (6, 2), (4, 4)]:
+        assert board.put_stone(point)[0]
+    board.pass_move()
+    return board
+
+
+def test_round_trip():
+    board = make_board()
+    decoded = Board.from_bytes(board.to_bytes())
+    assert str(decoded) == str(board)
+    assert decoded.next == board.next
+    assert decoded.moves == board.moves
+    assert decoded.last_move == board.last_move
+    assert decoded.ko_point == board.ko_point
+    assert decoded.passes == board.passes
+    assert decoded.komi == board.komi
+    assert Board.from_bytes(board.to_bytes(history=False)).moves == []
+
+
+@pytest.mark.parametrize('offset, value', [
+    (1, 10),  # Board size
+    (2, 2),  # Player to move
+    (4, 9), (5, 0x80),  # Ko point
+    (6, 0), (7, 20),  # Last move, with only one coordinate given
+    (8, 3),  # Winner
+])
+def test_corrupt_header(offset, value):
+    data = bytearray(make_board().to_bytes())
+    data[offset] = value
+    with pytest.raises(ValueError):
+        Board.from_bytes(data)
+
+
+def test_corrupt_komi_and_moves():
+    data = bytearray(make_board().to_bytes())
+    data[9:13] = struct.pack('<f', float('nan'))
+    with pytest.raises(ValueError):
+        Board.from_bytes(data)
+    data = bytearray(make_board().to_bytes())
+    data[-2:] = struct.pack('<H', 81)  # Off the 9x9 board
+    with pytest.raises(ValueError):
+        Board.from_bytes(data)
+    with pytest.raises(ValueError):
+        Board.from_bytes(make_board().to_bytes()[:-1])
+
+
+def test_random_corruption_raises_value_error_only():
+    data = make_board().to_bytes()
+    rng = random.Random(0)
+    for _ in range(2000):
+        corrupt = bytearray(data)
+        for _ in range(rng.randint(1, 4)):
+            corrupt[rng.randrange(len(corrupt))] = rng.randrange(256)
+        try:
+            Board.from_bytes(corrupt)
+        except ValueError:
+            pass
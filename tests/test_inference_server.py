@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from agent.rl.inference_server import QInferenceServer
+
+
+def test_bad_request_does_not_stop_the_server():
+    with QInferenceServer(np.arange(3.)) as server:
+        with pytest.raises(ValueError):
+            server.submit(np.ones((2, 3)), np.array([1, -1, 1]))
+        qs = server.evaluate(np.ones((2, 3)), [1, -1], timeout=5)
+        np.testing.assert_allclose(qs, [3., -3.])
+
+
+def test_cancelled_request_does_not_stop_the_server():
+    server = QInferenceServer(np.arange(3.))
+    cancelled = server.submit(np.ones((1, 3)))
+    assert cancelled.cancel()
+    with server.start():
+        np.testing.assert_allclose(server.evaluate(np.ones((1, 3)), timeout=5), [3.])